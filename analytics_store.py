@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+"""
+Bản sao dạng cột (numpy) của các lộ trình đã lưu cho thống kê theo nhóm sinh viên
+
+Dữ liệu được làm phẳng thành các bảng sự kiện, mỗi dòng mang sẵn các chiều của lộ trình
+(vị trí, GPA, thời điểm tạo) nên truy vấn không cần join:
+    paths    một dòng mỗi lộ trình
+    steps    một dòng mỗi bước học
+    courses  một dòng mỗi môn học quan trọng (điểm quan trọng quy về thang 10)
+    skills   một dòng mỗi kỹ năng đề xuất
+
+sync() chỉ đọc các lộ trình có id lớn hơn watermark đã đồng bộ và ghi thêm một segment (.npz) cho mỗi bảng;
+database bị reset/khôi phục (phiên bản cache 'all' đổi) thì bản sao được dựng lại từ đầu.
+Cột chuỗi được mã hóa bằng từ điển (mã int32) nên lọc và nhóm chạy hoàn toàn trên mảng số;
+cột số (thời gian theo tháng, tín chỉ, điểm) lấy từ các cột số đã đọc lúc ghi database (numeric_fields.py).
+
+Ví dụ:
+    python analytics_store.py sync
+    python analytics_store.py query courses --group-by course --metric mean:importance_score --metric count \\
+        --where "position=AI Engineer" --since 2026-09-01
+    python analytics_store.py query paths --group-by gpa_band --metric median:timeline_max_months
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa đồng bộ trong tiến trình
+    fcntl = None
+
+from config import ANALYTICS_SYNC_BATCH, ANALYTICS_MAX_SEGMENTS, ANALYTICS_SYNC_INTERVAL, GPA_BANDS
+from database_manager import CACHE_SCOPE_ALL
+
+# Kiểu cột: 'id' int64, 'int' int32, 'num' float32 (NaN khi thiếu hoặc không đọc được),
+# 'time' datetime64[s], 'dim' chuỗi mã hóa từ điển (int32)
+_DTYPES = {'id': np.int64, 'int': np.int32, 'num': np.float32, 'time': 'datetime64[s]', 'dim': np.int32}
+
+# Các chiều của lộ trình được lặp lại trên mọi bảng
+_PATH_COLUMNS = (('path_id', 'id'), ('position', 'dim'), ('gpa', 'num'), ('created_at', 'time'))
+
+# Đổi SCHEMA thì tăng số này, bản sao cũ được dựng lại ở lần đồng bộ sau
+SCHEMA_VERSION = 2
+
+SCHEMA = {
+    'paths': _PATH_COLUMNS + (('student_id', 'id'), ('overall_timeline', 'dim'),
+                              ('timeline_min_months', 'num'), ('timeline_max_months', 'num'),
+                              ('steps', 'int'), ('important_courses', 'int'), ('skills', 'int')),
+    'steps': _PATH_COLUMNS + (('step_order', 'int'), ('domain', 'dim'), ('difficulty_level', 'dim'), ('timeline', 'dim'),
+                              ('timeline_min_months', 'num'), ('timeline_max_months', 'num')),
+    'courses': _PATH_COLUMNS + (('course', 'dim'), ('credits', 'num'), ('importance_score', 'num')),
+    'skills': _PATH_COLUMNS + (('skill_type', 'dim'), ('skill', 'dim')),
+}
+
+# Cột tính khi nạp (không lưu trên đĩa) để đổi ngưỡng xếp loại không phải đồng bộ lại
+GPA_BAND_LABELS = [label for _, label in GPA_BANDS] + ['Không rõ']
+_GPA_THRESHOLDS = np.array([low for low, _ in GPA_BANDS[1:]], dtype=np.float32)
+
+AGGREGATES = ('sum', 'mean', 'median', 'min', 'max')
+
+_NUMBER = re.compile(r'(\d+(?:[.,]\d+)?)')
+
+
+def gpa_band_codes(gpa):
+    """Mã xếp loại (chỉ số trong GPA_BAND_LABELS) của mảng GPA, GPA thiếu thuộc nhóm 'Không rõ'"""
+    codes = np.digitize(gpa, _GPA_THRESHOLDS).astype(np.int32)
+    codes[np.isnan(gpa)] = len(GPA_BANDS)
+    return codes
+
+
+class _Dictionaries:
+    """Từ điển chuỗi -> mã của các cột 'dim'; chỉ thêm, không sửa nên mã đã ghi luôn giữ nguyên nghĩa"""
+
+    def __init__(self, values=None):
+        self.values = {column: list(items) for column, items in (values or {}).items()}
+        self._codes = {column: {value: code for code, value in enumerate(items)}
+                       for column, items in self.values.items()}
+
+    def encode(self, column, strings):
+        values = self.values.setdefault(column, [])
+        codes = self._codes.setdefault(column, {})
+        result = np.empty(len(strings), dtype=np.int32)
+        for i, text in enumerate(strings):
+            text = '' if text is None else text
+            code = codes.get(text)
+            if code is None:
+                code = codes[text] = len(values)
+                values.append(text)
+            result[i] = code
+        return result
+
+    def code(self, column, value):
+        if column == 'gpa_band':
+            return GPA_BAND_LABELS.index(value) if value in GPA_BAND_LABELS else None
+        return self._codes.get(column, {}).get(value)
+
+    def labels(self, column):
+        return GPA_BAND_LABELS if column == 'gpa_band' else self.values.get(column, [])
+
+
+def _numbers(values):
+    """Cột số float32, NULL -> NaN"""
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float32)
+
+
+def _python_value(value):
+    """Giá trị numpy -> giá trị JSON (NaN -> None)"""
+    if isinstance(value, np.integer):
+        return int(value)
+    value = float(value)
+    return None if np.isnan(value) else round(value, 3)
+
+
+class AnalyticsStore:
+    """Bản sao dạng cột của một database: đồng bộ tăng dần theo id và truy vấn tổng hợp trên mảng numpy
+
+    Nhiều tiến trình có thể cùng đồng bộ (khóa file) và cùng đọc; mỗi lần đọc dùng bản đã nạp
+    cho đến khi manifest đổi.
+    """
+
+    def __init__(self, db_manager, directory=None, batch_size=ANALYTICS_SYNC_BATCH, max_segments=ANALYTICS_MAX_SEGMENTS):
+        """
+        Args:
+            db_manager (DatabaseManager): Database nguồn
+            directory (str): Thư mục chứa bản sao (mặc định <tên database>_analytics cạnh file database)
+            batch_size (int): Số lộ trình mỗi segment
+            max_segments (int): Gộp các segment khi vượt quá số này
+        """
+        self.db_manager = db_manager
+        self.directory = directory or os.path.splitext(db_manager.db_path)[0] + '_analytics'
+        self.batch_size = batch_size
+        self.max_segments = max_segments
+        self.last_sync = None
+        self._sync_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._loaded = None  # (generation, bảng, từ điển)
+
+    # ----- File -----
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _segment_path(self, table, segment):
+        return self._path(f"{table}-{segment:06d}.npz")
+
+    def _read_json(self, name):
+        try:
+            with open(self._path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_json(self, name, data):
+        """Ghi file mới rồi đổi tên để người đọc không bao giờ thấy file ghi dở"""
+        temp_path = self._path(name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self._path(name))
+
+    @contextmanager
+    def _locked(self):
+        with self._sync_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path('sync.lock'), 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    # ----- Đồng bộ -----
+
+    def sync(self, rebuild=False):
+        """Đồng bộ các lộ trình có id lớn hơn watermark, trả về số lộ trình đã thêm"""
+        with self._locked():
+            manifest = self._read_json('manifest.json')
+            db_version, max_id = self._source_state()
+            if (rebuild or manifest is None or manifest['db_version'] != db_version or manifest['watermark'] > max_id
+                    or manifest.get('schema') != SCHEMA_VERSION):
+                manifest = self._reset(manifest, db_version)
+
+            dictionaries = _Dictionaries(self._read_json('dictionaries.json'))
+            added = 0
+            while True:
+                batch = self._read_batch(manifest['watermark'])
+                if batch is None:
+                    break
+                segment = manifest['next_segment']
+                for table, columns in self._flatten(batch, dictionaries).items():
+                    np.savez(self._segment_path(table, segment), **columns)
+                    manifest['rows'][table] += len(columns['path_id'])
+
+                manifest['watermark'] = int(batch[0][-1][0])
+                manifest['segments'].append(segment)
+                manifest['next_segment'] = segment + 1
+                manifest['generation'] += 1
+                manifest['synced_at'] = datetime.now().isoformat(timespec='seconds')
+                # Từ điển ghi trước manifest: người đọc manifest cũ chỉ thấy từ điển dài hơn, mã cũ không đổi
+                self._write_json('dictionaries.json', dictionaries.values)
+                self._write_json('manifest.json', manifest)
+                added += len(batch[0])
+
+            if len(manifest['segments']) > self.max_segments:
+                self._compact(manifest)
+            self.last_sync = time.monotonic()
+            return added
+
+    def sync_if_stale(self, max_age=ANALYTICS_SYNC_INTERVAL):
+        """Đồng bộ nếu tiến trình này chưa đồng bộ trong max_age giây"""
+        if self.last_sync is None or time.monotonic() - self.last_sync > max_age:
+            return self.sync()
+        return 0
+
+    def _source_state(self):
+        """(phiên bản cache 'all', id lộ trình lớn nhất) của database nguồn"""
+        with self.db_manager.reads.snapshot() as conn:
+            row = conn.execute('SELECT version FROM cache_versions WHERE scope = ?', (CACHE_SCOPE_ALL,)).fetchone()
+            max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM learning_paths').fetchone()[0]
+        return (row[0] if row else 0), max_id
+
+    def _reset(self, previous, db_version):
+        """Bắt đầu lại bản sao rỗng (database đã bị reset/khôi phục hoặc yêu cầu dựng lại)"""
+        manifest = {
+            'schema': SCHEMA_VERSION,
+            'db_version': db_version,
+            'watermark': 0,
+            'generation': previous['generation'] + 1 if previous else 1,
+            'next_segment': previous['next_segment'] if previous else 0,
+            'segments': [],
+            'rows': {table: 0 for table in SCHEMA},
+            'synced_at': None
+        }
+        # Manifest rỗng ghi trước khi xóa file để người đọc không nạp segment đã xóa
+        self._write_json('manifest.json', manifest)
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') or name == 'dictionaries.json':
+                os.remove(self._path(name))
+        return manifest
+
+    def _read_batch(self, watermark):
+        """Một lô lộ trình sau watermark cùng các dòng con, đọc trong cùng một snapshot"""
+        with self.db_manager.reads.snapshot() as conn:
+            paths = conn.execute('''
+                SELECT lp.id, lp.target_position, s.gpa, lp.created_at, lp.student_id, lp.overall_timeline,
+                       lp.timeline_min_months, lp.timeline_max_months
+                FROM learning_paths lp
+                LEFT JOIN students s ON lp.student_id = s.id
+                WHERE lp.id > ?
+                ORDER BY lp.id
+                LIMIT ?
+            ''', (watermark, self.batch_size)).fetchall()
+            if not paths:
+                return None
+
+            bounds = (paths[0][0], paths[-1][0])
+            steps = conn.execute('''
+                SELECT learning_path_id, step_order, domain, difficulty_level, timeline,
+                       timeline_min_months, timeline_max_months
+                FROM learning_steps
+                WHERE learning_path_id BETWEEN ? AND ?
+            ''', bounds).fetchall()
+            courses = conn.execute('''
+                SELECT ca.learning_path_id, ic.course_name, ic.credits_value,
+                       ic.score_numerator * 10.0 / ic.score_denominator
+                FROM important_courses ic
+                JOIN course_analyses ca ON ic.course_analysis_id = ca.id
+                WHERE ca.learning_path_id BETWEEN ? AND ?
+            ''', bounds).fetchall()
+            skills = conn.execute('''
+                SELECT learning_path_id, skill_type, skill_name
+                FROM skill_suggestions
+                WHERE learning_path_id BETWEEN ? AND ?
+            ''', bounds).fetchall()
+        return paths, steps, courses, skills
+
+    def _flatten(self, batch, dictionaries):
+        """Chuyển một lô dòng SQL thành các cột numpy của từng bảng"""
+        paths, steps, courses, skills = batch
+        path_ids = np.array([row[0] for row in paths], dtype=np.int64)
+        path_columns = {
+            'path_id': path_ids,
+            'position': dictionaries.encode('position', [row[1] for row in paths]),
+            'gpa': _numbers([row[2] for row in paths]),
+            'created_at': np.array([row[3] for row in paths], dtype='datetime64[s]'),
+        }
+
+        def child_table(rows, columns):
+            # Lặp lại các chiều của lộ trình cha trên từng dòng con
+            refs = np.array([row[0] for row in rows], dtype=np.int64)
+            positions = np.minimum(np.searchsorted(path_ids, refs), len(path_ids) - 1)
+            valid = path_ids[positions] == refs
+            table = {name: values[positions[valid]] for name, values in path_columns.items()}
+            table.update({name: values[valid] for name, values in columns.items()})
+            return table, positions[valid]
+
+        step_table, step_parents = child_table(steps, {
+            'step_order': np.array([row[1] or 0 for row in steps], dtype=np.int32),
+            'domain': dictionaries.encode('domain', [row[2] for row in steps]),
+            'difficulty_level': dictionaries.encode('difficulty_level', [row[3] for row in steps]),
+            'timeline': dictionaries.encode('timeline', [row[4] for row in steps]),
+            'timeline_min_months': _numbers([row[5] for row in steps]),
+            'timeline_max_months': _numbers([row[6] for row in steps]),
+        })
+        course_table, course_parents = child_table(courses, {
+            'course': dictionaries.encode('course', [row[1] for row in courses]),
+            'credits': _numbers([row[2] for row in courses]),
+            'importance_score': _numbers([row[3] for row in courses]),
+        })
+        skill_table, skill_parents = child_table(skills, {
+            'skill_type': dictionaries.encode('skill_type', [row[1] for row in skills]),
+            'skill': dictionaries.encode('skill', [row[2] for row in skills]),
+        })
+
+        path_table = dict(path_columns)
+        path_table.update({
+            'student_id': np.array([row[4] or 0 for row in paths], dtype=np.int64),
+            'overall_timeline': dictionaries.encode('overall_timeline', [row[5] for row in paths]),
+            'timeline_min_months': _numbers([row[6] for row in paths]),
+            'timeline_max_months': _numbers([row[7] for row in paths]),
+            'steps': np.bincount(step_parents, minlength=len(paths)).astype(np.int32),
+            'important_courses': np.bincount(course_parents, minlength=len(paths)).astype(np.int32),
+            'skills': np.bincount(skill_parents, minlength=len(paths)).astype(np.int32),
+        })
+        return {'paths': path_table, 'steps': step_table, 'courses': course_table, 'skills': skill_table}
+
+    def _compact(self, manifest):
+        """Gộp mọi segment thành một segment mỗi bảng"""
+        segment = manifest['next_segment']
+        for table, schema in SCHEMA.items():
+            parts = []
+            for old in manifest['segments']:
+                with np.load(self._segment_path(table, old)) as data:
+                    parts.append({name: data[name] for name, _ in schema})
+            np.savez(self._segment_path(table, segment),
+                     **{name: np.concatenate([part[name] for part in parts]) for name, _ in schema})
+
+        old_segments = manifest['segments']
+        manifest['segments'] = [segment]
+        manifest['next_segment'] = segment + 1
+        manifest['generation'] += 1
+        self._write_json('manifest.json', manifest)
+        for old in old_segments:
+            for table in SCHEMA:
+                try:
+                    os.remove(self._segment_path(table, old))
+                except FileNotFoundError:
+                    pass
+
+    # ----- Truy vấn -----
+
+    def _tables(self):
+        """Các bảng đã nạp vào bộ nhớ, chỉ đọc lại từ đĩa khi manifest đổi"""
+        for _ in range(3):
+            manifest = self._read_json('manifest.json')
+            if manifest is None:
+                raise RuntimeError(f"Chưa có bản sao dạng cột trong {self.directory}, hãy chạy sync() trước")
+            with self._cache_lock:
+                if self._loaded and self._loaded[0] == manifest['generation']:
+                    return self._loaded[1], self._loaded[2]
+            try:
+                tables = {table: self._load_table(table, schema, manifest['segments']) for table, schema in SCHEMA.items()}
+            except FileNotFoundError:
+                # Segment vừa bị gộp hoặc xóa bởi lần đồng bộ khác, đọc lại manifest
+                continue
+            dictionaries = _Dictionaries(self._read_json('dictionaries.json'))
+            with self._cache_lock:
+                self._loaded = (manifest['generation'], tables, dictionaries)
+            return tables, dictionaries
+        raise RuntimeError("Bản sao dạng cột đang được đồng bộ lại, vui lòng thử lại")
+
+    def _load_table(self, table, schema, segments):
+        parts = []
+        for segment in segments:
+            with np.load(self._segment_path(table, segment)) as data:
+                parts.append({name: data[name] for name, _ in schema})
+        columns = {
+            name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype=_DTYPES[kind])
+            for name, kind in schema
+        }
+        columns['gpa_band'] = gpa_band_codes(columns['gpa'])
+        return columns
+
+    @staticmethod
+    def columns(table):
+        """Các cột của bảng và kiểu ('dim' dùng để nhóm/lọc theo giá trị, 'num'/'int' để tính toán)"""
+        if table not in SCHEMA:
+            raise ValueError(f"Không có bảng: {table}")
+        kinds = dict(SCHEMA[table])
+        kinds['gpa_band'] = 'dim'
+        return kinds
+
+    def aggregate(self, table, group_by=(), metrics=('count',), where=None, since=None, until=None,
+                  order_by=None, descending=True, limit=None):
+        """
+        Tổng hợp một bảng theo nhóm
+
+        Args:
+            table (str): 'paths', 'steps', 'courses' hoặc 'skills'
+            group_by (list): Các cột 'dim' để nhóm (kể cả 'gpa_band')
+            metrics (list): 'count', 'distinct_paths' hoặc '<hàm>:<cột số>' với hàm trong AGGREGATES
+            where (dict): Cột 'dim' -> giá trị hoặc danh sách giá trị; cột số -> (min, max), None là không giới hạn
+            since, until (str | datetime): Khoảng created_at (since <= created_at < until)
+            order_by (str): Metric hoặc cột nhóm để sắp xếp (mặc định metric đầu tiên)
+            descending (bool): Sắp xếp giảm dần
+            limit (int): Số nhóm tối đa
+
+        Returns:
+            list: Mỗi nhóm một dict {cột nhóm: nhãn, metric: giá trị}
+        """
+        kinds = self.columns(table)
+        group_by = list(group_by)
+        metrics = list(metrics)
+        for column in group_by:
+            if kinds.get(column) != 'dim':
+                raise ValueError(f"Không nhóm được theo cột: {column}")
+
+        tables, dictionaries = self._tables()
+        columns = tables[table]
+        selected = np.flatnonzero(self._mask(columns, kinds, dictionaries, where, since, until))
+        if not len(selected):
+            return []
+
+        # Gộp mã của các cột nhóm thành một khóa int64 (hệ cơ số hỗn hợp) để nhóm bằng một lần np.unique
+        radices = [max(len(dictionaries.labels(column)), 1) for column in group_by]
+        key = np.zeros(len(selected), dtype=np.int64)
+        for column, radix in zip(group_by, radices):
+            key = key * radix + columns[column][selected]
+        keys, inverse = np.unique(key, return_inverse=True)
+        inverse = inverse.reshape(-1)
+
+        values = {metric: self._metric(metric, kinds, columns, selected, inverse, len(keys)) for metric in metrics}
+
+        labels = {}
+        remaining = keys
+        for column, radix in reversed(list(zip(group_by, radices))):
+            remaining, codes = np.divmod(remaining, radix)
+            names = dictionaries.labels(column)
+            labels[column] = [names[code] for code in codes]
+
+        rows = []
+        for i in range(len(keys)):
+            row = {column: labels[column][i] for column in group_by}
+            for metric in metrics:
+                row[metric] = _python_value(values[metric][i])
+            rows.append(row)
+
+        order_by = order_by or (metrics[0] if metrics else None)
+        if order_by is not None:
+            if order_by not in metrics and order_by not in group_by:
+                raise ValueError(f"Không sắp xếp được theo: {order_by}")
+            present = [row for row in rows if row[order_by] is not None]
+            present.sort(key=lambda row: row[order_by], reverse=descending)
+            rows = present + [row for row in rows if row[order_by] is None]
+        return rows[:limit] if limit else rows
+
+    @staticmethod
+    def _mask(columns, kinds, dictionaries, where, since, until):
+        mask = np.ones(len(columns['path_id']), dtype=bool)
+        for column, condition in (where or {}).items():
+            kind = kinds.get(column)
+            if kind == 'dim':
+                wanted = [condition] if isinstance(condition, str) else list(condition)
+                codes = [dictionaries.code(column, value) for value in wanted]
+                mask &= np.isin(columns[column], [code for code in codes if code is not None])
+            elif kind in ('id', 'int', 'num'):
+                if not isinstance(condition, tuple):
+                    # Một giá trị: so sánh bằng
+                    value = float(condition[0] if isinstance(condition, list) else condition)
+                    condition = (value, value)
+                low, high = condition
+                if low is not None:
+                    mask &= columns[column] >= low
+                if high is not None:
+                    mask &= columns[column] <= high
+            else:
+                raise ValueError(f"Không lọc được theo cột: {column}")
+        if since is not None:
+            mask &= columns['created_at'] >= np.datetime64(since, 's')
+        if until is not None:
+            mask &= columns['created_at'] < np.datetime64(until, 's')
+        return mask
+
+    @staticmethod
+    def _metric(metric, kinds, columns, selected, inverse, groups):
+        """Giá trị của một metric cho mọi nhóm (mảng dài `groups`)"""
+        if metric == 'count':
+            return np.bincount(inverse, minlength=groups)
+        if metric == 'distinct_paths':
+            path_ids = columns['path_id'][selected]
+            order = np.lexsort((path_ids, inverse))
+            grouped, ids = inverse[order], path_ids[order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = (grouped[1:] != grouped[:-1]) | (ids[1:] != ids[:-1])
+            return np.bincount(grouped[first], minlength=groups)
+
+        function, _, column = metric.partition(':')
+        if function not in AGGREGATES or kinds.get(column) not in ('int', 'num'):
+            raise ValueError(f"Metric không hợp lệ: {metric}")
+        data = columns[column][selected].astype(np.float64)
+        valid = ~np.isnan(data)
+        grouped, data = inverse[valid], data[valid]
+        counts = np.bincount(grouped, minlength=groups)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if function in ('sum', 'mean'):
+                sums = np.bincount(grouped, weights=data, minlength=groups)
+                return sums if function == 'sum' else np.where(counts > 0, sums / counts, np.nan)
+
+            # min/max/median: sắp xếp theo (nhóm, giá trị) rồi lấy phần tử theo vị trí đầu mỗi nhóm
+            ordered = data[np.lexsort((data, grouped))]
+            if not len(ordered):
+                return np.full(groups, np.nan)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            last = np.clip(starts + counts - 1, 0, len(ordered) - 1)
+            if function == 'min':
+                result = ordered[np.clip(starts, 0, len(ordered) - 1)]
+            elif function == 'max':
+                result = ordered[last]
+            else:
+                lower = np.clip(starts + (counts - 1) // 2, 0, len(ordered) - 1)
+                upper = np.clip(starts + counts // 2, 0, len(ordered) - 1)
+                result = (ordered[lower] + ordered[upper]) / 2
+            return np.where(counts > 0, result, np.nan)
+
+    def info(self):
+        """Watermark, số dòng mỗi bảng, số segment và dung lượng trên đĩa"""
+        manifest = self._read_json('manifest.json')
+        if manifest is None:
+            return None
+        size = sum(os.path.getsize(self._path(name)) for name in os.listdir(self.directory) if name.endswith('.npz'))
+        return {
+            'watermark': manifest['watermark'],
+            'rows': manifest['rows'],
+            'segments': len(manifest['segments']),
+            'bytes': size,
+            'synced_at': manifest['synced_at']
+        }
+
+
+def _parse_where(items):
+    """["position=AI Engineer", "gpa=3.0:3.6"] -> {'position': ['AI Engineer'], 'gpa': (3.0, 3.6)}"""
+    where = {}
+    for item in items or []:
+        column, _, value = item.partition('=')
+        if ':' in value and all(part == '' or _NUMBER.fullmatch(part) for part in value.split(':', 1)):
+            low, high = value.split(':', 1)
+            where[column] = (float(low) if low else None, float(high) if high else None)
+        else:
+            where.setdefault(column, []).append(value)
+    return where
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+    from database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Bản sao dạng cột cho thống kê theo nhóm sinh viên")
+    parser.add_argument('--db', default='learning_paths.db', help="Đường dẫn database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    sync = subparsers.add_parser('sync', help="Đồng bộ các lộ trình mới từ database")
+    sync.add_argument('--rebuild', action='store_true', help="Dựng lại toàn bộ bản sao")
+    subparsers.add_parser('info', help="Thông tin bản sao")
+    query = subparsers.add_parser('query', help="Truy vấn tổng hợp")
+    query.add_argument('table', choices=sorted(SCHEMA))
+    query.add_argument('--group-by', default='', help="Các cột nhóm, phân tách bằng dấu phẩy")
+    query.add_argument('--metric', action='append', help="count, distinct_paths hoặc hàm:cột (ví dụ mean:importance_score)")
+    query.add_argument('--where', action='append', help="cột=giá trị hoặc cột=min:max (lặp lại được)")
+    query.add_argument('--since', help="created_at từ (YYYY-MM-DD)")
+    query.add_argument('--until', help="created_at trước (YYYY-MM-DD)")
+    query.add_argument('--order-by')
+    query.add_argument('--ascending', action='store_true')
+    query.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    store = AnalyticsStore(DatabaseManager(args.db))
+
+    if args.command == 'sync':
+        started = time.perf_counter()
+        added = store.sync(rebuild=args.rebuild)
+        print(f"✅ Đã đồng bộ {added} lộ trình trong {time.perf_counter() - started:.2f}s")
+        print(json.dumps(store.info(), ensure_ascii=False, indent=2))
+        return
+
+    if args.command == 'info':
+        info = store.info()
+        print(json.dumps(info, ensure_ascii=False, indent=2) if info else "📊 Chưa đồng bộ lần nào")
+        return
+
+    started = time.perf_counter()
+    try:
+        rows = store.aggregate(args.table, group_by=[column for column in args.group_by.split(',') if column],
+                               metrics=args.metric or ['count'], where=_parse_where(args.where),
+                               since=args.since, until=args.until, order_by=args.order_by,
+                               descending=not args.ascending, limit=args.limit)
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return
+    if rows:
+        print(tabulate(rows, headers='keys'))
+    else:
+        print("📊 Không có dữ liệu phù hợp")
+    print(f"⏱️ {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
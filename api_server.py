@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+API HTTP bất đồng bộ (ASGI) để tạo và tra cứu lộ trình học không cần giao diện Streamlit
+
+Endpoints:
+    GET  /health
+    POST /learning-paths                   Tạo lộ trình (202 + job_id khi dùng hàng đợi; không dùng hàng đợi
+                                           thì 504 không hủy lượt tạo, lộ trình vẫn có thể được lưu)
+    GET  /jobs/{id}                        Trạng thái job tạo lộ trình
+    GET  /learning-paths/{id}              Chi tiết lộ trình
+    GET  /students/{student_name}/history  Lịch sử lộ trình của sinh viên
+    GET  /statistics                       Thống kê tổng quan
+    GET  /analytics/{table}                Tổng hợp theo nhóm trên bản sao dạng cột (analytics_store.py),
+                                           ví dụ /analytics/courses?group_by=course&metric=mean:importance_score
+                                           &position=AI%20Engineer&since=2026-09-01&limit=20
+
+Ví dụ chạy:
+    uvicorn api_server:app --port 8000
+    python api_server.py --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from analytics_store import AnalyticsStore
+from config import (LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE, USE_JOB_QUEUE, JOB_WORKERS, API_MAX_CONCURRENT_READS,
+                    API_MAX_CONCURRENT_GENERATIONS, API_READ_TIMEOUT, API_GENERATE_TIMEOUT, API_MAX_BODY_BYTES,
+                    SIMILARITY_ENABLED, GROUP_COMMIT_WRITES, STATISTICS_SNAPSHOT_SECONDS, TEMPLATES_ENABLED)
+from data_processor import DataProcessor
+from database_manager import DatabaseManager
+from job_queue import JobQueue, WorkerPool, generate_and_save
+from metrics import metrics, configure_logging
+from read_model_cache import ReadModelCache
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    """Lỗi trả về cho client với mã HTTP tương ứng"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class LearningPathAPI:
+    """Ứng dụng ASGI: mọi thao tác database/model chạy trong thread pool riêng để không chặn event loop"""
+
+    def __init__(self, db_path="learning_paths.db", use_job_queue=USE_JOB_QUEUE, workers=JOB_WORKERS):
+        self.db_path = db_path
+        self.use_job_queue = use_job_queue
+        self.workers = workers
+        self.routes = [
+            ('GET', re.compile(r'^/health$'), self.health),
+            ('POST', re.compile(r'^/learning-paths$'), self.create_learning_path),
+            ('GET', re.compile(r'^/jobs/(\d+)$'), self.get_job),
+            ('GET', re.compile(r'^/learning-paths/(\d+)$'), self.get_learning_path),
+            ('GET', re.compile(r'^/students/([^/]+)/history$'), self.get_student_history),
+            ('GET', re.compile(r'^/statistics$'), self.get_statistics),
+            ('GET', re.compile(r'^/analytics/(paths|steps|courses|skills)$'), self.get_analytics),
+        ]
+        self.db_manager = None
+        self.read_cache = None
+        self.analytics = None
+        self.job_queue = None
+        self._gemini_client = None
+        self._client_lock = threading.Lock()
+        self._worker_pool = None
+        # Thread pool riêng cho đọc và tạo lộ trình: các lời gọi model chậm không chiếm chỗ của request đọc
+        self._read_executor = None
+        self._generate_executor = None
+        self._read_slots = None
+        self._generate_slots = None
+
+    async def startup(self):
+        """Khởi tạo tài nguyên dùng chung (gọi một lần khi server khởi động)"""
+        configure_logging(LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE)
+        self._read_executor = ThreadPoolExecutor(API_MAX_CONCURRENT_READS, thread_name_prefix='api-read')
+        self._generate_executor = ThreadPoolExecutor(API_MAX_CONCURRENT_GENERATIONS, thread_name_prefix='api-generate')
+        self._read_slots = asyncio.Semaphore(API_MAX_CONCURRENT_READS)
+        self._generate_slots = asyncio.Semaphore(API_MAX_CONCURRENT_GENERATIONS)
+
+        self.db_manager = await self._run(self._read_executor, DatabaseManager, self.db_path,
+                                           GROUP_COMMIT_WRITES, STATISTICS_SNAPSHOT_SECONDS)
+        self.read_cache = ReadModelCache(self.db_manager)
+        self.analytics = AnalyticsStore(self.db_manager)
+        if self.use_job_queue:
+            self.job_queue = await self._run(self._read_executor, JobQueue, self.db_path)
+            if self.workers:
+                self._worker_pool = WorkerPool(self.workers, self.db_path).start()
+        logger.info("API sẵn sàng (hàng đợi: %s)", 'bật' if self.job_queue else 'tắt')
+
+    async def shutdown(self):
+        """Giải phóng tài nguyên khi server dừng"""
+        if self._worker_pool:
+            self._worker_pool.stop()
+        if self.db_manager:
+            self.db_manager.close()
+        for executor in (self._read_executor, self._generate_executor):
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def gemini_client(self):
+        """Client Gemini, chỉ khởi tạo khi thực sự tạo lộ trình đồng bộ (API đọc không cần API key)"""
+        with self._client_lock:
+            if self._gemini_client is None:
+                from gemini_client import GeminiClient
+                from path_templates import PathTemplates
+                from request_coalescer import SingleFlight
+                from similarity_index import SimilarityIndex
+                from usage_tracker import UsageTracker
+                self._gemini_client = GeminiClient(
+                    usage_tracker=UsageTracker(self.db_manager),
+                    coalescer=SingleFlight(self.db_path),
+                    similarity_index=SimilarityIndex(self.db_manager) if SIMILARITY_ENABLED else None,
+                    templates=PathTemplates(self.db_manager) if TEMPLATES_ENABLED else None
+                )
+        return self._gemini_client
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        with metrics.span('api_request', method=scope['method']):
+            try:
+                handler, args = self._match(scope['method'], scope['path'])
+                status, body = await handler(scope, receive, *args)
+            except HTTPError as e:
+                status, body = e.status, {'error': e.message}
+            except Exception as e:
+                logger.exception("Lỗi xử lý %s %s", scope['method'], scope['path'])
+                status, body = 500, {'error': f"Lỗi máy chủ: {str(e)}"}
+        await self._send_json(send, status, body)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _match(self, method, path):
+        path_exists = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match:
+                path_exists = True
+                if route_method == method:
+                    return handler, list(match.groups())
+        if path_exists:
+            raise HTTPError(405, "Phương thức không được hỗ trợ")
+        raise HTTPError(404, "Không tìm thấy endpoint")
+
+    @staticmethod
+    async def _send_json(send, status, body):
+        payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json; charset=utf-8'),
+                (b'content-length', str(len(payload)).encode()),
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+    @staticmethod
+    async def _read_body(receive):
+        """Đọc body JSON của request, giới hạn kích thước"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > API_MAX_BODY_BYTES:
+                raise HTTPError(413, "Body quá lớn")
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        try:
+            body = json.loads(b''.join(chunks) or b'{}')
+        except ValueError:
+            raise HTTPError(400, "Body không phải JSON hợp lệ")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Body phải là object JSON")
+        return body
+
+    @staticmethod
+    async def _run(executor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+    @staticmethod
+    async def _run_in_slot(executor, slots, timeout, func, *args):
+        """
+        Chạy func trong executor khi đã giữ một chỗ của slots, chờ tối đa timeout giây
+
+        Hết thời gian chờ không dừng được luồng đang chạy, nên chỗ chỉ được trả khi func thực sự xong
+        (callback của future), không phải lúc trả lỗi 504; nhờ vậy số luồng chạy thật không vượt giới hạn.
+        """
+        await slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+
+        def release_slot(_):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:  # Event loop đã đóng khi server dừng
+                pass
+
+        future.add_done_callback(release_slot)
+        # Hết giờ khi func chưa bắt đầu thì future bị hủy và chỗ được trả ngay
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    async def _read(self, func, *args):
+        """Chạy thao tác đọc trong thread pool đọc với giới hạn đồng thời và timeout"""
+        try:
+            return await self._run_in_slot(self._read_executor, self._read_slots, API_READ_TIMEOUT, func, *args)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "Hết thời gian chờ đọc dữ liệu")
+
+    async def health(self, scope, receive):
+        return 200, {'status': 'ok', 'job_queue': self.job_queue is not None}
+
+    async def create_learning_path(self, scope, receive):
+        body = await self._read_body(receive)
+        target_position = (body.get('target_position') or '').strip()
+        student_name = (body.get('student_name') or '').strip()
+        if not target_position or not student_name:
+            raise HTTPError(400, "Thiếu target_position hoặc student_name")
+        try:
+            gpa = float(body['gpa']) if body.get('gpa') is not None else None
+        except (TypeError, ValueError):
+            raise HTTPError(400, "gpa phải là số")
+
+        payload = {
+            'target_position': target_position,
+            'student_data': {
+                'student_code': body.get('student_code'),
+                'student_name': student_name,
+                'gpa': gpa,
+                'preferences': body.get('preferences', ''),
+                'strengths': body.get('strengths', ''),
+                'weaknesses': body.get('weaknesses', '')
+            },
+            'reuse_similar': bool(body.get('reuse_similar', True))
+        }
+
+        if self.job_queue:
+            job_id = await self._read(self.job_queue.submit, payload)
+            return 202, {'job_id': job_id, 'status': 'queued', 'status_url': f"/jobs/{job_id}"}
+
+        # Không dùng hàng đợi: tạo ngay, từ chối khi đã đủ số lượt tạo đồng thời.
+        # Sau 504 lượt tạo vẫn chạy tiếp và có thể lưu lộ trình; client cần kết quả chắc chắn nên bật hàng đợi
+        if self._generate_slots.locked():
+            raise HTTPError(429, "Đang có quá nhiều yêu cầu tạo lộ trình, vui lòng thử lại sau")
+        try:
+            learning_path_id = await self._run_in_slot(self._generate_executor, self._generate_slots,
+                                                       API_GENERATE_TIMEOUT, self._generate_and_save, payload)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "Hết thời gian chờ tạo lộ trình, lộ trình vẫn có thể được lưu vào lịch sử khi tạo xong")
+        except RuntimeError as e:
+            raise HTTPError(502, str(e))
+        return 201, {'learning_path_id': learning_path_id, 'url': f"/learning-paths/{learning_path_id}"}
+
+    def _generate_and_save(self, payload):
+        return generate_and_save(payload, self.gemini_client, self.db_manager, DataProcessor.load_courses())
+
+    async def get_job(self, scope, receive, job_id):
+        if not self.job_queue:
+            raise HTTPError(404, "Hàng đợi không được bật")
+        job = await self._read(self.job_queue.get_job, int(job_id))
+        if job is None:
+            raise HTTPError(404, f"Không tìm thấy job {job_id}")
+        response = {key: job[key] for key in ('id', 'status', 'attempts', 'max_attempts', 'learning_path_id', 'error')}
+        if job['learning_path_id']:
+            response['url'] = f"/learning-paths/{job['learning_path_id']}"
+        return 200, response
+
+    async def get_learning_path(self, scope, receive, learning_path_id):
+        details = await self._read(self.read_cache.get_learning_path_details, int(learning_path_id))
+        if details is None:
+            raise HTTPError(404, f"Không tìm thấy lộ trình {learning_path_id}")
+        return 200, details
+
+    async def get_student_history(self, scope, receive, student_name):
+        history = await self._read(self.read_cache.get_student_history, student_name)
+        return 200, {'student_name': student_name, 'learning_paths': history}
+
+    async def get_statistics(self, scope, receive):
+        return 200, await self._read(self.read_cache.get_statistics)
+
+    async def get_analytics(self, scope, receive, table):
+        params = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+        options = {name: params.pop(name)[-1] for name in ('since', 'until', 'order_by', 'order', 'limit') if name in params}
+        query = {
+            'group_by': [column for value in params.pop('group_by', []) for column in value.split(',') if column],
+            'metrics': params.pop('metric', None) or ['count'],
+            'since': options.get('since'),
+            'until': options.get('until'),
+            'order_by': options.get('order_by'),
+            'descending': options.get('order', 'desc') != 'asc',
+        }
+        try:
+            query['limit'] = int(options['limit']) if 'limit' in options else None
+            # Tham số còn lại là bộ lọc: cột=giá trị (lặp lại để lọc nhiều giá trị), cột_min/cột_max cho cột số
+            where, ranges = {}, {}
+            for name, values in params.items():
+                column, _, bound = name.rpartition('_')
+                if bound in ('min', 'max') and column:
+                    ranges.setdefault(column, [None, None])[bound == 'max'] = float(values[-1])
+                else:
+                    where[name] = values
+            where.update({column: tuple(bounds) for column, bounds in ranges.items()})
+            query['where'] = where
+            rows = await self._read(self._query_analytics, table, query)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        return 200, {'table': table, 'rows': rows}
+
+    def _query_analytics(self, table, query):
+        # Đồng bộ tăng dần trước khi truy vấn nếu bản sao đã cũ hơn ANALYTICS_SYNC_INTERVAL
+        self.analytics.sync_if_stale()
+        return self.analytics.aggregate(table, **query)
+
+
+app = LearningPathAPI()
+
+
+def main():
+    """Hàm main"""
+    parser = argparse.ArgumentParser(description="Chạy API HTTP cho hệ thống lộ trình học")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ Chưa cài uvicorn: pip install uvicorn")
+        return
+
+    print(f"🚀 API chạy tại http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level=LOG_LEVEL.lower())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,86 @@
-import pandas as pd
+import time
 import streamlit as st
 from gemini_client import GeminiClient
-from config import VI_TRI_FILE, MON_HOC_FILE, GPA_FILE
-from database_manager import DatabaseManager
+from config import (LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE, METRICS_FILE, METRICS_PORT, ENABLE_ADMIN_PANEL,
+                    USE_JOB_QUEUE, JOB_WORKERS, JOB_POLL_INTERVAL, ROSTER_PAGE_SIZE, SIMILARITY_ENABLED,
+                    GROUP_COMMIT_WRITES, STATISTICS_SNAPSHOT_SECONDS, TEMPLATES_ENABLED, SEMESTER_CREDIT_CAP,
+                    COMPARE_MAX_POSITIONS)
+from analytics_store import AnalyticsStore, GPA_BAND_LABELS
+from course_importance import CourseImportance
+from data_processor import DataProcessor
+from database_manager import DatabaseManager, details_to_result
+from job_queue import JobQueue, WorkerPool, ACTIVE_STATUSES
+from metrics import metrics, start_metrics_server, configure_logging
+from path_templates import PathTemplates
+from position_recommender import PositionRecommender
+from read_model_cache import ReadModelCache
+from request_coalescer import SingleFlight
+from result_renderer import section_renderer
+from semester_planner import SemesterPlanner
+from similarity_index import SimilarityIndex
+from student_roster import load_roster
+from usage_tracker import UsageTracker
 
-class DataProcessor:
-    """Xử lý dữ liệu từ các file CSV và TXT"""
-    
-    @staticmethod
-    def load_positions():
-        """Đọc danh sách vị trí từ file CSV"""
-        try:
-            df = pd.read_csv(VI_TRI_FILE, encoding='utf-8')
-            return df['Tên vi trí'].tolist()
-        except Exception as e:
-            st.error(f"Lỗi khi đọc file vị trí: {e}")
-            return []
-    
-    @staticmethod
-    def load_courses():
-        """Đọc danh sách môn học từ file CSV"""
-        try:
-            df = pd.read_csv(MON_HOC_FILE, encoding='utf-8')
-            courses = []
-            for _, row in df.iterrows():
-                courses.append({
-                    'name': row['Tên môn học'],
-                    'credits': row['Số tín chỉ']
-                })
-            return courses
-        except Exception as e:
-            st.error(f"Lỗi khi đọc file môn học: {e}")
-            return []
-    
-    @staticmethod
-    def load_gpa_data():
-        """Đọc dữ liệu GPA từ file TXT"""
-        try:
-            df = pd.read_csv(GPA_FILE, sep='\t', encoding='utf-8')
-            return df
-        except Exception as e:
-            st.error(f"Lỗi khi đọc file GPA: {e}")
-            return pd.DataFrame()
+@st.cache_resource(show_spinner=False)
+def start_worker_pool(db_path):
+    """Khởi động worker nền một lần cho mỗi tiến trình server Streamlit"""
+    return WorkerPool(JOB_WORKERS, db_path).start()
+
+@st.cache_resource(show_spinner=False)
+def get_database_manager():
+    """Khởi tạo schema database một lần cho mỗi tiến trình server thay vì mỗi lần rerun"""
+    return DatabaseManager(group_commit=GROUP_COMMIT_WRITES)
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue(db_path):
+    """Hàng đợi job dùng chung cho mọi phiên trong tiến trình server"""
+    return JobQueue(db_path)
+
+@st.cache_resource(show_spinner=False)
+def get_read_cache(db_path):
+    """Cache đọc dùng chung cho mọi phiên trong tiến trình server"""
+    return ReadModelCache(DatabaseManager(db_path, statistics_snapshot_seconds=STATISTICS_SNAPSHOT_SECONDS))
+
+@st.cache_resource(show_spinner=False)
+def get_course_importance(db_path):
+    """Thống kê môn học dùng chung bản sao dạng cột đã nạp cho mọi phiên trong tiến trình server"""
+    return CourseImportance(AnalyticsStore(DatabaseManager(db_path)))
+
+@st.cache_resource(show_spinner=False)
+def get_position_recommender(positions):
+    """Vector từ khóa của các vị trí chỉ tính một lần cho mọi phiên trong tiến trình server"""
+    return PositionRecommender(positions, DataProcessor.load_position_keywords())
+
+@st.cache_resource(show_spinner=False)
+def get_semester_planner():
+    """Danh mục môn học và môn tiên quyết chỉ đọc một lần cho mọi phiên trong tiến trình server"""
+    return SemesterPlanner(DataProcessor.load_courses(), DataProcessor.load_prerequisites())
+
+@st.cache_resource(show_spinner=False)
+def get_coalescer(db_path):
+    """Bộ gộp yêu cầu dùng chung cho mọi phiên trong tiến trình server"""
+    return SingleFlight(db_path)
 
 class LearningPathApp:
     """Ứng dụng chính cho hệ thống cá nhân hóa lộ trình học"""
     
     def __init__(self):
-        self.gemini_client = GeminiClient()
+        configure_logging(LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE)
+        if METRICS_PORT:
+            start_metrics_server(METRICS_PORT)
+        
         self.data_processor = DataProcessor()
-        self.db_manager = DatabaseManager()
+        self.db_manager = get_database_manager()
+        self.usage_tracker = UsageTracker(self.db_manager)
+        self.gemini_client = GeminiClient(usage_tracker=self.usage_tracker,
+                                          coalescer=get_coalescer(self.db_manager.db_path),
+                                          similarity_index=SimilarityIndex(self.db_manager) if SIMILARITY_ENABLED else None,
+                                          templates=PathTemplates(self.db_manager) if TEMPLATES_ENABLED else None)
+        self.read_cache = get_read_cache(self.db_manager.db_path)
+        self.job_queue = get_job_queue(self.db_manager.db_path) if USE_JOB_QUEUE else None
+        if self.job_queue and JOB_WORKERS:
+            start_worker_pool(self.db_manager.db_path)
+        self._job_pending = False
         
     def run(self):
         """Chạy ứng dụng Streamlit"""
@@ -100,27 +131,25 @@ class LearningPathApp:
         with st.sidebar:
             st.header("📋 Thông tin Sinh viên")
             
-            # Chọn sinh viên từ danh sách GPA
-            gpa_data = self.data_processor.load_gpa_data()
-            if not gpa_data.empty:
-                student_options = [f"{row['Họ và tên']} (GPA: {row['TBCHT H4']})" 
-                                 for _, row in gpa_data.iterrows() 
-                                 if pd.notna(row['TBCHT H4'])]
-                
-                selected_student = st.selectbox(
-                    "Chọn sinh viên:",
-                    options=student_options,
-                    index=0
-                )
-                
-                # Lấy thông tin sinh viên được chọn
-                student_name = selected_student.split(' (GPA: ')[0]
-                student_gpa = float(selected_student.split('GPA: ')[1].rstrip(')'))
+            # Chọn sinh viên: tìm theo tên/mã SV, mỗi trang chỉ hiển thị ROSTER_PAGE_SIZE kết quả
+            roster = load_roster()
+            student = self.select_student(roster) if len(roster) else None
+            if student:
+                student_name = student['student_name']
+                student_code = student['student_code']
+                student_gpa = student['gpa']
                 
                 st.write(f"**Tên:** {student_name}")
+                st.write(f"**Mã SV:** {student_code}")
                 st.write(f"**GPA:** {student_gpa}")
+            elif len(roster):
+                student_name = "Sinh viên"
+                student_code = None
+                student_gpa = None
+                st.info("Không tìm thấy sinh viên phù hợp")
             else:
                 student_name = "Sinh viên"
+                student_code = None
                 student_gpa = None
                 st.warning("Không có dữ liệu GPA")
             
@@ -147,7 +176,7 @@ class LearningPathApp:
             )
         
         # Main content - chỉ có một tab duy nhất
-        self.render_integrated_tab(student_name, student_gpa, preferences, strengths, weaknesses)
+        self.render_integrated_tab(student_name, student_gpa, preferences, strengths, weaknesses, student_code)
         
         # Thêm tab lịch sử và thống kê
         with st.sidebar:
@@ -171,8 +200,91 @@ class LearningPathApp:
             if st.session_state.show_history:
                 st.markdown("---")
                 self.show_history_and_stats(student_name)
+            
+            # Bảng metrics cho quản trị viên
+            if ENABLE_ADMIN_PANEL:
+                st.markdown("---")
+                if st.checkbox("⚙️ Metrics hiệu năng (Admin)"):
+                    self.show_metrics_panel()
+        
+        # Job vẫn đang chạy: chờ rồi rerun để cập nhật trạng thái
+        if self._job_pending:
+            time.sleep(JOB_POLL_INTERVAL)
+            st.rerun()
+    
+    def _export_metrics(self):
+        """Ghi metrics ra file Prometheus sau mỗi lần tạo lộ trình"""
+        try:
+            metrics.write_prometheus(METRICS_FILE)
+        except OSError as e:
+            st.warning(f"⚠️ Không ghi được file metrics: {e}")
+    
+    def show_metrics_panel(self):
+        """Hiển thị thời gian xử lý theo từng giai đoạn"""
+        summary = metrics.summary()
+        if summary:
+            st.table([
+                {
+                    'Giai đoạn': row.get('phase', row['metric']) + (f" ({row['operation']})" if 'operation' in row else ''),
+                    'Số lần': row['count'],
+                    'TB (ms)': row['avg_ms'],
+                    'p50 (ms)': row['p50_ms'],
+                    'p95 (ms)': row['p95_ms']
+                }
+                for row in summary
+            ])
+        else:
+            st.info("Chưa có dữ liệu metrics")
+        
+        cache_stats = self.read_cache.stats()
+        st.write(f"**🗂️ Cache đọc:** {cache_stats['hits']} lần trúng, {cache_stats['misses']} lần đọc database, "
+                 f"{cache_stats['entries']} mục")
+        coalescing = self.gemini_client.coalescer.stats()
+        st.write(f"**🔗 Gộp yêu cầu trùng lặp:** tiết kiệm {coalescing['saved_calls']} lần gọi model "
+                 f"(trên {coalescing['upstream_calls']} lần gọi thật của tiến trình này)")
+        
+        st.write("**🪙 Token theo ngày:**")
+        usage = self.db_manager.get_usage_summary('day')[:7]
+        if usage:
+            st.table(usage)
+        else:
+            st.write("Chưa có dữ liệu")
+    
+    def select_student(self, roster):
+        """Ô tìm kiếm và chọn sinh viên theo trang, trả về bản ghi sinh viên được chọn (None nếu không có kết quả)"""
+        query = st.text_input("Tìm sinh viên:", placeholder="Nhập tên (không cần dấu) hoặc Mã SV")
+        
+        # Đổi từ khóa thì quay về trang đầu
+        if st.session_state.get('student_query') != query:
+            st.session_state.student_query = query
+            st.session_state.student_page = 0
+        page = st.session_state.get('student_page', 0)
+        
+        students, total = roster.search(query, page * ROSTER_PAGE_SIZE, ROSTER_PAGE_SIZE)
+        if not students:
+            return None
+        
+        # Nhãn chứa Mã SV nên không trùng kể cả khi trùng họ tên
+        labels = [roster.label(student) for student in students]
+        label = st.selectbox("Chọn sinh viên:", options=labels)
+        
+        pages = (total + ROSTER_PAGE_SIZE - 1) // ROSTER_PAGE_SIZE
+        if pages > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("◀", disabled=page == 0, key="student_prev_page"):
+                    st.session_state.student_page = page - 1
+                    st.rerun()
+            with col2:
+                st.caption(f"Trang {page + 1}/{pages} · {total} sinh viên")
+            with col3:
+                if st.button("▶", disabled=page >= pages - 1, key="student_next_page"):
+                    st.session_state.student_page = page + 1
+                    st.rerun()
+        
+        return students[labels.index(label)]
     
-    def render_integrated_tab(self, student_name, student_gpa, preferences, strengths, weaknesses):
+    def render_integrated_tab(self, student_name, student_gpa, preferences, strengths, weaknesses, student_code=None):
         """Hiển thị tab tích hợp lộ trình học và phân tích môn học"""
         st.header("🎯 Lộ trình Học & Phân tích Môn học Tích hợp")
         
@@ -185,47 +297,267 @@ class LearningPathApp:
         # Chọn vị trí mục tiêu
         positions = self.data_processor.load_positions()
         if positions:
+            student_data = {
+                'student_code': student_code,
+                'student_name': student_name,
+                'gpa': student_gpa,
+                'preferences': preferences,
+                'strengths': strengths,
+                'weaknesses': weaknesses
+            }
+            
+            # Xếp hạng vị trí ngay trên máy (không gọi model), vị trí phù hợp nhất được chọn sẵn
+            with metrics.span('position_recommend'):
+                ranking = get_position_recommender(tuple(positions)).rank(student_data)
+            suggestions = [f"**{row['position']}** ({', '.join(row['matched'])})" for row in ranking if row['matched']][:3]
+            if suggestions:
+                st.caption("💡 Gợi ý theo sở thích và điểm mạnh: " + " · ".join(suggestions))
+            
+            if st.checkbox("🆚 So sánh nhiều vị trí", key='compare_mode',
+                           help="Tạo lộ trình cho nhiều vị trí cùng lúc và hiển thị cạnh nhau"):
+                self.render_comparison_mode([row['position'] for row in ranking], student_data)
+                return
+            
             target_position = st.selectbox(
                 "Chọn vị trí mục tiêu:",
-                options=positions,
+                options=[row['position'] for row in ranking],
                 index=0
             )
             
-            if st.button("🚀 Tạo Lộ trình Học & Phân tích Môn học", type="primary"):
-                # Load dữ liệu môn học
-                courses = self.data_processor.load_courses()
-                
-                with st.spinner("Đang tạo lộ trình học và phân tích môn học..."):
-                    result = self.gemini_client.generate_learning_path(
-                        target_position=target_position,
-                        student_gpa=student_gpa,
-                        preferences=preferences,
-                        strengths=strengths,
-                        weaknesses=weaknesses,
-                        courses_data=courses
-                    )
-                
-                if "error" in result:
-                    st.error(result["error"])
+            # Kết quả đã tạo được giữ trong session, chỉ gọi model lại khi người dùng chủ động tạo lại
+            last = st.session_state.get('last_generation')
+            same_request = (last is not None and last['target_position'] == target_position
+                            and last['student_data'] == student_data)
+            
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                generate_clicked = st.button("🚀 Tạo Lộ trình Học & Phân tích Môn học", type="primary")
+            with col2:
+                regenerate_clicked = same_request and st.button("🔄 Tạo lại", help="Gọi model để tạo lộ trình mới cho cùng thông tin")
+            
+            if generate_clicked and same_request:
+                st.info("ℹ️ Lộ trình cho thông tin này đã có bên dưới. Bấm \"🔄 Tạo lại\" nếu muốn tạo lộ trình mới.")
+            elif generate_clicked or regenerate_clicked:
+                # Tạo lại thì luôn gọi model, không dùng lại lộ trình đã lưu của yêu cầu gần giống
+                reuse_similar = not regenerate_clicked
+                if self.job_queue:
+                    # Đưa vào hàng đợi, worker nền tạo và lưu kết quả
+                    job_id = self.job_queue.submit({'target_position': target_position, 'student_data': student_data,
+                                                    'reuse_similar': reuse_similar})
+                    st.session_state.generation_job_id = job_id
                 else:
-                    # Tự động lưu vào database
-                    try:
-                        student_data = {
-                            'student_name': student_name,
-                            'gpa': student_gpa,
-                            'preferences': preferences,
-                            'strengths': strengths,
-                            'weaknesses': weaknesses
-                        }
-                        learning_path_id = self.db_manager.save_learning_path(student_data, result)
-                        st.success(f"✅ Đã tự động lưu vào database! ID: {learning_path_id}")
-                    except Exception as e:
-                        st.warning(f"⚠️ Lưu vào database thất bại: {str(e)}")
-                    
-                    self.display_integrated_results(result, student_name, student_gpa, preferences, strengths, weaknesses)
+                    self.generate_sync(target_position, student_data, reuse_similar)
+            
+            # Theo dõi job đang chạy (vẫn tiếp tục sau khi rerun hoặc tải lại trang)
+            if self.job_queue and st.session_state.get('generation_job_id'):
+                self.show_generation_job(st.session_state.generation_job_id)
+            
+            if not self._job_pending:
+                self.show_last_result(target_position)
         else:
             st.error("Không thể đọc danh sách vị trí")
     
+    def render_comparison_mode(self, positions, student_data):
+        """Chọn nhiều vị trí, tạo lộ trình cùng lúc và so sánh (chạy ngay trong lần chạy script, không qua hàng đợi)"""
+        selected = st.multiselect(
+            "Các vị trí cần so sánh:",
+            options=positions,
+            default=positions[:min(3, COMPARE_MAX_POSITIONS)],
+            max_selections=COMPARE_MAX_POSITIONS,
+            key='compare_positions'
+        )
+        
+        last = st.session_state.get('last_comparison')
+        same_request = (last is not None and last['positions'] == selected and last['student_data'] == student_data)
+        
+        if st.button("🆚 So sánh Lộ trình", type="primary", disabled=len(selected) < 2):
+            if same_request:
+                st.info("ℹ️ Kết quả so sánh cho các vị trí này đã có bên dưới.")
+            else:
+                self.generate_comparison(selected, student_data)
+        elif len(selected) < 2:
+            st.caption("Chọn ít nhất 2 vị trí để so sánh")
+        
+        self.show_last_comparison()
+    
+    def generate_comparison(self, positions, student_data):
+        """Tạo lộ trình cho các vị trí đã chọn bằng một lần gọi compare_positions và lưu từng lộ trình"""
+        with metrics.span('catalog_load'):
+            courses = self.data_processor.load_courses()
+        if not courses:
+            st.warning("⚠️ Không đọc được danh sách môn học, lộ trình sẽ không có phân tích môn học cụ thể")
+        
+        with st.spinner(f"Đang tạo lộ trình cho {len(positions)} vị trí..."):
+            results = self.gemini_client.compare_positions(
+                positions,
+                student_gpa=student_data['gpa'],
+                preferences=student_data['preferences'],
+                strengths=student_data['strengths'],
+                weaknesses=student_data['weaknesses'],
+                courses_data=courses,
+                student_name=student_data['student_name']
+            )
+        
+        entries = []
+        for position, result in results.items():
+            if "error" in result:
+                st.error(f"{position}: {result['error']}")
+                continue
+            if result.get("degraded"):
+                st.info(f"ℹ️ {position}: {result['degraded']}. Hiển thị lộ trình tham khảo thay vì tạo mới.")
+            
+            # Tự động lưu từng lộ trình, không lưu được thì giữ kết quả trong session
+            try:
+                with metrics.span('db_save'):
+                    learning_path_id = self.db_manager.save_learning_path(student_data, result)
+                entries.append({'position': position, 'learning_path_id': learning_path_id, 'result': None})
+            except Exception as e:
+                st.warning(f"⚠️ Lưu lộ trình {position} vào database thất bại: {str(e)}")
+                entries.append({'position': position, 'learning_path_id': None, 'result': result})
+        
+        if entries:
+            saved = [str(entry['learning_path_id']) for entry in entries if entry['learning_path_id']]
+            if saved:
+                st.success(f"✅ Đã tự động lưu vào database! ID: {', '.join(saved)}")
+            st.session_state.last_comparison = {
+                'positions': list(positions),
+                'student_data': dict(student_data),
+                'entries': entries
+            }
+        
+        self._export_metrics()
+    
+    def show_last_comparison(self):
+        """Hiển thị lại kết quả so sánh của phiên theo cột thẳng hàng mà không gọi model"""
+        last = st.session_state.get('last_comparison')
+        if not last:
+            return
+        
+        results = []
+        for entry in last['entries']:
+            result = entry['result']
+            if entry['learning_path_id']:
+                result = details_to_result(self.read_cache.get_learning_path_details(entry['learning_path_id']))
+            if result:
+                results.append(result)
+        if not results:
+            # Các lộ trình đã bị xóa khỏi database (reset/khôi phục)
+            st.session_state.last_comparison = None
+            return
+        
+        with metrics.span('render'):
+            st.markdown("---")
+            st.subheader(f"🆚 So sánh {len(results)} vị trí")
+            st.markdown(section_renderer.render('comparison', {'results': results}), unsafe_allow_html=True)
+            
+            for result in results:
+                with st.expander(f"📋 Chi tiết: {result.get('target_position', 'N/A')}"):
+                    self.display_learning_path_section(result)
+    
+    def generate_sync(self, target_position, student_data, reuse_similar=True):
+        """Tạo lộ trình ngay trong lần chạy script (khi không dùng hàng đợi)"""
+        # Load dữ liệu môn học
+        with metrics.span('catalog_load'):
+            courses = self.data_processor.load_courses()
+        if not courses:
+            st.warning("⚠️ Không đọc được danh sách môn học, lộ trình sẽ không có phân tích môn học cụ thể")
+        
+        with st.spinner("Đang tạo lộ trình học và phân tích môn học..."):
+            result = self.gemini_client.generate_learning_path(
+                target_position=target_position,
+                student_gpa=student_data['gpa'],
+                preferences=student_data['preferences'],
+                strengths=student_data['strengths'],
+                weaknesses=student_data['weaknesses'],
+                courses_data=courses,
+                student_name=student_data['student_name'],
+                reuse_similar=reuse_similar
+            )
+        
+        if "error" in result:
+            st.error(result["error"])
+        else:
+            if result.get("degraded"):
+                st.info(f"ℹ️ {result['degraded']}. Hiển thị lộ trình tham khảo thay vì tạo mới.")
+            if result.get("reused_from"):
+                st.info(f"ℹ️ Dùng lại lộ trình #{result['reused_from']['learning_path_id']} đã tạo cho thông tin gần giống "
+                        f"(độ tương tự {result['reused_from']['similarity']:.0%}). Bấm \"🔄 Tạo lại\" nếu muốn tạo lộ trình mới.")
+            if result.get("template"):
+                st.info(f"ℹ️ Dùng lộ trình mẫu cho vị trí này với học lực {result['template']['gpa_band']}. "
+                        f"Nhập sở thích, điểm mạnh, điểm yếu hoặc bấm \"🔄 Tạo lại\" để có lộ trình cá nhân hóa.")
+            
+            # Tự động lưu vào database
+            try:
+                with metrics.span('db_save'):
+                    learning_path_id = self.db_manager.save_learning_path(student_data, result)
+                st.success(f"✅ Đã tự động lưu vào database! ID: {learning_path_id}")
+                self.remember_result(target_position, student_data, learning_path_id=learning_path_id)
+            except Exception as e:
+                st.warning(f"⚠️ Lưu vào database thất bại: {str(e)}")
+                # Không lưu được thì giữ nguyên kết quả trong session
+                self.remember_result(target_position, student_data, result=result)
+        
+        self._export_metrics()
+    
+    def remember_result(self, target_position, student_data, learning_path_id=None, result=None):
+        """Ghi nhớ kết quả mới nhất của phiên (chỉ giữ id nếu đã lưu database)"""
+        st.session_state.last_generation = {
+            'target_position': target_position,
+            'student_data': dict(student_data),
+            'learning_path_id': learning_path_id,
+            'result': result
+        }
+    
+    def show_last_result(self, target_position):
+        """Hiển thị lại kết quả đã tạo của phiên sau mỗi lần rerun mà không gọi model"""
+        last = st.session_state.get('last_generation')
+        if not last:
+            return
+        
+        result = last['result']
+        if last['learning_path_id']:
+            details = self.read_cache.get_learning_path_details(last['learning_path_id'])
+            result = details_to_result(details)
+        if not result:
+            # Lộ trình đã bị xóa khỏi database (reset/khôi phục)
+            st.session_state.last_generation = None
+            return
+        
+        if last['target_position'] != target_position:
+            st.caption(f"Đang hiển thị lộ trình đã tạo gần nhất cho vị trí {last['target_position']}. "
+                       f"Bấm \"🚀 Tạo\" để tạo lộ trình cho vị trí {target_position}.")
+        self.render_result(result, last['student_data'])
+    
+    def show_generation_job(self, job_id):
+        """Hiển thị trạng thái job tạo lộ trình và kết quả khi hoàn thành"""
+        job = self.job_queue.get_job(job_id)
+        if job is None:
+            st.session_state.generation_job_id = None
+            return
+        
+        if job['status'] in ACTIVE_STATUSES:
+            status_text = "đang chờ worker" if job['status'] == 'queued' else f"đang tạo (lượt {job['attempts']}/{job['max_attempts']})"
+            st.info(f"⏳ Lộ trình #{job_id} {status_text}... Bạn có thể tiếp tục thao tác, kết quả sẽ tự hiển thị.")
+            if job['error']:
+                st.caption(f"Lỗi lượt trước: {job['error']}")
+            self._job_pending = True
+        elif job['status'] == 'dead':
+            st.error(f"❌ Không thể tạo lộ trình sau {job['attempts']} lần thử: {job['error']}")
+        else:
+            # Job xong: chuyển sang kết quả của phiên, các lần rerun sau không cần hỏi lại trạng thái job
+            st.success(f"✅ Đã tự động lưu vào database! ID: {job['learning_path_id']}")
+            self.remember_result(job['payload']['target_position'], job['payload']['student_data'],
+                                 learning_path_id=job['learning_path_id'])
+            st.session_state.generation_job_id = None
+    
+    def render_result(self, result, student_data):
+        """Hiển thị kết quả và đo thời gian render"""
+        with metrics.span('render'):
+            self.display_integrated_results(
+                result, student_data['student_name'], student_data['gpa'],
+                student_data['preferences'], student_data['strengths'], student_data['weaknesses']
+            )
+    
     def display_integrated_results(self, result, student_name, student_gpa, preferences, strengths, weaknesses):
         """Hiển thị kết quả tích hợp lộ trình học và phân tích môn học"""
         st.success("✅ Đã tạo lộ trình học và phân tích môn học thành công!")
@@ -251,7 +583,8 @@ class LearningPathApp:
                 st.info("ℹ️ Lộ trình học đã được tự động lưu vào database!")
         
         # Tạo tabs để hiển thị cả hai phần
-        tab1, tab2, tab3 = st.tabs(["🗺️ Lộ trình Học", "📚 Phân tích Môn học", "💡 Đề xuất Kỹ năng"])
+        tab1, tab2, tab3, tab4 = st.tabs(["🗺️ Lộ trình Học", "📚 Phân tích Môn học", "💡 Đề xuất Kỹ năng",
+                                          "📅 Kế hoạch Học kỳ"])
         
         with tab1:
             self.display_learning_path_section(result)
@@ -261,146 +594,65 @@ class LearningPathApp:
         
         with tab3:
             self.display_skill_suggestions_section(result)
+        
+        with tab4:
+            self.display_semester_plan_section(result)
     
     def display_learning_path_section(self, result):
         """Hiển thị phần lộ trình học"""
-        # Phân tích
-        st.subheader("📊 Phân tích Vị trí")
-        st.write(result.get("analysis", "Không có phân tích"))
-        
-        # Lộ trình học chi tiết
-        st.subheader("📈 Lộ trình Học Chi tiết")
-        learning_path = result.get("learning_path", [])
-        
-        for i, step in enumerate(learning_path, 1):
-            with st.expander(f"Bước {i}: {step.get('domain', 'N/A')} ({step.get('difficulty_level', 'N/A')})"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write("**Kỹ năng cần học:**")
-                    for skill in step.get("skills", []):
-                        st.write(f"• {skill}")
-                
-                with col2:
-                    st.write(f"**Thời gian:** {step.get('timeline', 'N/A')}")
-                    st.write("**Tài nguyên:**")
-                    for resource in step.get("resources", []):
-                        st.write(f"• {resource}")
-        
-        # Lời khuyên
-        st.subheader("💡 Lời khuyên")
-        st.write(result.get("recommendations", "Không có lời khuyên"))
+        section = {key: result.get(key) for key in ('analysis', 'learning_path', 'recommendations')}
+        st.markdown(section_renderer.render('learning_path', section), unsafe_allow_html=True)
     
     def display_course_analysis_section(self, result):
         """Hiển thị phần phân tích môn học"""
-        course_analysis = result.get("course_analysis", {})
-        
-        # Tổng quan phân tích
-        st.subheader("📊 Tổng quan Phân tích Môn học")
-        st.write(course_analysis.get("analysis_summary", "Không có tổng quan"))
-        
-        # 5 môn học quan trọng nhất
-        st.subheader("⭐ Các môn học Quan trọng")
-        important_courses = course_analysis.get("important_courses", [])
-        
-        for i, course in enumerate(important_courses, 1):
-            with st.expander(f"#{i} {course.get('name', 'N/A')} ({course.get('credits', 'N/A')} tín chỉ)"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.metric("Điểm quan trọng", f"{course.get('importance_score', 'N/A')}/10")
-                    st.write("**Lý do quan trọng:**")
-                    st.write(course.get("reason", "Không có lý do"))
-                
-                with col2:
-                    st.write("**Lời khuyên học tập:**")
-                    st.write(course.get("study_tips", "Không có lời khuyên"))
-        
-        # Lời khuyên chung
-        st.subheader("💡 Lời khuyên Chung về Học tập")
-        st.write(course_analysis.get("general_recommendations", "Không có lời khuyên"))
+        section = {'course_analysis': result.get('course_analysis', {})}
+        st.markdown(section_renderer.render('course_analysis', section), unsafe_allow_html=True)
     
     def display_skill_suggestions_section(self, result):
         """Hiển thị phần đề xuất kỹ năng"""
-        skill_suggestions = result.get("skill_suggestions", {})
-        
-        if not skill_suggestions:
+        markdown = section_renderer.render('skill_suggestions', {'skill_suggestions': result.get('skill_suggestions', {})})
+        if markdown is None:
             st.info("Không có đề xuất kỹ năng nào")
             return
+        st.markdown(markdown, unsafe_allow_html=True)
+    
+    def display_semester_plan_section(self, result):
+        """Hiển thị kế hoạch học kỳ xếp ngay trên máy từ danh sách môn quan trọng"""
+        important_courses = result.get('course_analysis', {}).get('important_courses', [])
+        try:
+            planner = get_semester_planner()
+        except ValueError as e:
+            st.warning(f"⚠️ {e}")
+            return
+        if not planner.courses:
+            st.info("Không có danh sách môn học để xếp kế hoạch")
+            return
         
-        st.subheader("🎯 Đề xuất Kỹ năng Cá nhân hóa")
-        st.write("Dựa trên điểm mạnh và điểm yếu của bạn, hệ thống đề xuất các kỹ năng bổ sung để:")
-        st.write("• Tận dụng tối đa điểm mạnh hiện có")
-        st.write("• Cải thiện những điểm yếu cần khắc phục") 
-        st.write("• Mở rộng cơ hội nghề nghiệp trong tương lai")
-        
-        # Kỹ năng dựa trên điểm mạnh
-        strength_skills = skill_suggestions.get("strength_based_skills", [])
-        if strength_skills:
-            st.subheader("💪 Kỹ năng Dựa trên Điểm mạnh")
-            st.write("Những kỹ năng này sẽ giúp bạn phát huy tối đa điểm mạnh hiện có:")
-            
-            for i, skill in enumerate(strength_skills, 1):
-                with st.expander(f"#{i} {skill.get('skill_name', 'N/A')}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write("**Lý do đề xuất:**")
-                        st.write(skill.get("reason", "Không có lý do"))
-                        st.write("**Lợi ích:**")
-                        st.write(skill.get("benefit", "Không có thông tin"))
-                    
-                    with col2:
-                        st.write("**Cách học:**")
-                        st.write(skill.get("learning_path", "Không có hướng dẫn"))
-        
-        # Kỹ năng cải thiện điểm yếu
-        weakness_skills = skill_suggestions.get("weakness_improvement_skills", [])
-        if weakness_skills:
-            st.subheader("🔧 Kỹ năng Cải thiện Điểm yếu")
-            st.write("Những kỹ năng này sẽ giúp bạn khắc phục những điểm yếu hiện tại:")
-            
-            for i, skill in enumerate(weakness_skills, 1):
-                with st.expander(f"#{i} {skill.get('skill_name', 'N/A')}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write("**Lý do đề xuất:**")
-                        st.write(skill.get("reason", "Không có lý do"))
-                        st.write("**Lợi ích:**")
-                        st.write(skill.get("benefit", "Không có thông tin"))
-                    
-                    with col2:
-                        st.write("**Cách học:**")
-                        st.write(skill.get("learning_path", "Không có hướng dẫn"))
-        
-        # Kỹ năng mở rộng cơ hội
-        expansion_skills = skill_suggestions.get("career_expansion_skills", [])
-        if expansion_skills:
-            st.subheader("🚀 Kỹ năng Mở rộng Cơ hội")
-            st.write("Những kỹ năng này sẽ mở ra nhiều cơ hội nghề nghiệp mới:")
-            
-            for i, skill in enumerate(expansion_skills, 1):
-                with st.expander(f"#{i} {skill.get('skill_name', 'N/A')}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.write("**Lý do đề xuất:**")
-                        st.write(skill.get("reason", "Không có lý do"))
-                        st.write("**Lợi ích:**")
-                        st.write(skill.get("benefit", "Không có thông tin"))
-                    
-                    with col2:
-                        st.write("**Cách học:**")
-                        st.write(skill.get("learning_path", "Không có hướng dẫn"))
-        
-        # Lời khuyên tổng hợp
-        st.markdown("---")
-        st.subheader("💡 Lời khuyên Tổng hợp")
-        st.write("• **Ưu tiên học tập:** Bắt đầu với những kỹ năng cải thiện điểm yếu")
-        st.write("• **Phát huy điểm mạnh:** Tiếp tục phát triển những kỹ năng bạn đã giỏi")
-        st.write("• **Mở rộng tầm nhìn:** Khám phá những kỹ năng mới để có nhiều lựa chọn nghề nghiệp")
-        st.write("• **Thực hành thường xuyên:** Áp dụng những kỹ năng đã học vào các dự án thực tế")
+        col1, col2 = st.columns(2)
+        with col1:
+            credit_cap = st.number_input("Tín chỉ tối đa mỗi học kỳ", min_value=max(planner.courses.values()),
+                                         max_value=40, value=max(SEMESTER_CREDIT_CAP, max(planner.courses.values())),
+                                         step=1, key='semester_credit_cap')
+        with col2:
+            only_important = st.checkbox("Chỉ môn quan trọng và môn tiên quyết", key='semester_only_important')
+        
+        with metrics.span('semester_plan'):
+            plan = planner.plan(important_courses, only_important=only_important, credit_cap=credit_cap)
+        
+        st.caption(f"📊 {len(plan['semesters'])} học kỳ cho {plan['total_credits']} tín chỉ "
+                   f"(tối thiểu {plan['lower_bound']} học kỳ) · ⭐ môn quan trọng của lộ trình")
+        if plan['unmatched']:
+            st.warning(f"⚠️ Không có trong danh sách môn học: {', '.join(plan['unmatched'])}")
+        st.table([
+            {
+                "Học kỳ": semester['semester'],
+                "Môn học": ('⭐ ' if course['important_rank'] else '') + course['name'],
+                "Tín chỉ": course['credits'],
+                "Môn tiên quyết": ', '.join(course['prerequisites']),
+            }
+            for semester in plan['semesters']
+            for course in semester['courses']
+        ])
     
     def save_to_database(self, result, student_name, student_gpa, preferences, strengths, weaknesses):
         """Lưu kết quả vào database"""
@@ -425,7 +677,7 @@ class LearningPathApp:
         st.subheader("📊 Lịch sử & Thống kê")
         
         # Thống kê tổng quan (compact)
-        stats = self.db_manager.get_statistics()
+        stats = self.read_cache.get_statistics()
         
         col1, col2 = st.columns(2)
         with col1:
@@ -441,10 +693,14 @@ class LearningPathApp:
         else:
             st.write("Chưa có dữ liệu")
         
+        # Môn học quan trọng trên toàn bộ lộ trình đã lưu
+        with st.expander("📚 Môn học quan trọng"):
+            self.show_course_importance()
+        
         # Lịch sử của sinh viên (compact)
         if student_name != "Sinh viên":
             st.write(f"**📚 Lịch sử {student_name}:**")
-            history = self.db_manager.get_student_history(student_name)
+            history = self.read_cache.get_student_history(student_name)
             
             if history:
                 for record in history[:3]:  # Chỉ hiển thị 3 record gần nhất
@@ -465,45 +721,48 @@ class LearningPathApp:
             else:
                 st.info("Chưa có lịch sử")
     
+    def show_course_importance(self):
+        """Các môn được chọn là môn quan trọng nhiều nhất, lọc theo vị trí và xếp loại học lực"""
+        course_importance = get_course_importance(self.db_manager.db_path)
+        try:
+            with metrics.span('course_importance'):
+                course_importance.refresh()
+        except Exception as e:
+            st.warning(f"⚠️ Không cập nhật được thống kê môn học: {e}")
+            return
+        
+        position = st.selectbox("Vị trí:", ["Tất cả"] + course_importance.positions(), key="course_importance_position")
+        gpa_band = st.selectbox("Học lực:", ["Tất cả"] + GPA_BAND_LABELS, key="course_importance_gpa_band")
+        position = None if position == "Tất cả" else position
+        gpa_band = None if gpa_band == "Tất cả" else gpa_band
+        
+        rows = course_importance.top_courses(position=position, gpa_band=gpa_band, limit=10)
+        if rows:
+            st.table([
+                {
+                    'Môn học': row['course'],
+                    'Lộ trình (%)': row['share'],
+                    'Điểm TB': row['mean_score'],
+                    'Trung vị': row['median_score']
+                }
+                for row in rows
+            ])
+        else:
+            st.write("Chưa có dữ liệu")
+    
     def show_learning_path_details(self, learning_path_id):
         """Hiển thị chi tiết lộ trình học"""
-        details = self.db_manager.get_learning_path_details(learning_path_id)
+        # Không đọc các trường văn bản dài đã nén, chỉ giải nén khi người dùng mở phần phân tích
+        details = self.read_cache.get_learning_path_details(learning_path_id, load_text=False)
         
         if details:
-            st.markdown("---")
-            st.subheader(f"📋 Chi tiết: {details['target_position']}")
-            
-            # Thông tin cơ bản
-            col1, col2 = st.columns(2)
-            with col1:
-                st.write(f"**Sinh viên:** {details['student_name']}")
-                st.write(f"**GPA:** {details['gpa']}")
-            with col2:
-                st.write(f"**Ngày tạo:** {details['created_at']}")
-                st.write(f"**Timeline:** {details['overall_timeline']}")
-            
-            # Lộ trình học
-            st.subheader("📚 Lộ trình Học")
-            for i, step in enumerate(details['learning_path'], 1):
-                st.markdown(f"**Bước {i}: {step['domain']}**")
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"• **Độ khó:** {step['difficulty_level']}")
-                    st.write(f"• **Thời gian:** {step['timeline']}")
-                with col2:
-                    st.write(f"• **Kỹ năng:** {', '.join(step['skills'])}")
-                    st.write(f"• **Tài nguyên:** {', '.join(step['resources'])}")
-                st.markdown("---")
-            
-            # Môn học quan trọng
-            st.subheader("⭐ Môn học Quan trọng")
-            for course in details['course_analysis']['important_courses']:
-                st.write(f"• **{course['name']}** ({course['credits']} tín chỉ) - {course['importance_score']}")
-            
-            # Lời khuyên chung
-            if details['course_analysis'].get('general_recommendations'):
-                st.subheader("💡 Lời khuyên Chung")
-                st.write(details['course_analysis']['general_recommendations'])
+            st.markdown(section_renderer.render('path_details', details), unsafe_allow_html=True)
+            if st.checkbox("📝 Xem phân tích và lời khuyên", key=f"show_texts_{learning_path_id}"):
+                texts = {
+                    field: self.read_cache.get_text_field(learning_path_id, field)
+                    for field in ('analysis', 'analysis_summary', 'recommendations')
+                }
+                st.markdown(section_renderer.render('path_texts', texts), unsafe_allow_html=True)
         else:
             st.error("Không tìm thấy chi tiết lộ trình học")
     
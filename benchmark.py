@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Bộ benchmark cho các hot path: lưu/đọc database, parse response, tạo prompt và thời gian khởi động
+
+Ví dụ:
+    python benchmark.py --sizes 1000,100000 --output bench.json
+    python benchmark.py --groups parsing,prompt
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource
+    resource = None
+
+from database_manager import DatabaseManager
+from data_generator import SyntheticDataGenerator
+
+POSITIONS = ['AI Engineer', 'Data Analyst', 'Web Developer', 'Blockchain',
+             'System Design', 'Software Testing', 'IT Support', 'Mobile Developer']
+
+SENTENCE = ("Sinh viên cần nắm vững kiến thức nền tảng về lập trình, cấu trúc dữ liệu và giải thuật, "
+            "đồng thời thực hành thường xuyên qua các dự án thực tế để phát triển kỹ năng chuyên môn. ")
+
+
+def peak_rss_kb():
+    """Peak RSS của tiến trình hiện tại (KB), None nếu không đo được"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS trả về bytes, Linux trả về KB
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def percentile(sorted_values, p):
+    """Lấy phân vị p (0-1) từ danh sách đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    index = int(round(p * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def sample_result(position, rng, steps=4, courses=5, skills_per_type=2):
+    """Tạo một kết quả lộ trình học có độ dài giống response thật của model"""
+    def text(sentences):
+        return SENTENCE * sentences
+
+    def skill():
+        return {
+            'skill_name': f"Kỹ năng {rng.randint(1, 200)}",
+            'reason': text(1),
+            'benefit': text(1),
+            'learning_path': text(1)
+        }
+
+    return {
+        'target_position': position,
+        'analysis': text(rng.randint(3, 8)),
+        'learning_path': [
+            {
+                'domain': f"Lĩnh vực {i + 1}",
+                'difficulty_level': ['Cơ bản', 'Trung cấp', 'Nâng cao'][min(i, 2)],
+                'skills': [f"Kỹ năng {j}" for j in range(rng.randint(2, 6))],
+                'timeline': f"{rng.randint(1, 4)}-{rng.randint(5, 9)} tháng",
+                'resources': [f"Tài nguyên {j}" for j in range(rng.randint(2, 5))]
+            }
+            for i in range(steps)
+        ],
+        'overall_timeline': f"{rng.randint(6, 12)}-{rng.randint(13, 24)} tháng",
+        'recommendations': text(rng.randint(2, 5)),
+        'skill_suggestions': {
+            'strength_based_skills': [skill() for _ in range(skills_per_type)],
+            'weakness_improvement_skills': [skill() for _ in range(skills_per_type)],
+            'career_expansion_skills': [skill() for _ in range(skills_per_type)]
+        },
+        'course_analysis': {
+            'analysis_summary': text(rng.randint(2, 5)),
+            'important_courses': [
+                {
+                    'name': f"Môn học {rng.randint(1, 50)}",
+                    'credits': str(rng.randint(2, 4)),
+                    'importance_score': f"{rng.randint(5, 10)}/10",
+                    'reason': text(1),
+                    'study_tips': text(1)
+                }
+                for _ in range(courses)
+            ],
+            'general_recommendations': text(2)
+        }
+    }
+
+
+def sample_student(index, students):
+    """Thông tin sinh viên thứ index (chia đều các lộ trình cho `students` sinh viên)"""
+    student_no = index % students
+    return {
+        'student_code': f"SV{student_no:07d}",
+        'student_name': f"Sinh viên {student_no}",
+        'gpa': round(2.0 + (student_no % 20) / 10, 1),
+        'preferences': 'Thích lập trình web, quan tâm đến AI',
+        'strengths': 'Giỏi toán, tư duy logic tốt',
+        'weaknesses': 'Chưa có kinh nghiệm làm dự án'
+    }
+
+
+class DirectConnections:
+    """Đường đọc trước khi có read_snapshot.py: mỗi lần đọc mở một kết nối thông thường"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def connect(self):
+        return sqlite3.connect(self.db_path)
+
+
+class BenchmarkRunner:
+    """Chạy các benchmark và thu thập kết quả dạng máy đọc được"""
+
+    def __init__(self, iterations=200, db_dir=None):
+        self.iterations = iterations
+        self.db_dir = db_dir or tempfile.mkdtemp(prefix='lp_bench_')
+        self.results = []
+        os.makedirs(self.db_dir, exist_ok=True)
+
+    def measure(self, name, func, iterations=None, params=None):
+        """Đo thời gian từng lần gọi func() và ghi lại ops/sec, p50, p99, peak RSS"""
+        iterations = iterations or self.iterations
+        timings = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        record = {
+            'name': name,
+            'params': params or {},
+            'iterations': iterations,
+            'ops_per_sec': round(iterations / elapsed, 2) if elapsed else None,
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 4),
+            'peak_rss_kb': peak_rss_kb()
+        }
+        self.results.append(record)
+        print(f"  {name} {record['params']}: {record['ops_per_sec']} ops/s, "
+              f"p50={record['p50_ms']}ms, p99={record['p99_ms']}ms")
+        return record
+
+    def populated_database(self, size):
+        """Tạo (hoặc dùng lại) database có sẵn `size` lộ trình học"""
+        db_path = os.path.join(self.db_dir, f"bench_{size}.db")
+        db = DatabaseManager(db_path)
+
+        conn = sqlite3.connect(db_path)
+        existing = conn.execute('SELECT COUNT(*) FROM learning_paths').fetchone()[0]
+        conn.close()
+        if existing < size:
+            print(f"  📝 Tạo {size - existing} lộ trình trong {db_path}...")
+            SyntheticDataGenerator(db_path, seed=size).generate(size - existing)
+        return db
+
+    def bench_database(self, sizes):
+        """Benchmark các thao tác DatabaseManager ở nhiều quy mô dữ liệu"""
+        for size in sizes:
+            print(f"🗄️ Database với {size} lộ trình")
+            students = max(1, size // 5)
+            db = self.populated_database(size)
+            rng = random.Random(42)
+            params = {'stored_paths': size}
+
+            conn = sqlite3.connect(db.db_path)
+            max_id = conn.execute('SELECT MAX(id) FROM learning_paths').fetchone()[0]
+            names = [row[0] for row in conn.execute('SELECT student_name FROM students LIMIT 1000')]
+            conn.close()
+
+            counter = iter(range(size, size + 10 ** 9))
+            self.measure('save_learning_path',
+                         lambda: db.save_learning_path(sample_student(next(counter), students),
+                                                       sample_result(rng.choice(POSITIONS), rng)),
+                         params=params)
+            self.measure('get_learning_path_details',
+                         lambda: db.get_learning_path_details(rng.randint(1, max_id)),
+                         params=params)
+            self.measure('get_student_history',
+                         lambda: db.get_student_history(rng.choice(names)),
+                         params=params)
+            # get_statistics quét toàn bảng nên chạy ít lần hơn
+            self.measure('get_statistics', db.get_statistics,
+                         iterations=min(self.iterations, 20), params=params)
+
+    def bench_writes(self, producer_counts=(1, 8, 64), total_saves=640):
+        """Thông lượng save_learning_path khi nhiều luồng cùng ghi: mỗi lần một transaction và group commit"""
+        print("✍️ Ghi đồng thời")
+        import threading
+        rng = random.Random(3)
+        results = [sample_result(rng.choice(POSITIONS), rng) for _ in range(64)]
+
+        for producers in producer_counts:
+            for group_commit in (False, True):
+                db_path = os.path.join(self.db_dir, f"writes_{producers}_{int(group_commit)}_{time.time_ns()}.db")
+                db = DatabaseManager(db_path, group_commit=group_commit)
+                conn = sqlite3.connect(db_path)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.close()
+
+                per_producer = max(1, total_saves // producers)
+                timings, errors = [], []
+                lock = threading.Lock()
+
+                def produce(producer):
+                    for i in range(per_producer):
+                        started = time.perf_counter()
+                        try:
+                            db.save_learning_path(sample_student(producer * per_producer + i, 1000), results[i % len(results)])
+                        except sqlite3.OperationalError as e:
+                            with lock:
+                                errors.append(str(e))
+                            continue
+                        with lock:
+                            timings.append(time.perf_counter() - started)
+
+                threads = [threading.Thread(target=produce, args=(producer,)) for producer in range(producers)]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+
+                timings.sort()
+                record = {
+                    'name': 'concurrent_save_learning_path',
+                    'params': {'producers': producers, 'mode': 'group_commit' if group_commit else 'direct'},
+                    'iterations': per_producer * producers,
+                    'ops_per_sec': round(len(timings) / elapsed, 2) if elapsed else None,
+                    'p50_ms': round(percentile(timings, 0.50) * 1000, 4),
+                    'p99_ms': round(percentile(timings, 0.99) * 1000, 4),
+                    'errors': len(errors),
+                    'peak_rss_kb': peak_rss_kb()
+                }
+                if group_commit:
+                    record['operations_per_commit'] = db.writer.stats()['operations_per_commit']
+                self.results.append(record)
+                print(f"  {record['name']} {record['params']}: {record['ops_per_sec']} ops/s, "
+                      f"p50={record['p50_ms']}ms, p99={record['p99_ms']}ms, lỗi={record['errors']}")
+
+    def bench_reads(self, size=20000, import_paths=40000, idle_seconds=2.0):
+        """p50/p99 của các truy vấn đọc khi rảnh và trong lúc một tiến trình khác nạp dữ liệu hàng loạt
+
+        So sánh đường đọc cũ (kết nối thông thường, journal rollback) với kết nối chỉ đọc trên WAL.
+        Khi có tải, các truy vấn được đo liên tục cho đến khi data_generator.py chạy xong.
+        """
+        print("📖 Đọc trong lúc nạp dữ liệu hàng loạt")
+        import shutil
+        source = self.populated_database(size)
+
+        for read_path in ('direct', 'read_only_wal'):
+            db_path = os.path.join(self.db_dir, f"reads_{read_path}_{time.time_ns()}.db")
+            conn = sqlite3.connect(source.db_path)
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.close()
+            shutil.copyfile(source.db_path, db_path)
+            db = DatabaseManager(db_path)
+            if read_path == 'direct':
+                conn = sqlite3.connect(db_path)
+                conn.execute('PRAGMA journal_mode=DELETE')
+                conn.close()
+                db.reads = DirectConnections(db_path)
+
+            conn = sqlite3.connect(db_path)
+            max_id = conn.execute('SELECT MAX(id) FROM learning_paths').fetchone()[0]
+            names = [row[0] for row in conn.execute('SELECT student_name FROM students LIMIT 1000')]
+            conn.close()
+            rng = random.Random(17)
+            queries = {
+                'get_student_history': lambda: db.get_student_history(rng.choice(names)),
+                'get_learning_path_details': lambda: db.get_learning_path_details(rng.randint(1, max_id)),
+            }
+
+            for load in ('idle', 'bulk_import'):
+                importer = None
+                if load == 'bulk_import':
+                    importer = subprocess.Popen(
+                        [sys.executable, 'data_generator.py', '--db', db_path, '--paths', str(import_paths),
+                         '--seed', str(size + 1), '--batch-size', '5000'],
+                        cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL)
+                deadline = time.perf_counter() + idle_seconds
+                timings = {name: [] for name in queries}
+                errors = 0
+                started = time.perf_counter()
+                while (importer.poll() is None) if importer else (time.perf_counter() < deadline):
+                    for name, query in queries.items():
+                        t0 = time.perf_counter()
+                        try:
+                            query()
+                        except sqlite3.OperationalError:
+                            errors += 1
+                            continue
+                        timings[name].append(time.perf_counter() - t0)
+                elapsed = time.perf_counter() - started
+
+                for name, values in timings.items():
+                    values.sort()
+                    record = {
+                        'name': name,
+                        'params': {'stored_paths': size, 'read_path': read_path, 'load': load},
+                        'iterations': len(values),
+                        'ops_per_sec': round(len(values) / elapsed, 2) if elapsed else None,
+                        'p50_ms': round(percentile(values, 0.50) * 1000, 4),
+                        'p99_ms': round(percentile(values, 0.99) * 1000, 4),
+                        'max_ms': round(values[-1] * 1000, 4) if values else 0.0,
+                        'errors': errors,
+                        'peak_rss_kb': peak_rss_kb()
+                    }
+                    self.results.append(record)
+                    print(f"  {record['name']} {record['params']}: {record['ops_per_sec']} ops/s, "
+                          f"p50={record['p50_ms']}ms, p99={record['p99_ms']}ms, max={record['max_ms']}ms, lỗi={errors}")
+
+    def bench_analytics(self, sizes):
+        """Đồng bộ bản sao dạng cột và truy vấn tổng hợp theo nhóm, so với truy vấn SQL tương đương"""
+        import shutil
+        from analytics_store import AnalyticsStore
+        for size in sizes:
+            print(f"📈 Thống kê theo nhóm với {size} lộ trình")
+            db = self.populated_database(size)
+            params = {'stored_paths': size}
+            store = AnalyticsStore(db, directory=os.path.join(self.db_dir, f"analytics_{size}"))
+            shutil.rmtree(store.directory, ignore_errors=True)
+            self.measure('AnalyticsStore.sync(full)', store.sync, iterations=1, params=params)
+            self.measure('AnalyticsStore.sync(incremental)', store.sync, iterations=5, params=params)
+
+            iterations = min(self.iterations, 20)
+            self.measure('aggregate(courses by course, one position)',
+                         lambda: store.aggregate('courses', group_by=['course'], metrics=['mean:importance_score', 'count'],
+                                                 where={'position': 'AI Engineer'}),
+                         iterations=iterations, params=params)
+            self.measure('aggregate(paths by gpa_band, overall_timeline)',
+                         lambda: store.aggregate('paths', group_by=['gpa_band', 'overall_timeline']),
+                         iterations=iterations, params=params)
+
+            def sql_course_scores():
+                conn = sqlite3.connect(db.db_path)
+                conn.execute('''
+                    SELECT ic.course_name, AVG(CAST(substr(ic.importance_score, 1, instr(ic.importance_score, '/') - 1) AS REAL)),
+                           COUNT(*)
+                    FROM important_courses ic
+                    JOIN course_analyses ca ON ic.course_analysis_id = ca.id
+                    JOIN learning_paths lp ON lp.id = ca.learning_path_id
+                    WHERE lp.target_position = 'AI Engineer'
+                    GROUP BY ic.course_name
+                ''').fetchall()
+                conn.close()
+            self.measure('sql(courses by course, one position)', sql_course_scores, iterations=iterations, params=params)
+
+    def bench_parsing(self):
+        """Benchmark _clean_json_response trên các response giống thật"""
+        print("🧩 Parse response")
+        from gemini_client import GeminiClient
+        client = GeminiClient.__new__(GeminiClient)
+        rng = random.Random(7)
+
+        payload = json.dumps(sample_result('AI Engineer', rng), ensure_ascii=False, indent=2)
+        responses = {
+            'fenced_json': f"```json\n{payload}\n```",
+            'json_with_prose': f"Dưới đây là lộ trình học của bạn:\n{payload}\nChúc bạn học tốt!",
+            'plain_text': SENTENCE * 40
+        }
+        for kind, text in responses.items():
+            self.measure('_clean_json_response', lambda: client._clean_json_response(text),
+                         iterations=self.iterations * 5, params={'kind': kind, 'bytes': len(text.encode('utf-8'))})
+
+        self.measure('json.loads(cleaned)',
+                     lambda: json.loads(client._clean_json_response(responses['fenced_json'])),
+                     iterations=self.iterations * 5, params={'kind': 'fenced_json'})
+
+    def bench_prompt(self, catalog_sizes=(50, 1000, 10000)):
+        """Benchmark format danh sách môn học và tạo prompt trên catalog lớn"""
+        print("📝 Tạo prompt")
+        from gemini_client import GeminiClient
+        client = GeminiClient.__new__(GeminiClient)
+
+        for size in catalog_sizes:
+            courses = [{'name': f"Môn học số {i}", 'credits': 2 + i % 3} for i in range(size)]
+            params = {'courses': size}
+            self.measure('_format_courses_for_prompt',
+                         lambda: client._format_courses_for_prompt(courses), params=params)
+            self.measure('_build_learning_path_prompt',
+                         lambda: client._build_learning_path_prompt(
+                             'AI Engineer', 3.2, 'Thích lập trình web', 'Giỏi toán', 'Ngại giao tiếp', courses),
+                         params=params)
+
+    def bench_render(self, step_counts=(4, 20)):
+        """Benchmark dựng markdown các phần kết quả (lần đầu và khi trúng cache theo hash)"""
+        print("🖼️ Dựng phần hiển thị")
+        from result_renderer import SectionRenderer
+        rng = random.Random(11)
+
+        for steps in step_counts:
+            result = sample_result('AI Engineer', rng, steps=steps)
+            params = {'steps': steps}
+            self.measure('render_sections(uncached)',
+                         lambda: [SectionRenderer(max_entries=0).render(section, result)
+                                  for section in ('learning_path', 'course_analysis', 'skill_suggestions')],
+                         params=params)
+            renderer = SectionRenderer()
+            self.measure('render_sections(cached)',
+                         lambda: [renderer.render(section, result)
+                                  for section in ('learning_path', 'course_analysis', 'skill_suggestions')],
+                         params=params)
+
+    def bench_generation(self, tokens_per_second=20000, iterations=10):
+        """So sánh thời gian chờ của một prompt chung và ba phần gọi song song (model giả lập, độ trễ tỉ lệ số token output)"""
+        print("⚡ Tạo lộ trình (model giả lập)")
+        import gemini_client
+        from usage_tracker import estimate_tokens
+        rng = random.Random(5)
+        result = sample_result('AI Engineer', rng)
+
+        def fake_generate_text(prompt, operation, usage_context=None, max_output_tokens=None):
+            payload = result
+            if gemini_client.DECOMPOSED_GENERATION:
+                payload = {key: result[key] for key in gemini_client.RESULT_SECTIONS[operation]}
+            text = json.dumps(payload, ensure_ascii=False)
+            time.sleep(estimate_tokens(text) / tokens_per_second)
+            return text
+
+        client = gemini_client.GeminiClient.__new__(gemini_client.GeminiClient)
+        client._generate_text = fake_generate_text
+        original = gemini_client.DECOMPOSED_GENERATION
+        try:
+            for decomposed in (False, True):
+                gemini_client.DECOMPOSED_GENERATION = decomposed
+                self.measure('generate_learning_path',
+                             lambda: client._generate_learning_path_uncoalesced('AI Engineer', 3.2, 'Thích AI', 'Giỏi toán', '', [], {}),
+                             iterations=iterations,
+                             params={'mode': 'decomposed' if decomposed else 'single_prompt',
+                                     'tokens_per_second': tokens_per_second})
+        finally:
+            gemini_client.DECOMPOSED_GENERATION = original
+
+    def bench_result_model(self, count=10000):
+        """Bộ nhớ khi giữ nhiều kết quả đã nạp (dict so với LearningPathResult) và tốc độ kiểm tra/chuyển đổi"""
+        print("🧱 Mô hình kết quả")
+        import tracemalloc
+        from result_model import LearningPathResult
+        rng = random.Random(13)
+        payloads = [json.dumps(sample_result(rng.choice(POSITIONS), rng), ensure_ascii=False) for _ in range(count)]
+
+        for form, load in (('dict', json.loads), ('LearningPathResult', LearningPathResult.from_json)):
+            tracemalloc.start()
+            held = [load(payload) for payload in payloads]
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            record = {
+                'name': 'hydrated_results_memory',
+                'params': {'form': form, 'results': count},
+                'total_kb': current // 1024,
+                'bytes_per_result': current // count,
+                'peak_rss_kb': peak_rss_kb()
+            }
+            self.results.append(record)
+            print(f"  {record['name']} {record['params']}: {record['total_kb']} KB, "
+                  f"{record['bytes_per_result']} bytes/kết quả")
+            del held
+
+        data = json.loads(payloads[0])
+        result = LearningPathResult.from_dict(data)
+        self.measure('LearningPathResult.from_dict', lambda: LearningPathResult.from_dict(data),
+                     iterations=self.iterations * 5)
+        self.measure('LearningPathResult.to_dict', result.to_dict, iterations=self.iterations * 5)
+
+    def bench_loaders(self):
+        """Benchmark các hàm đọc file dữ liệu của DataProcessor"""
+        print("📂 Đọc file dữ liệu")
+        from data_processor import DataProcessor
+        self.measure('DataProcessor.load_positions', DataProcessor.load_positions)
+        self.measure('DataProcessor.load_courses', DataProcessor.load_courses)
+        self.measure('DataProcessor.load_gpa_data', DataProcessor.load_gpa_data)
+
+    def bench_startup(self, modules=('app', 'gemini_client', 'data_processor', 'database_manager',
+                                     'db_manager', 'initdb'), repeats=5):
+        """Đo thời gian import (cold start) và RSS của từng module trong tiến trình mới"""
+        print("🚀 Khởi động")
+        # ru_maxrss được kế thừa qua fork+exec (trên Linux tiến trình con báo cả đỉnh RSS của tiến trình benchmark),
+        # nên đọc VmHWM của chính tiến trình con trong /proc; chỉ dùng ru_maxrss khi không có /proc (macOS)
+        probe = (
+            "import sys, time\n"
+            "started = time.perf_counter()\n"
+            "import {module}\n"
+            "elapsed = time.perf_counter() - started\n"
+            "rss = None\n"
+            "try:\n"
+            "    with open('/proc/self/status') as status:\n"
+            "        rss = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))\n"
+            "except (OSError, StopIteration):\n"
+            "    try:\n"
+            "        import resource\n"
+            "        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "        rss = rss // 1024 if sys.platform == 'darwin' else rss\n"
+            "    except ImportError:\n"
+            "        pass\n"
+            "print(elapsed, rss, 'google.generativeai' in sys.modules, 'pandas' in sys.modules)\n"
+        )
+
+        for module in modules:
+            timings = []
+            rss_values = []
+            for _ in range(repeats):
+                output = subprocess.run([sys.executable, '-c', probe.format(module=module)],
+                                        capture_output=True, text=True, check=True).stdout.split()
+                timings.append(float(output[0]))
+                if output[1] != 'None':
+                    rss_values.append(int(output[1]))
+                loads_sdk, loads_pandas = output[2] == 'True', output[3] == 'True'
+
+            timings.sort()
+            record = {
+                'name': f"import {module}",
+                'params': {'loads_gemini_sdk': loads_sdk, 'loads_pandas': loads_pandas},
+                'iterations': repeats,
+                'ops_per_sec': None,
+                'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+                'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+                'peak_rss_kb': max(rss_values) if rss_values else None
+            }
+            self.results.append(record)
+            print(f"  {record['name']}: p50={record['p50_ms']}ms, RSS={record['peak_rss_kb']}KB, "
+                  f"SDK={loads_sdk}, pandas={loads_pandas}")
+
+    def report(self):
+        """Kết quả cùng thông tin môi trường để so sánh giữa các commit"""
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                    capture_output=True, text=True).stdout.strip() or None
+        except OSError:
+            commit = None
+
+        return {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sqlite': sqlite3.sqlite_version,
+            'results': self.results
+        }
+
+
+def main():
+    """Hàm main"""
+    parser = argparse.ArgumentParser(description="Benchmark hệ thống lộ trình học")
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help="Số lộ trình có sẵn trong database, phân tách bằng dấu phẩy")
+    parser.add_argument('--groups', default='database,writes,reads,analytics,parsing,prompt,render,generation,result_model,loaders,startup',
+                        help="Nhóm benchmark cần chạy")
+    parser.add_argument('--iterations', type=int, default=200, help="Số lần lặp mỗi benchmark")
+    parser.add_argument('--db-dir', help="Thư mục chứa database benchmark (dùng lại giữa các lần chạy)")
+    parser.add_argument('--output', help="File JSON ghi kết quả (mặc định in ra stdout)")
+    args = parser.parse_args()
+
+    groups = set(args.groups.split(','))
+
+    # Tiến trình (kể cả log của data_generator, DatabaseManager) ra stderr; stdout chỉ chứa báo cáo JSON
+    # để "python benchmark.py > report.json" cho ra file JSON hợp lệ
+    with contextlib.redirect_stdout(sys.stderr):
+        runner = BenchmarkRunner(iterations=args.iterations, db_dir=args.db_dir)
+
+        if 'database' in groups:
+            runner.bench_database([int(size) for size in args.sizes.split(',')])
+        if 'writes' in groups:
+            runner.bench_writes()
+        if 'reads' in groups:
+            runner.bench_reads()
+        if 'analytics' in groups:
+            runner.bench_analytics([int(size) for size in args.sizes.split(',')])
+        if 'parsing' in groups:
+            runner.bench_parsing()
+        if 'prompt' in groups:
+            runner.bench_prompt()
+        if 'render' in groups:
+            runner.bench_render()
+        if 'generation' in groups:
+            runner.bench_generation()
+        if 'result_model' in groups:
+            runner.bench_result_model()
+        if 'loaders' in groups:
+            runner.bench_loaders()
+        if 'startup' in groups:
+            runner.bench_startup()
+
+    report = json.dumps(runner.report(), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"✅ Đã ghi kết quả: {args.output}", file=sys.stderr)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,107 @@ GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 VI_TRI_FILE = 'data/vi_tri.csv'
 MON_HOC_FILE = 'data/danh_sach_monhoc.csv'
 GPA_FILE = 'data/GPA.txt'
+PREREQUISITES_FILE = 'data/mon_tien_quyet.csv'  # Môn tiên quyết (không bắt buộc)
+POSITION_KEYWORDS_FILE = 'data/tu_khoa_vi_tri.csv'  # Từ khóa và GPA khuyến nghị của vị trí (không bắt buộc)
 
 # Model configuration
 MODEL_NAME = 'gemini-2.0-flash'
 TEMPERATURE = 0.7
 MAX_OUTPUT_TOKENS = 2048
+
+# Tạo lộ trình bằng ba lời gọi song song (lộ trình, phân tích môn học, đề xuất kỹ năng)
+# thay vì một prompt chung; mỗi phần có ngân sách token riêng và được gọi lại riêng khi lỗi
+DECOMPOSED_GENERATION = os.getenv('DECOMPOSED_GENERATION', '1') == '1'
+SECTION_MAX_OUTPUT_TOKENS = {
+    'learning_path': 2048,
+    'course_analysis': 1024,
+    'skill_suggestions': 1024,
+}
+SECTION_MAX_ATTEMPTS = 2
+
+# Nén các cột văn bản dài trong database
+COMPRESS_TEXT_COLUMNS = True
+COMPRESSION_MIN_BYTES = 256
+COMPRESSION_LEVEL = 6
+
+# Logging và metrics
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+DEBUG_LOG_SAMPLE_RATE = float(os.getenv('DEBUG_LOG_SAMPLE_RATE', '0.05'))
+METRICS_FILE = os.getenv('METRICS_FILE', 'metrics.prom')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # 0 = không mở endpoint HTTP
+ENABLE_ADMIN_PANEL = os.getenv('ENABLE_ADMIN_PANEL', '0') == '1'
+
+# Ngân sách token theo ngày (0 = không giới hạn) và đơn giá (USD / 1 triệu token)
+DAILY_TOKEN_BUDGET = int(os.getenv('DAILY_TOKEN_BUDGET', '0'))
+STUDENT_DAILY_TOKEN_BUDGET = int(os.getenv('STUDENT_DAILY_TOKEN_BUDGET', '0'))
+PRICE_PER_MILLION_INPUT_TOKENS = 0.10
+PRICE_PER_MILLION_OUTPUT_TOKENS = 0.40
+# Ước lượng số ký tự trên một token khi API không trả về số token (văn bản tiếng Việt)
+CHARS_PER_TOKEN = 3.0
+
+# Hàng đợi tạo lộ trình chạy nền
+USE_JOB_QUEUE = os.getenv('USE_JOB_QUEUE', '1') == '1'
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # Số worker khởi động cùng ứng dụng (0 = chạy riêng bằng job_queue.py)
+JOB_MAX_ATTEMPTS = 3
+JOB_LEASE_SECONDS = 120
+JOB_POLL_INTERVAL = 1.0
+
+# Gộp các yêu cầu tạo lộ trình giống nhau đang chạy đồng thời
+COALESCE_LEASE_SECONDS = 180  # Thời gian giữ khóa tối đa của lời gọi đầu tiên
+COALESCE_RESULT_TTL = 10  # Thời gian giữ kết quả cho tiến trình đang chờ (giây)
+COALESCE_POLL_INTERVAL = 0.5
+
+# API HTTP (api_server.py)
+API_MAX_CONCURRENT_READS = int(os.getenv('API_MAX_CONCURRENT_READS', '64'))
+API_MAX_CONCURRENT_GENERATIONS = int(os.getenv('API_MAX_CONCURRENT_GENERATIONS', '4'))
+API_READ_TIMEOUT = 10  # giây
+API_GENERATE_TIMEOUT = 180  # giây, chỉ áp dụng khi không dùng hàng đợi
+API_MAX_BODY_BYTES = 64 * 1024
+
+# Cache đọc cho thống kê, lịch sử và chi tiết lộ trình (số mục tối đa mỗi tiến trình)
+READ_CACHE_MAX_ENTRIES = 1024
+
+# Số phần kết quả đã dựng sẵn (markdown) được giữ lại mỗi tiến trình
+RENDER_CACHE_MAX_ENTRIES = 256
+
+# Số sinh viên mỗi trang trong ô chọn sinh viên
+ROSTER_PAGE_SIZE = 50
+
+# Dùng lại lộ trình đã lưu cho yêu cầu gần giống (similarity_index.py)
+SIMILARITY_ENABLED = os.getenv('SIMILARITY_ENABLED', '1') == '1'
+SIMILARITY_REUSE_THRESHOLD = float(os.getenv('SIMILARITY_REUSE_THRESHOLD', '0.9'))  # Trả về luôn lộ trình đã lưu
+SIMILARITY_SEED_THRESHOLD = float(os.getenv('SIMILARITY_SEED_THRESHOLD', '0.6'))  # Dùng lộ trình đã lưu làm tham khảo
+SIMILARITY_GPA_TOLERANCE = 0.3
+SIMILARITY_SHINGLE_SIZE = 3  # Độ dài n-gram ký tự
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 16 band x 4 hàng
+
+# Ghi database qua một luồng ghi mỗi tiến trình, gom các lần lưu thành một transaction (group_commit.py)
+GROUP_COMMIT_WRITES = os.getenv('GROUP_COMMIT_WRITES', '1') == '1'
+GROUP_COMMIT_MAX_BATCH = 256  # Số thao tác tối đa mỗi transaction
+GROUP_COMMIT_MAX_DELAY = 0.002  # Thời gian chờ gom thêm thao tác (giây)
+
+# Đường đọc chỉ đọc tách khỏi đường ghi (read_snapshot.py)
+READ_POOL_MAX_IDLE = 8  # Số kết nối chỉ đọc rảnh giữ lại mỗi database
+STATISTICS_SNAPSHOT_SECONDS = float(os.getenv('STATISTICS_SNAPSHOT_SECONDS', '0'))  # Chu kỳ làm mới bản sao thống kê trong bộ nhớ (0 = đọc trực tiếp database)
+
+# Bản sao dạng cột cho thống kê theo nhóm sinh viên (analytics_store.py)
+ANALYTICS_SYNC_BATCH = 50000  # Số lộ trình mỗi segment khi đồng bộ
+ANALYTICS_MAX_SEGMENTS = 16  # Gộp các segment lại khi vượt quá số này
+ANALYTICS_SYNC_INTERVAL = 60  # API tự đồng bộ trước khi truy vấn nếu lần đồng bộ trước cũ hơn (giây)
+# Xếp loại học lực theo GPA hệ 4: (ngưỡng dưới, nhãn)
+GPA_BANDS = ((0.0, 'Yếu'), (2.0, 'Trung bình'), (2.5, 'Khá'), (3.2, 'Giỏi'), (3.6, 'Xuất sắc'))
+
+# Lộ trình mẫu dựng sẵn cho mỗi vị trí × mức GPA (path_templates.py)
+TEMPLATES_ENABLED = os.getenv('TEMPLATES_ENABLED', '1') == '1'
+TEMPLATE_WARM_WORKERS = 2  # Số tổ hợp vị trí × mức GPA tạo đồng thời khi warm-up
+
+# Xếp môn học vào các học kỳ (semester_planner.py)
+SEMESTER_CREDIT_CAP = 20  # Số tín chỉ tối đa mỗi học kỳ
+
+# Gợi ý vị trí từ sở thích/điểm mạnh/điểm yếu (position_recommender.py)
+RECOMMEND_WEAKNESS_WEIGHT = 0.5  # Trừ điểm theo mức khớp của điểm yếu với vị trí
+RECOMMEND_GPA_PENALTY = 0.1  # Trừ điểm cho mỗi điểm GPA thấp hơn GPA khuyến nghị của vị trí
+
+# So sánh lộ trình nhiều vị trí (GeminiClient.compare_positions)
+COMPARE_MAX_POSITIONS = 4  # Số vị trí tối đa mỗi lần so sánh
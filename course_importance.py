@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Mức độ quan trọng của môn học trên toàn bộ các lộ trình đã lưu
+
+Tính trên bản sao dạng cột (analytics_store.py), nơi điểm quan trọng đã được đổi sang số (thang 10)
+một lần lúc đồng bộ. Mỗi lần refresh() chỉ đồng bộ thêm các lộ trình mới lưu nên số liệu luôn
+cập nhật mà không phải đọc lại toàn bộ database.
+
+Với mỗi môn: số lộ trình chọn môn đó là môn quan trọng, tỷ lệ trên số lộ trình trong phạm vi,
+điểm quan trọng trung bình/trung vị; có thể lọc theo vị trí, xếp loại học lực và chia nhỏ theo
+vị trí hoặc xếp loại.
+
+Ví dụ:
+    python course_importance.py
+    python course_importance.py --position "AI Engineer" --gpa-band Giỏi
+    python course_importance.py --by gpa_band --course "Cơ sở dữ liệu"
+"""
+
+import argparse
+import time
+
+from analytics_store import AnalyticsStore
+
+BREAKDOWNS = ('position', 'gpa_band')
+
+
+class CourseImportance:
+    """Thống kê mức độ quan trọng của môn học theo nhóm sinh viên"""
+
+    def __init__(self, store):
+        """
+        Args:
+            store (AnalyticsStore): Bản sao dạng cột của database
+        """
+        self.store = store
+
+    def refresh(self):
+        """Đồng bộ các lộ trình mới lưu vào bản sao, trả về số lộ trình đã thêm"""
+        return self.store.sync()
+
+    @staticmethod
+    def _where(position=None, gpa_band=None):
+        where = {}
+        if position:
+            where['position'] = position
+        if gpa_band:
+            where['gpa_band'] = gpa_band
+        return where
+
+    def positions(self):
+        """Các vị trí đã có lộ trình, nhiều lộ trình trước"""
+        return [row['position'] for row in self.store.aggregate('paths', group_by=['position'], metrics=['count'])]
+
+    def total_paths(self, position=None, gpa_band=None):
+        """Số lộ trình trong phạm vi lọc"""
+        rows = self.store.aggregate('paths', metrics=['count'], where=self._where(position, gpa_band))
+        return rows[0]['count'] if rows else 0
+
+    def top_courses(self, position=None, gpa_band=None, limit=10, order_by='paths'):
+        """
+        Các môn được chọn là môn quan trọng nhiều nhất
+
+        Args:
+            position (str): Chỉ tính lộ trình của vị trí này
+            gpa_band (str): Chỉ tính sinh viên thuộc xếp loại này (nhãn trong GPA_BANDS hoặc 'Không rõ')
+            limit (int): Số môn tối đa
+            order_by (str): 'paths' (số lộ trình) hoặc 'mean_score'
+
+        Returns:
+            list: {'course', 'paths', 'share', 'mean_score', 'median_score'} với share là % số lộ trình trong phạm vi
+        """
+        where = self._where(position, gpa_band)
+        return self._course_rows(['course'], where, self.total_paths(position, gpa_band), order_by, limit)
+
+    def breakdown(self, course, by='position', position=None, gpa_band=None):
+        """
+        Thống kê một môn chia theo vị trí hoặc xếp loại học lực
+
+        Returns:
+            list: {by, 'paths', 'share', 'mean_score', 'median_score'} với share là % số lộ trình của nhóm đó
+        """
+        if by not in BREAKDOWNS:
+            raise ValueError(f"Không hỗ trợ chia theo: {by}")
+        where = self._where(position, gpa_band)
+        totals = {row[by]: row['count'] for row in self.store.aggregate('paths', group_by=[by], metrics=['count'], where=where)}
+        where['course'] = course
+        return self._course_rows([by], where, totals, 'paths', None)
+
+    def _course_rows(self, group_by, where, totals, order_by, limit):
+        """Gọi aggregate trên bảng courses và tính tỷ lệ trên tổng số lộ trình (một số hoặc dict theo nhóm)"""
+        sort_metric = {'paths': 'distinct_paths', 'mean_score': 'mean:importance_score'}.get(order_by)
+        if sort_metric is None:
+            raise ValueError(f"Không sắp xếp được theo: {order_by}")
+        rows = self.store.aggregate('courses', group_by=group_by,
+                                    metrics=['distinct_paths', 'mean:importance_score', 'median:importance_score'],
+                                    where=where, order_by=sort_metric, limit=limit)
+        result = []
+        for row in rows:
+            total = totals.get(row[group_by[0]], 0) if isinstance(totals, dict) else totals
+            result.append({
+                group_by[0]: row[group_by[0]],
+                'paths': row['distinct_paths'],
+                'share': round(row['distinct_paths'] * 100 / total, 1) if total else None,
+                'mean_score': row['mean:importance_score'],
+                'median_score': row['median:importance_score'],
+            })
+        return result
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+    from database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Mức độ quan trọng của môn học trên các lộ trình đã lưu")
+    parser.add_argument('--db', default='learning_paths.db', help="Đường dẫn database")
+    parser.add_argument('--position', help="Chỉ tính lộ trình của vị trí này")
+    parser.add_argument('--gpa-band', help="Chỉ tính sinh viên thuộc xếp loại này")
+    parser.add_argument('--course', help="Chia nhỏ thống kê của môn này (dùng với --by)")
+    parser.add_argument('--by', choices=BREAKDOWNS, default='position', help="Chia nhỏ theo vị trí hoặc xếp loại")
+    parser.add_argument('--order-by', choices=('paths', 'mean_score'), default='paths')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = CourseImportance(AnalyticsStore(DatabaseManager(args.db)))
+    started = time.perf_counter()
+    added = engine.refresh()
+    print(f"🔄 Đồng bộ thêm {added} lộ trình ({(time.perf_counter() - started) * 1000:.0f}ms)")
+
+    started = time.perf_counter()
+    if args.course:
+        rows = engine.breakdown(args.course, by=args.by, position=args.position, gpa_band=args.gpa_band)
+    else:
+        rows = engine.top_courses(position=args.position, gpa_band=args.gpa_band, limit=args.limit, order_by=args.order_by)
+    if rows:
+        print(tabulate(rows, headers='keys'))
+    else:
+        print("📊 Không có dữ liệu phù hợp")
+    print(f"⏱️ {(time.perf_counter() - started) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
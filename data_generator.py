@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Script sinh dữ liệu tổng hợp với khối lượng lớn để tái hiện tải thực tế
+
+Ví dụ:
+    python data_generator.py --paths 1000000 --seed 42 --db learning_paths.db
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import sqlite3
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from config import VI_TRI_FILE, MON_HOC_FILE, GPA_FILE
+from database_manager import CACHE_SCOPE_ALL, DatabaseManager, bump_cache_versions, compress_text
+from numeric_fields import parse_credits, parse_score, parse_timeline
+
+# Ngân hàng câu tiếng Việt để ghép thành các đoạn văn có độ dài giống response thật
+SENTENCES = [
+    "Vị trí này đòi hỏi nền tảng vững chắc về lập trình và tư duy giải quyết vấn đề.",
+    "Sinh viên nên bắt đầu từ các kiến thức cơ bản trước khi chuyển sang các chủ đề nâng cao.",
+    "Việc thực hành thường xuyên qua các dự án thực tế giúp củng cố kiến thức đã học.",
+    "Hãy tận dụng điểm mạnh về tư duy logic để tiếp cận các bài toán phức tạp.",
+    "Cần cải thiện kỹ năng giao tiếp và làm việc nhóm để đáp ứng yêu cầu của doanh nghiệp.",
+    "Tham gia các cộng đồng lập trình và cuộc thi giúp mở rộng mối quan hệ nghề nghiệp.",
+    "Xây dựng portfolio với các dự án cá nhân là yếu tố quan trọng khi ứng tuyển.",
+    "Kiến thức về cơ sở dữ liệu và hệ thống là nền tảng cho hầu hết các vị trí CNTT.",
+    "Nên dành thời gian học tiếng Anh chuyên ngành để đọc tài liệu kỹ thuật.",
+    "Môn học này cung cấp kiến thức cốt lõi cho các môn chuyên ngành ở học kỳ sau.",
+    "Kết hợp học lý thuyết với làm bài tập lớn giúp hiểu sâu bản chất vấn đề.",
+    "Thị trường tuyển dụng hiện nay đánh giá cao ứng viên có kinh nghiệm thực tế.",
+]
+
+DIFFICULTY_LEVELS = ['Cơ bản', 'Trung cấp', 'Nâng cao', 'Chuyên sâu']
+SKILL_TYPES = ['strength_based', 'weakness_improvement', 'career_expansion']
+SKILL_NAMES = [
+    'Tư duy phản biện', 'Giao tiếp', 'Làm việc nhóm', 'Quản lý thời gian', 'Lập trình Python',
+    'Phân tích dữ liệu', 'Thiết kế hệ thống', 'Kiểm thử phần mềm', 'Điện toán đám mây', 'Bảo mật',
+    'Tiếng Anh chuyên ngành', 'Quản lý dự án', 'DevOps', 'Học máy', 'Thiết kế giao diện'
+]
+PREFERENCES = [
+    'Thích lập trình web', 'Quan tâm đến trí tuệ nhân tạo', 'Muốn làm việc với dữ liệu',
+    'Thích phát triển ứng dụng di động', 'Quan tâm đến bảo mật hệ thống', 'Thích kiểm thử phần mềm'
+]
+HO = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Vũ', 'Đặng', 'Bùi', 'Đỗ', 'Ngô']
+DEM = ['Văn', 'Thị', 'Đức', 'Minh', 'Thu', 'Hoàng', 'Quốc', 'Thanh']
+TEN = ['Anh', 'Bình', 'Chi', 'Dũng', 'Giang', 'Hà', 'Hùng', 'Lan', 'Long', 'Mai', 'Nam', 'Phương', 'Quân', 'Trang']
+
+
+class SyntheticDataGenerator:
+    """Sinh dữ liệu sinh viên và lộ trình học tổng hợp, ghi bằng bulk insert"""
+
+    # Số đoạn văn sinh sẵn cho mỗi độ dài, chọn ngẫu nhiên từ pool thay vì ghép câu cho từng dòng
+    PARAGRAPH_POOL_SIZE = 2048
+
+    def __init__(self, db_path="learning_paths.db", seed=42, batch_size=20000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self._pools = {}
+
+        # Đảm bảo schema đã được tạo
+        DatabaseManager(db_path)
+
+        self.positions = self._load_column(VI_TRI_FILE, 'Tên vi trí')
+        self.courses = [
+            (row['Tên môn học'], row['Số tín chỉ'])
+            for row in self._load_rows(MON_HOC_FILE)
+        ]
+        gpas = [float(row['TBCHT H4']) for row in self._load_rows(GPA_FILE, delimiter='\t') if row['TBCHT H4']]
+        self.gpa_mean = statistics.mean(gpas) if gpas else 3.0
+        self.gpa_stdev = statistics.pstdev(gpas) if len(gpas) > 1 else 0.4
+
+        # Độ phổ biến của vị trí theo phân phối Zipf
+        weights = [1 / (rank + 1) for rank in range(len(self.positions))]
+        self.position_weights = self.rng.sample(weights, len(weights))
+
+    @staticmethod
+    def _load_rows(file_path, delimiter=','):
+        """Đọc file CSV/TSV thành danh sách dict"""
+        with open(file_path, encoding='utf-8-sig', newline='') as f:
+            return list(csv.DictReader(f, delimiter=delimiter))
+
+    def _load_column(self, file_path, column):
+        """Đọc một cột từ file CSV"""
+        return [row[column] for row in self._load_rows(file_path) if row[column]]
+
+    def _paragraph(self, mean_sentences, compressed=False):
+        """Lấy đoạn văn có số câu theo phân phối log-normal (dạng nén nếu cột được nén)"""
+        key = (mean_sentences, compressed)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = []
+            for _ in range(self.PARAGRAPH_POOL_SIZE):
+                count = max(1, int(self.rng.lognormvariate(math.log(mean_sentences), 0.4)))
+                text = ' '.join(self.rng.choices(SENTENCES, k=count))
+                pool.append(compress_text(text) if compressed else text)
+            self._pools[key] = pool
+        return self.rng.choice(pool)
+
+    def _gpa(self):
+        """Sinh GPA theo phân phối chuẩn của dữ liệu thật"""
+        gpa = self.rng.gauss(self.gpa_mean, self.gpa_stdev)
+        return round(min(4.0, max(1.0, gpa)), 1)
+
+    def _paths_per_student(self):
+        """Số lộ trình của một sinh viên theo phân phối hình học (trung bình ~1.7)"""
+        count = 1
+        while count < 10 and self.rng.random() < 0.4:
+            count += 1
+        return count
+
+    def _next_ids(self, cursor):
+        """ID tiếp theo cho từng bảng để ghép dữ liệu mới vào database có sẵn"""
+        ids = {}
+        for table in ('students', 'learning_paths', 'learning_steps', 'course_analyses',
+                      'important_courses', 'skill_suggestions'):
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+            ids[table] = cursor.fetchone()[0] + 1
+        return ids
+
+    def generate(self, paths=1000000):
+        """Sinh `paths` lộ trình học (kèm sinh viên, bước học, môn học, kỹ năng)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # Tắt đồng bộ đĩa trong lúc nạp dữ liệu lớn
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -200000')
+
+        ids = self._next_ids(cursor)
+        rows = {table: [] for table in ids}
+        now = datetime.now()
+        started = time.perf_counter()
+        generated = 0
+
+        try:
+            while generated < paths:
+                student_id = ids['students']
+                ids['students'] += 1
+                gpa = self._gpa()
+                name = f"{self.rng.choice(HO)} {self.rng.choice(DEM)} {self.rng.choice(TEN)}"
+                rows['students'].append((student_id, f"{1600000000 + student_id}", name, gpa))
+
+                for _ in range(min(self._paths_per_student(), paths - generated)):
+                    self._generate_path(ids, rows, student_id, gpa, now)
+                    generated += 1
+
+                if len(rows['learning_paths']) >= self.batch_size:
+                    self._flush(cursor, rows)
+                    bump_cache_versions(cursor, [CACHE_SCOPE_ALL])
+                    conn.commit()
+                    elapsed = time.perf_counter() - started
+                    print(f"  📝 {generated}/{paths} lộ trình ({generated / elapsed:.0f}/s)")
+
+            self._flush(cursor, rows)
+            # Dữ liệu nạp thẳng bằng SQL: báo cho cache thống kê, cache theo sinh viên và AnalyticsStore làm mới
+            bump_cache_versions(cursor, [CACHE_SCOPE_ALL])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Lỗi khi sinh dữ liệu: {e}")
+            raise e
+        finally:
+            conn.close()
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ Đã sinh {generated} lộ trình trong {elapsed:.1f}s")
+        return generated
+
+    def _generate_path(self, ids, rows, student_id, gpa, now):
+        """Sinh một lộ trình học và các bản ghi con"""
+        path_id = ids['learning_paths']
+        ids['learning_paths'] += 1
+        position = self.rng.choices(self.positions, weights=self.position_weights)[0]
+        created_at = now - timedelta(seconds=self.rng.randint(0, 365 * 24 * 3600))
+        min_months = self.rng.randint(6, 12)
+
+        path = (
+            path_id, student_id, position,
+            ', '.join(self.rng.sample(PREFERENCES, self.rng.randint(1, 3))),
+            self._paragraph(1), self._paragraph(1),
+            self._paragraph(6, compressed=True),
+            f"{min_months}-{min_months + self.rng.randint(3, 12)} tháng",
+            self._paragraph(4, compressed=True),
+            created_at.strftime('%Y-%m-%d %H:%M:%S')
+        )
+        # Cột số của thời gian/điểm/tín chỉ nối vào cuối mỗi dòng, dữ liệu sinh ra theo seed không đổi
+        rows['learning_paths'].append(path + parse_timeline(path[7]))
+
+        for order in range(1, self.rng.randint(3, 6) + 1):
+            step_min = self.rng.randint(1, 4)
+            step = (
+                ids['learning_steps'], path_id, order,
+                f"Lĩnh vực {self.rng.choice(SKILL_NAMES)}",
+                DIFFICULTY_LEVELS[min(order - 1, len(DIFFICULTY_LEVELS) - 1)],
+                f"{step_min}-{step_min + self.rng.randint(1, 4)} tháng",
+                json.dumps(self.rng.sample(SKILL_NAMES, self.rng.randint(2, 5)), ensure_ascii=False),
+                json.dumps([f"Khóa học {self.rng.randint(1, 500)}" for _ in range(self.rng.randint(2, 4))],
+                           ensure_ascii=False)
+            )
+            rows['learning_steps'].append(step + parse_timeline(step[5]))
+            ids['learning_steps'] += 1
+
+        analysis_id = ids['course_analyses']
+        ids['course_analyses'] += 1
+        rows['course_analyses'].append((
+            analysis_id, path_id, self._paragraph(4, compressed=True), self._paragraph(2)
+        ))
+
+        for course_name, credits in self.rng.sample(self.courses, min(5, len(self.courses))):
+            score = min(10, max(1, int(self.rng.gauss(8, 1.2))))
+            course = (
+                ids['important_courses'], analysis_id, course_name, credits, f"{score}/10",
+                self._paragraph(1), self._paragraph(1)
+            )
+            rows['important_courses'].append(course + (parse_credits(credits),) + parse_score(course[4]))
+            ids['important_courses'] += 1
+
+        for skill_type in SKILL_TYPES:
+            for skill_name in self.rng.sample(SKILL_NAMES, self.rng.randint(1, 3)):
+                rows['skill_suggestions'].append((
+                    ids['skill_suggestions'], path_id, skill_type, skill_name,
+                    self._paragraph(1), self._paragraph(1), self._paragraph(1)
+                ))
+                ids['skill_suggestions'] += 1
+
+    def _flush(self, cursor, rows):
+        """Ghi các bản ghi đang chờ bằng executemany"""
+        cursor.executemany('''
+            INSERT INTO students (id, student_code, student_name, gpa) VALUES (?, ?, ?, ?)
+        ''', rows['students'])
+        cursor.executemany('''
+            INSERT INTO learning_paths
+            (id, student_id, target_position, preferences, strengths, weaknesses,
+             analysis, overall_timeline, recommendations, created_at, timeline_min_months, timeline_max_months)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows['learning_paths'])
+        cursor.executemany('''
+            INSERT INTO learning_steps
+            (id, learning_path_id, step_order, domain, difficulty_level, timeline, skills, resources,
+             timeline_min_months, timeline_max_months)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows['learning_steps'])
+        cursor.executemany('''
+            INSERT INTO course_analyses (id, learning_path_id, analysis_summary, general_recommendations)
+            VALUES (?, ?, ?, ?)
+        ''', rows['course_analyses'])
+        cursor.executemany('''
+            INSERT INTO important_courses
+            (id, course_analysis_id, course_name, credits, importance_score, reason, study_tips,
+             credits_value, score_numerator, score_denominator)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows['important_courses'])
+        cursor.executemany('''
+            INSERT INTO skill_suggestions
+            (id, learning_path_id, skill_type, skill_name, reason, benefit, learning_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows['skill_suggestions'])
+
+        for table_rows in rows.values():
+            table_rows.clear()
+
+
+def main():
+    """Hàm main"""
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu tổng hợp cho database lộ trình học")
+    parser.add_argument('--paths', type=int, default=1000000, help="Số lộ trình học cần sinh")
+    parser.add_argument('--seed', type=int, default=42, help="Seed để tái lập dữ liệu")
+    parser.add_argument('--db', default='learning_paths.db', help="Đường dẫn database")
+    parser.add_argument('--batch-size', type=int, default=20000, help="Số lộ trình mỗi transaction")
+    args = parser.parse_args()
+
+    print(f"🚀 Sinh {args.paths} lộ trình vào {args.db} (seed={args.seed})")
+    generator = SyntheticDataGenerator(args.db, seed=args.seed, batch_size=args.batch_size)
+    generator.generate(args.paths)
+
+
+if __name__ == "__main__":
+    main()
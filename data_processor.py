@@ -0,0 +1,110 @@
+"""
+Đọc dữ liệu vị trí, môn học và GPA từ các file CSV/TXT (không phụ thuộc pandas)
+"""
+
+import csv
+import logging
+import os
+from functools import lru_cache
+
+from config import VI_TRI_FILE, MON_HOC_FILE, GPA_FILE, PREREQUISITES_FILE, POSITION_KEYWORDS_FILE
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=32)
+def _read_rows(file_path, delimiter, mtime):
+    """Đọc file thành tuple các dict, cache theo thời điểm sửa file"""
+    with open(file_path, encoding='utf-8-sig', newline='') as f:
+        return tuple(csv.DictReader(f, delimiter=delimiter))
+
+
+def read_rows(file_path, delimiter=','):
+    """Đọc file CSV/TSV, chỉ đọc lại từ đĩa khi file thay đổi"""
+    return _read_rows(file_path, delimiter, os.path.getmtime(file_path))
+
+
+def _to_number(value, number_type):
+    """Chuyển chuỗi sang số, trả về None nếu rỗng hoặc không hợp lệ"""
+    try:
+        return number_type(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DataProcessor:
+    """Xử lý dữ liệu từ các file CSV và TXT"""
+
+    @staticmethod
+    def load_positions():
+        """Đọc danh sách vị trí từ file CSV"""
+        try:
+            return [row['Tên vi trí'] for row in read_rows(VI_TRI_FILE) if row['Tên vi trí']]
+        except Exception as e:
+            logger.error("Lỗi khi đọc file vị trí: %s", e)
+            return []
+
+    @staticmethod
+    def load_courses():
+        """Đọc danh sách môn học từ file CSV"""
+        try:
+            courses = []
+            for row in read_rows(MON_HOC_FILE):
+                credits = row['Số tín chỉ']
+                courses.append({
+                    'name': row['Tên môn học'],
+                    'credits': _to_number(credits, int) if credits.isdigit() else credits
+                })
+            return courses
+        except Exception as e:
+            logger.error("Lỗi khi đọc file môn học: %s", e)
+            return []
+
+    @staticmethod
+    def load_prerequisites():
+        """Đọc các cặp (môn học, môn tiên quyết) từ file CSV, không có file thì không có ràng buộc"""
+        if not os.path.exists(PREREQUISITES_FILE):
+            return []
+        try:
+            return [
+                (row['Tên môn học'], row['Môn tiên quyết'])
+                for row in read_rows(PREREQUISITES_FILE)
+                if row['Tên môn học'] and row['Môn tiên quyết']
+            ]
+        except Exception as e:
+            logger.error("Lỗi khi đọc file môn tiên quyết: %s", e)
+            return []
+
+    @staticmethod
+    def load_position_keywords():
+        """Đọc {vị trí: {'keywords': [...], 'gpa': GPA khuyến nghị hoặc None}}, không có file thì rỗng"""
+        if not os.path.exists(POSITION_KEYWORDS_FILE):
+            return {}
+        try:
+            return {
+                row['Tên vi trí']: {
+                    'keywords': [keyword.strip() for keyword in (row['Từ khóa'] or '').split(';') if keyword.strip()],
+                    'gpa': _to_number(row.get('GPA khuyến nghị'), float)
+                }
+                for row in read_rows(POSITION_KEYWORDS_FILE)
+                if row['Tên vi trí']
+            }
+        except Exception as e:
+            logger.error("Lỗi khi đọc file từ khóa vị trí: %s", e)
+            return {}
+
+    @staticmethod
+    def load_gpa_data():
+        """Đọc dữ liệu GPA từ file TXT (mỗi dòng là dict theo tên cột, GPA rỗng là None)"""
+        try:
+            return [
+                {
+                    'Mã SV': row['Mã SV'],
+                    'Họ và tên': row['Họ và tên'],
+                    'TBCHT H4': _to_number(row['TBCHT H4'], float)
+                }
+                for row in read_rows(GPA_FILE, delimiter='\t')
+            ]
+        except Exception as e:
+            logger.error("Lỗi khi đọc file GPA: %s", e)
+            return []
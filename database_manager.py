@@ -1,20 +1,139 @@
 import sqlite3
 import json
+import struct
+import zlib
 from datetime import datetime
 import os
+from config import COMPRESS_TEXT_COLUMNS, COMPRESSION_MIN_BYTES, COMPRESSION_LEVEL
+from group_commit import get_writer
+from job_queue import complete_in_transaction
+from numeric_fields import NUMERIC_COLUMNS, numeric_values, parse_credits, parse_score, parse_timeline
+from read_snapshot import ReadConnectionPool, StatisticsSnapshot
+from result_model import CourseAnalysis, LearningPathResult, SkillSuggestions
+from similarity_index import create_tables as create_similarity_tables, index_learning_path
+
+# Các cột văn bản dài được nén khi ghi (bảng -> danh sách cột)
+COMPRESSED_COLUMNS = {
+    'learning_paths': ('analysis', 'recommendations', 'raw_response'),
+    'course_analyses': ('analysis_summary',),
+}
+
+# Header của giá trị nén: 1 byte phiên bản + 4 byte độ dài văn bản gốc
+_COMPRESSION_VERSION = 1
+_HEADER = struct.Struct('>BI')
+
+# Từ điển nén dựng sẵn từ các cụm từ hay gặp trong kết quả của model.
+# KHÔNG được sửa nội dung khi đã có dữ liệu phiên bản 1 trong database,
+# nếu cần đổi thì thêm từ điển mới với phiên bản mới.
+_ZDICT_V1 = (
+    "Lộ trình học tập cá nhân hóa cho vị trí mục tiêu. "
+    "Sinh viên cần tập trung vào kiến thức nền tảng, kỹ năng chuyên môn và thực hành dự án thực tế. "
+    "Phân tích về vị trí này: đòi hỏi kiến thức về lập trình, cơ sở dữ liệu, thuật toán, "
+    "trí tuệ nhân tạo, học máy, phát triển web, phân tích dữ liệu, hệ thống, bảo mật. "
+    "Lời khuyên: Hãy học tập có hệ thống và thực hành thường xuyên. "
+    "Tận dụng điểm mạnh của bạn, cải thiện điểm yếu, mở rộng cơ hội nghề nghiệp. "
+    "Môn học quan trọng cho nền tảng CNTT. Nên tập trung học kỹ và thực hành nhiều. "
+    "Phân tích dựa trên tầm quan trọng của các môn học. tháng, tín chỉ, khóa học trực tuyến, "
+    "tài liệu học tập, dự án thực tế, tham gia cộng đồng, xây dựng portfolio. "
+).encode('utf-8')
+
+
+def compress_text(value):
+    """Nén văn bản để lưu vào database (trả về bytes, hoặc giữ nguyên nếu không đáng nén)"""
+    if not COMPRESS_TEXT_COLUMNS or not isinstance(value, str):
+        return value
+    
+    raw = value.encode('utf-8')
+    if len(raw) < COMPRESSION_MIN_BYTES:
+        return value
+    
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=_ZDICT_V1)
+    packed = _HEADER.pack(_COMPRESSION_VERSION, len(raw)) + compressor.compress(raw) + compressor.flush()
+    
+    # Chỉ lưu dạng nén nếu thực sự nhỏ hơn
+    return packed if len(packed) < len(raw) else value
+
+
+def decompress_text(value):
+    """Giải nén giá trị đọc từ database (văn bản chưa nén được trả về nguyên trạng)"""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    
+    value = bytes(value)
+    version, _ = _HEADER.unpack_from(value)
+    if version != _COMPRESSION_VERSION:
+        raise ValueError(f"Không hỗ trợ phiên bản nén: {version}")
+    
+    decompressor = zlib.decompressobj(zdict=_ZDICT_V1)
+    raw = decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()
+    return raw.decode('utf-8')
+
+
+# Các khóa thuộc kết quả lộ trình (phần còn lại của chi tiết là thông tin sinh viên/bản ghi)
+RESULT_KEYS = ('target_position', 'analysis', 'learning_path', 'overall_timeline',
+               'recommendations', 'skill_suggestions', 'course_analysis')
+
+
+def details_to_result(details):
+    """Chuyển chi tiết lộ trình đọc từ database về cấu trúc kết quả của GeminiClient"""
+    if details is None:
+        return None
+    return {key: details[key] for key in RESULT_KEYS if key in details}
+
+
+# Phạm vi phiên bản cho cache đọc (read_model_cache.py): mỗi lần ghi tăng phiên bản
+# của các phạm vi bị ảnh hưởng trong cùng transaction, cache chỉ đọc lại phạm vi đã đổi
+CACHE_SCOPE_ALL = 'all'
+CACHE_SCOPE_STATISTICS = 'statistics'
+
+
+def student_cache_scope(student_name):
+    """Phạm vi cache của lịch sử một sinh viên"""
+    return f"student:{student_name}"
+
+
+def bump_cache_versions(cursor, scopes):
+    """Tăng phiên bản của các phạm vi cache (gọi trước khi commit transaction ghi)"""
+    cursor.executemany('''
+        INSERT INTO cache_versions (scope, version) VALUES (?, 1)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1
+    ''', [(scope,) for scope in scopes])
+
 
 class DatabaseManager:
     """Quản lý cơ sở dữ liệu SQLite để lưu trữ kết quả lộ trình học"""
     
-    def __init__(self, db_path="learning_paths.db"):
+    def __init__(self, db_path="learning_paths.db", group_commit=False, statistics_snapshot_seconds=0):
+        """
+        Args:
+            db_path (str): Đường dẫn database
+            group_commit (bool): Ghi qua luồng ghi dùng chung của tiến trình (group_commit.py)
+                thay vì mỗi lần lưu mở một kết nối và transaction riêng
+            statistics_snapshot_seconds (float): > 0 thì get_statistics đọc từ bản sao trong bộ nhớ
+                được làm mới sau mỗi khoảng thời gian này (read_snapshot.py)
+        """
         self.db_path = db_path
         self.init_database()
+        self.writer = get_writer(db_path) if group_commit else None
+        # Các hàm đọc dùng kết nối chỉ đọc riêng, không tranh chấp với kết nối ghi
+        self.reads = ReadConnectionPool(db_path)
+        self.statistics_snapshot = (StatisticsSnapshot(db_path, statistics_snapshot_seconds).start()
+                                    if statistics_snapshot_seconds > 0 else None)
+    
+    def close(self):
+        """Đóng các kết nối đọc và dừng làm mới bản sao thống kê"""
+        if self.statistics_snapshot:
+            self.statistics_snapshot.stop()
+        self.reads.close()
     
     def init_database(self):
         """Khởi tạo cơ sở dữ liệu và tạo các bảng"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # WAL: người đọc đọc snapshot đã commit, không bị chặn bởi transaction ghi đang chạy
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         # Bảng sinh viên
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS students (
@@ -38,7 +157,10 @@ class DatabaseManager:
                 weaknesses TEXT,
                 analysis TEXT,
                 overall_timeline TEXT,
+                timeline_min_months REAL, -- overall_timeline quy ra tháng (numeric_fields.py)
+                timeline_max_months REAL,
                 recommendations TEXT,
+                raw_response TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (student_id) REFERENCES students (id)
             )
@@ -53,6 +175,8 @@ class DatabaseManager:
                 domain TEXT NOT NULL,
                 difficulty_level TEXT,
                 timeline TEXT,
+                timeline_min_months REAL, -- timeline quy ra tháng
+                timeline_max_months REAL,
                 skills TEXT, -- JSON array
                 resources TEXT, -- JSON array
                 FOREIGN KEY (learning_path_id) REFERENCES learning_paths (id)
@@ -78,6 +202,9 @@ class DatabaseManager:
                 course_name TEXT NOT NULL,
                 credits TEXT,
                 importance_score TEXT,
+                credits_value REAL, -- số tín chỉ đọc từ credits
+                score_numerator REAL, -- importance_score "8/10" -> 8, 10
+                score_denominator REAL,
                 reason TEXT,
                 study_tips TEXT,
                 FOREIGN KEY (course_analysis_id) REFERENCES course_analyses (id)
@@ -111,33 +238,104 @@ class DatabaseManager:
             )
         ''')
         
+        # Bảng thống kê sử dụng model (token, độ trễ, trạng thái cache)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS model_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_name TEXT,
+                target_position TEXT,
+                operation TEXT NOT NULL, -- 'learning_path', 'course_analysis', 'skill_suggestions'
+                model_name TEXT,
+                prompt_tokens INTEGER DEFAULT 0,
+                output_tokens INTEGER DEFAULT 0,
+                latency_ms REAL,
+                cache_status TEXT NOT NULL, -- 'miss', 'budget_cached', 'budget_local', 'coalesced', 'similar', 'template'
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_model_usage_created ON model_usage(created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_model_usage_student ON model_usage(student_name, created_at)')
+        
+        # Bảng phiên bản dữ liệu để vô hiệu hóa cache đọc đúng lúc có ghi
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                scope TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        
+        # Chỉ mục tương tự của thông tin đầu vào và nhật ký dùng lại lộ trình
+        create_similarity_tables(cursor)
+        
+        # Lộ trình mẫu dựng sẵn theo vị trí × mức GPA × phiên bản danh sách môn học (path_templates.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS path_templates (
+                target_position TEXT NOT NULL,
+                gpa_band TEXT NOT NULL,
+                catalog_version TEXT NOT NULL,
+                result BLOB NOT NULL, -- JSON kết quả, nén bằng compress_text
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (target_position, gpa_band, catalog_version)
+            )
+        ''')
+        
+        # Bổ sung các cột mới cho database tạo từ phiên bản cũ
+        self._ensure_column(cursor, 'learning_paths', 'raw_response', 'TEXT')
+        
+        # Cột số đọc từ các trường văn bản; database cũ được điền giá trị ngay sau khi thêm cột
+        added_numeric_columns = False
+        for table, sources in NUMERIC_COLUMNS.items():
+            for columns, _ in sources.values():
+                for column in columns:
+                    added_numeric_columns |= self._ensure_column(cursor, table, column, 'REAL')
+        
+        # Chỉ mục cho các truy vấn đọc (lịch sử, chi tiết, lộ trình gần nhất theo vị trí)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_name ON students(student_name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_paths_student ON learning_paths(student_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_paths_position ON learning_paths(target_position, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_steps_path ON learning_steps(learning_path_id, step_order)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_course_analyses_path ON course_analyses(learning_path_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_important_courses_analysis ON important_courses(course_analysis_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_skill_suggestions_path ON skill_suggestions(learning_path_id)')
+        
+        # Chỉ mục trên cột số: lọc/sắp xếp theo thời gian hoàn thành, tổng hợp điểm theo môn chỉ đọc chỉ mục
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_paths_timeline ON learning_paths(timeline_max_months, timeline_min_months)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_learning_paths_position_timeline ON learning_paths(target_position, timeline_max_months)')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_important_courses_score
+            ON important_courses(course_name, score_numerator, score_denominator, credits_value)
+        ''')
+        
         conn.commit()
         conn.close()
+        
+        if added_numeric_columns:
+            self.backfill_numeric_columns()
     
-    def save_learning_path(self, student_data, result):
-        """Lưu kết quả lộ trình học vào database"""
+    def _ensure_column(self, cursor, table, column, column_type):
+        """Thêm cột vào bảng nếu chưa có, trả về True nếu vừa thêm"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            return True
+        return False
+    
+    def save_learning_path(self, student_data, result, job_lease=None):
+        """Lưu kết quả lộ trình học vào database (result là dict hoặc LearningPathResult), trả về id lộ trình
+        
+        job_lease (job_id, worker_id): lộ trình của job trong hàng đợi, job được đánh dấu hoàn thành trong cùng
+        transaction; worker đã mất lease thì không lưu gì (LeaseLostError)
+        """
+        # Kiểm tra cấu trúc trước khi ghi, các bước lưu bên dưới dùng thuộc tính có kiểu thay vì dò dict
+        result = LearningPathResult.from_dict(result)
+        if self.writer:
+            return self.writer.submit(self._write_learning_path, student_data, result, job_lease).result()
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         try:
-            # Lưu thông tin sinh viên
-            student_id = self._save_student(cursor, student_data)
-            
-            # Lưu lộ trình học chính
-            learning_path_id = self._save_learning_path(cursor, student_id, student_data, result)
-            
-            # Lưu các bước học
-            self._save_learning_steps(cursor, learning_path_id, result.get('learning_path', []))
-            
-            # Lưu phân tích môn học
-            course_analysis_id = self._save_course_analysis(cursor, learning_path_id, result.get('course_analysis', {}))
-            
-            # Lưu các môn học quan trọng
-            self._save_important_courses(cursor, course_analysis_id, result.get('course_analysis', {}).get('important_courses', []))
-            
-            # Lưu đề xuất kỹ năng
-            self._save_skill_suggestions(cursor, learning_path_id, result.get('skill_suggestions', {}))
-            
+            learning_path_id = self._write_learning_path(cursor, student_data, result, job_lease)
             conn.commit()
             return learning_path_id
             
@@ -147,17 +345,66 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def _write_learning_path(self, cursor, student_data, result, job_lease=None):
+        """Ghi lộ trình trong transaction đang mở (không commit), trả về id lộ trình"""
+        # Lưu thông tin sinh viên
+        student_id = self._save_student(cursor, student_data)
+        
+        # Lưu lộ trình học chính
+        learning_path_id = self._save_learning_path(cursor, student_id, student_data, result)
+        
+        # Lưu các bước học
+        self._save_learning_steps(cursor, learning_path_id, result.learning_path)
+        
+        # Lưu phân tích môn học
+        course_analysis = result.course_analysis or CourseAnalysis()
+        course_analysis_id = self._save_course_analysis(cursor, learning_path_id, course_analysis)
+        
+        # Lưu các môn học quan trọng
+        self._save_important_courses(cursor, course_analysis_id, course_analysis.important_courses)
+        
+        # Lưu đề xuất kỹ năng
+        if result.skill_suggestions:
+            self._save_skill_suggestions(cursor, learning_path_id, result.skill_suggestions)
+        
+        # Chỉ đánh chỉ mục lộ trình do model tạo cho chính yêu cầu này (không phải bản dùng lại/thay thế)
+        if not result.get_extra('degraded') and not result.get_extra('reused_from'):
+            index_learning_path(cursor, learning_path_id, result.target_position, student_data)
+        
+        bump_cache_versions(cursor, [CACHE_SCOPE_STATISTICS, student_cache_scope(student_data.get('student_name', ''))])
+        
+        if job_lease:
+            complete_in_transaction(cursor, job_lease[0], job_lease[1], learning_path_id)
+        return learning_path_id
+    
     def _save_student(self, cursor, student_data):
-        """Lưu thông tin sinh viên"""
+        """Lưu thông tin sinh viên (cập nhật bản ghi cũ thay vì xóa đi tạo lại để giữ liên kết với lộ trình)"""
+        student_code = student_data.get('student_code') or None
+        student_name = student_data.get('student_name', '')
+        now = datetime.now().isoformat()
+        
+        if student_code:
+            cursor.execute('''
+                INSERT INTO students (student_code, student_name, gpa, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(student_code) DO UPDATE SET
+                    student_name = excluded.student_name, gpa = excluded.gpa, updated_at = excluded.updated_at
+                RETURNING id
+            ''', (student_code, student_name, student_data.get('gpa'), now))
+            return cursor.fetchone()[0]
+        
+        # Không có Mã SV (API, dữ liệu cũ): nhận diện theo tên
+        cursor.execute('SELECT id FROM students WHERE student_code IS NULL AND student_name = ?', (student_name,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute('UPDATE students SET gpa = ?, updated_at = ? WHERE id = ?',
+                           (student_data.get('gpa'), now, row[0]))
+            return row[0]
+        
         cursor.execute('''
-            INSERT OR REPLACE INTO students (student_code, student_name, gpa, updated_at)
-            VALUES (?, ?, ?, ?)
-        ''', (
-            student_data.get('student_code', ''),
-            student_data.get('student_name', ''),
-            student_data.get('gpa'),
-            datetime.now().isoformat()
-        ))
+            INSERT INTO students (student_code, student_name, gpa, updated_at)
+            VALUES (NULL, ?, ?, ?)
+        ''', (student_name, student_data.get('gpa'), now))
         return cursor.lastrowid
     
     def _save_learning_path(self, cursor, student_id, student_data, result):
@@ -165,36 +412,42 @@ class DatabaseManager:
         cursor.execute('''
             INSERT INTO learning_paths 
             (student_id, target_position, preferences, strengths, weaknesses, 
-             analysis, overall_timeline, recommendations)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+             analysis, overall_timeline, timeline_min_months, timeline_max_months, recommendations, raw_response)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             student_id,
-            result.get('target_position', ''),
+            result.target_position,
             student_data.get('preferences', ''),
             student_data.get('strengths', ''),
             student_data.get('weaknesses', ''),
-            result.get('analysis', ''),
-            result.get('overall_timeline', ''),
-            result.get('recommendations', '')
+            compress_text(result.analysis),
+            result.overall_timeline,
+            *parse_timeline(result.overall_timeline),
+            compress_text(result.recommendations),
+            compress_text(result.get_extra('raw_response'))
         ))
         return cursor.lastrowid
     
     def _save_learning_steps(self, cursor, learning_path_id, learning_steps):
         """Lưu các bước học"""
-        for i, step in enumerate(learning_steps):
-            cursor.execute('''
-                INSERT INTO learning_steps 
-                (learning_path_id, step_order, domain, difficulty_level, timeline, skills, resources)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+        cursor.executemany('''
+            INSERT INTO learning_steps 
+            (learning_path_id, step_order, domain, difficulty_level, timeline, timeline_min_months, timeline_max_months,
+             skills, resources)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (
                 learning_path_id,
                 i + 1,
-                step.get('domain', ''),
-                step.get('difficulty_level', ''),
-                step.get('timeline', ''),
-                json.dumps(step.get('skills', []), ensure_ascii=False),
-                json.dumps(step.get('resources', []), ensure_ascii=False)
-            ))
+                step.domain,
+                step.difficulty_level,
+                step.timeline,
+                *parse_timeline(step.timeline),
+                json.dumps(step.skills, ensure_ascii=False),
+                json.dumps(step.resources, ensure_ascii=False)
+            )
+            for i, step in enumerate(learning_steps)
+        ])
     
     def _save_course_analysis(self, cursor, learning_path_id, course_analysis):
         """Lưu phân tích môn học"""
@@ -203,93 +456,186 @@ class DatabaseManager:
             VALUES (?, ?, ?)
         ''', (
             learning_path_id,
-            course_analysis.get('analysis_summary', ''),
-            course_analysis.get('general_recommendations', '')
+            compress_text(course_analysis.analysis_summary),
+            course_analysis.general_recommendations
         ))
         return cursor.lastrowid
     
     def _save_important_courses(self, cursor, course_analysis_id, important_courses):
         """Lưu các môn học quan trọng"""
-        for course in important_courses:
-            cursor.execute('''
-                INSERT INTO important_courses 
-                (course_analysis_id, course_name, credits, importance_score, reason, study_tips)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                course_analysis_id,
-                course.get('name', ''),
-                course.get('credits', ''),
-                course.get('importance_score', ''),
-                course.get('reason', ''),
-                course.get('study_tips', '')
-            ))
+        cursor.executemany('''
+            INSERT INTO important_courses 
+            (course_analysis_id, course_name, credits, importance_score, credits_value, score_numerator, score_denominator,
+             reason, study_tips)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (course_analysis_id, course.name, course.credits, course.importance_score,
+             parse_credits(course.credits), *parse_score(course.importance_score), course.reason, course.study_tips)
+            for course in important_courses
+        ])
     
     def _save_skill_suggestions(self, cursor, learning_path_id, skill_suggestions):
-        """Lưu đề xuất kỹ năng"""
-        # Lưu kỹ năng dựa trên điểm mạnh
-        strength_skills = skill_suggestions.get('strength_based_skills', [])
-        for skill in strength_skills:
-            cursor.execute('''
-                INSERT INTO skill_suggestions 
-                (learning_path_id, skill_type, skill_name, reason, benefit, learning_path)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                learning_path_id,
-                'strength_based',
-                skill.get('skill_name', ''),
-                skill.get('reason', ''),
-                skill.get('benefit', ''),
-                skill.get('learning_path', '')
-            ))
-        
-        # Lưu kỹ năng cải thiện điểm yếu
-        weakness_skills = skill_suggestions.get('weakness_improvement_skills', [])
-        for skill in weakness_skills:
-            cursor.execute('''
-                INSERT INTO skill_suggestions 
-                (learning_path_id, skill_type, skill_name, reason, benefit, learning_path)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                learning_path_id,
-                'weakness_improvement',
-                skill.get('skill_name', ''),
-                skill.get('reason', ''),
-                skill.get('benefit', ''),
-                skill.get('learning_path', '')
-            ))
-        
-        # Lưu kỹ năng mở rộng cơ hội
-        expansion_skills = skill_suggestions.get('career_expansion_skills', [])
-        for skill in expansion_skills:
-            cursor.execute('''
-                INSERT INTO skill_suggestions 
-                (learning_path_id, skill_type, skill_name, reason, benefit, learning_path)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                learning_path_id,
-                'career_expansion',
-                skill.get('skill_name', ''),
-                skill.get('reason', ''),
-                skill.get('benefit', ''),
-                skill.get('learning_path', '')
-            ))
+        """Lưu đề xuất kỹ năng (ba nhóm: dựa trên điểm mạnh, cải thiện điểm yếu, mở rộng cơ hội)"""
+        cursor.executemany('''
+            INSERT INTO skill_suggestions 
+            (learning_path_id, skill_type, skill_name, reason, benefit, learning_path)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (learning_path_id, skill_type, skill.skill_name, skill.reason, skill.benefit, skill.learning_path)
+            for group, skill_type in SkillSuggestions.SKILL_TYPES
+            for skill in getattr(skill_suggestions, group)
+        ])
     
     def save_export_record(self, learning_path_id, export_type, file_path, file_size):
-        """Lưu lịch sử xuất file"""
+        """Lưu lịch sử xuất file, trả về id bản ghi"""
+        if self.writer:
+            return self.writer.submit(self._write_export_record, learning_path_id, export_type, file_path, file_size).result()
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
+        export_id = self._write_export_record(cursor, learning_path_id, export_type, file_path, file_size)
+        conn.commit()
+        conn.close()
+        return export_id
+    
+    def _write_export_record(self, cursor, learning_path_id, export_type, file_path, file_size):
+        """Ghi lịch sử xuất file trong transaction đang mở (không commit)"""
         cursor.execute('''
             INSERT INTO export_history (learning_path_id, export_type, file_path, file_size)
             VALUES (?, ?, ?, ?)
         ''', (learning_path_id, export_type, file_path, file_size))
+        bump_cache_versions(cursor, [CACHE_SCOPE_STATISTICS])
+        return cursor.lastrowid
+    
+    def record_model_usage(self, usage):
+        """Lưu thông tin sử dụng của một lần gọi model, trả về id bản ghi"""
+        # Mỗi lời gọi model ghi một dòng: đi qua luồng ghi chung thay vì tranh khóa ghi với các lượt lưu lộ trình
+        if self.writer:
+            return self.writer.submit(self._write_model_usage, usage).result()
         
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        usage_id = self._write_model_usage(cursor, usage)
         conn.commit()
         conn.close()
+        return usage_id
+    
+    def _write_model_usage(self, cursor, usage):
+        """Ghi thông tin sử dụng model trong transaction đang mở (không commit)"""
+        cursor.execute('''
+            INSERT INTO model_usage
+            (student_name, target_position, operation, model_name, prompt_tokens,
+             output_tokens, latency_ms, cache_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            usage.get('student_name'),
+            usage.get('target_position'),
+            usage.get('operation', 'learning_path'),
+            usage.get('model_name'),
+            usage.get('prompt_tokens', 0),
+            usage.get('output_tokens', 0),
+            usage.get('latency_ms'),
+            usage.get('cache_status', 'miss')
+        ))
+        return cursor.lastrowid
+    
+    def get_tokens_used(self, day=None, student_name=None):
+        """Tổng token (prompt + output) đã dùng trong ngày (mặc định hôm nay, theo UTC)"""
+        conn = self.reads.connect()
+        cursor = conn.cursor()
+        
+        query = '''
+            SELECT COALESCE(SUM(prompt_tokens + output_tokens), 0)
+            FROM model_usage
+            WHERE created_at >= date(COALESCE(?, 'now')) AND created_at < date(COALESCE(?, 'now'), '+1 day')
+        '''
+        params = [day, day]
+        if student_name is not None:
+            query += ' AND student_name = ?'
+            params.append(student_name)
+        
+        cursor.execute(query, params)
+        total = cursor.fetchone()[0]
+        conn.close()
+        return total
+    
+    def get_usage_summary(self, group_by='day', since=None):
+        """Tổng hợp token và độ trễ theo ngày, sinh viên hoặc vị trí"""
+        group_columns = {
+            'day': 'date(created_at)',
+            'student': 'student_name',
+            'position': 'target_position'
+        }
+        if group_by not in group_columns:
+            raise ValueError(f"Không hỗ trợ nhóm theo: {group_by}")
+        column = group_columns[group_by]
+        
+        conn = self.reads.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT {column} AS grp, COUNT(*), SUM(prompt_tokens), SUM(output_tokens),
+                   AVG(CASE WHEN cache_status = 'miss' THEN latency_ms END),
+                   SUM(CASE WHEN cache_status = 'miss' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN cache_status = 'coalesced' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN cache_status = 'similar' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN cache_status = 'template' THEN 1 ELSE 0 END)
+            FROM model_usage
+            WHERE created_at >= COALESCE(?, '')
+            GROUP BY grp
+            ORDER BY grp DESC
+        ''', (since,))
+        
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                group_by: row[0],
+                'calls': row[1],
+                'prompt_tokens': row[2] or 0,
+                'output_tokens': row[3] or 0,
+                'avg_latency_ms': round(row[4], 1) if row[4] is not None else None,
+                'model_calls': row[5],
+                'coalesced_calls': row[6],
+                'similar_calls': row[7],
+                'template_calls': row[8]
+            }
+            for row in results
+        ]
+    
+    def get_average_output_tokens(self, operation='learning_path'):
+        """Số token output trung bình của các lần gọi model thật"""
+        conn = self.reads.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT AVG(output_tokens) FROM model_usage
+            WHERE operation = ? AND cache_status = 'miss' AND output_tokens > 0
+        ''', (operation,))
+        average = cursor.fetchone()[0]
+        conn.close()
+        return average
+    
+    def get_latest_result_for_position(self, target_position):
+        """Lấy kết quả lộ trình gần nhất đã lưu cho vị trí (dạng kết quả của GeminiClient)"""
+        conn = self.reads.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM learning_paths
+            WHERE target_position = ?
+            ORDER BY id DESC
+            LIMIT 1
+        ''', (target_position,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if not row:
+            return None
+        return details_to_result(self.get_learning_path_details(row[0]))
     
     def get_student_history(self, student_name):
         """Lấy lịch sử lộ trình học của sinh viên"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.reads.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -313,14 +659,27 @@ class DatabaseManager:
             for row in results
         ]
     
-    def get_learning_path_details(self, learning_path_id):
-        """Lấy chi tiết lộ trình học"""
-        conn = sqlite3.connect(self.db_path)
+    def get_learning_path_details(self, learning_path_id, load_text=True):
+        """Lấy chi tiết lộ trình học
+        
+        Với load_text=False, các cột văn bản dài đã nén (analysis, recommendations,
+        analysis_summary, raw_response) không được đọc mà trả về None (không có raw_response);
+        khi cần hiển thị thì gọi get_text_field() để đọc riêng từng trường.
+        """
+        conn = self.reads.connect()
         cursor = conn.cursor()
         
+        # Không đọc các cột nén khi không cần: SQLite bỏ qua cả các trang overflow của giá trị dài
+        analysis, recommendations, raw_response, analysis_summary = (
+            ('lp.analysis', 'lp.recommendations', 'lp.raw_response', 'ca.analysis_summary') if load_text
+            else ('NULL', 'NULL', 'NULL', 'NULL')
+        )
+        
         # Lấy thông tin chính
-        cursor.execute('''
-            SELECT lp.*, s.student_name, s.gpa
+        cursor.execute(f'''
+            SELECT lp.id, lp.student_id, lp.target_position, lp.preferences, lp.strengths,
+                   lp.weaknesses, {analysis}, lp.overall_timeline, {recommendations},
+                   lp.created_at, s.student_name, s.gpa, {raw_response}
             FROM learning_paths lp
             JOIN students s ON lp.student_id = s.id
             WHERE lp.id = ?
@@ -342,8 +701,8 @@ class DatabaseManager:
         steps = cursor.fetchall()
         
         # Lấy phân tích môn học
-        cursor.execute('''
-            SELECT ca.analysis_summary, ca.general_recommendations
+        cursor.execute(f'''
+            SELECT {analysis_summary}, ca.general_recommendations
             FROM course_analyses ca
             WHERE ca.learning_path_id = ?
         ''', (learning_path_id,))
@@ -380,9 +739,9 @@ class DatabaseManager:
             'preferences': main_info[3],
             'strengths': main_info[4],
             'weaknesses': main_info[5],
-            'analysis': main_info[6],
+            'analysis': decompress_text(main_info[6]),
             'overall_timeline': main_info[7],
-            'recommendations': main_info[8],
+            'recommendations': decompress_text(main_info[8]),
             'created_at': main_info[9],
             'student_name': main_info[10],
             'gpa': main_info[11],
@@ -397,7 +756,7 @@ class DatabaseManager:
                 for step in steps
             ],
             'course_analysis': {
-                'analysis_summary': course_analysis[0] if course_analysis else '',
+                'analysis_summary': decompress_text(course_analysis[0]) if course_analysis else '',
                 'general_recommendations': course_analysis[1] if course_analysis else '',
                 'important_courses': [
                     {
@@ -441,12 +800,30 @@ class DatabaseManager:
             }
         }
         
+        if main_info[12] is not None:
+            result['raw_response'] = decompress_text(main_info[12])
+        
         return result
     
+    def get_text_field(self, learning_path_id, field):
+        """Đọc và giải nén một trường văn bản dài của lộ trình học khi cần hiển thị"""
+        if field in COMPRESSED_COLUMNS['learning_paths']:
+            query = f'SELECT {field} FROM learning_paths WHERE id = ?'
+        elif field in COMPRESSED_COLUMNS['course_analyses']:
+            query = f'SELECT {field} FROM course_analyses WHERE learning_path_id = ?'
+        else:
+            raise ValueError(f"Trường không được hỗ trợ: {field}")
+        
+        with self.reads.snapshot() as conn:
+            row = conn.execute(query, (learning_path_id,)).fetchone()
+        
+        return decompress_text(row[0]) if row else None
+    
     
     def get_statistics(self):
         """Lấy thống kê tổng quan"""
-        conn = sqlite3.connect(self.db_path)
+        # Bản sao trong bộ nhớ (nếu bật) tránh quét toàn bảng trên file database
+        conn = self.statistics_snapshot.connect() if self.statistics_snapshot else self.reads.connect()
         cursor = conn.cursor()
         
         # Tổng số sinh viên
@@ -480,3 +857,160 @@ class DatabaseManager:
             'top_positions': [{'position': row[0], 'count': row[1]} for row in top_positions]
         }
 
+    
+    def compress_existing_rows(self, batch_size=500):
+        """Migration một lần: nén các giá trị văn bản dài chưa được nén trong database"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        converted = 0
+        
+        try:
+            for table, columns in COMPRESSED_COLUMNS.items():
+                for column in columns:
+                    last_id = 0
+                    while True:
+                        cursor.execute(f'''
+                            SELECT id, {column} FROM {table}
+                            WHERE id > ? AND typeof({column}) = 'text'
+                            ORDER BY id
+                            LIMIT ?
+                        ''', (last_id, batch_size))
+                        rows = cursor.fetchall()
+                        if not rows:
+                            break
+                        
+                        updates = []
+                        for row_id, value in rows:
+                            packed = compress_text(value)
+                            if packed is not value:
+                                updates.append((packed, row_id))
+                        
+                        cursor.executemany(f'UPDATE {table} SET {column} = ? WHERE id = ?', updates)
+                        conn.commit()
+                        converted += len(updates)
+                        last_id = rows[-1][0]
+        finally:
+            conn.close()
+        
+        stats = self.get_compression_stats()
+        stats['converted_rows'] = converted
+        return stats
+    
+    def backfill_numeric_columns(self, batch_size=1000):
+        """Migration: điền các cột số (NUMERIC_COLUMNS) từ văn bản gốc cho mọi dòng, trả về số dòng đã cập nhật mỗi bảng"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        updated = {}
+        
+        try:
+            for table, sources in NUMERIC_COLUMNS.items():
+                source_columns = list(sources)
+                target_columns = [column for columns, _ in sources.values() for column in columns]
+                assignments = ', '.join(f"{column} = ?" for column in target_columns)
+                updated[table] = 0
+                last_id = 0
+                while True:
+                    cursor.execute(f'''
+                        SELECT id, {', '.join(source_columns)} FROM {table}
+                        WHERE id > ?
+                        ORDER BY id
+                        LIMIT ?
+                    ''', (last_id, batch_size))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        break
+                    
+                    cursor.executemany(f'UPDATE {table} SET {assignments} WHERE id = ?', [
+                        numeric_values(table, dict(zip(source_columns, row[1:]))) + (row[0],)
+                        for row in rows
+                    ])
+                    conn.commit()
+                    updated[table] += len(rows)
+                    last_id = rows[-1][0]
+        finally:
+            conn.close()
+        
+        return updated
+    
+    def get_paths_within(self, max_months, target_position=None, limit=50):
+        """Các lộ trình hoàn thành được trong tối đa max_months tháng (theo thời gian dài nhất của overall_timeline)"""
+        conn = self.reads.connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT lp.id, lp.target_position, lp.overall_timeline, lp.timeline_min_months, lp.timeline_max_months,
+                   s.student_name, lp.created_at
+            FROM learning_paths lp
+            LEFT JOIN students s ON lp.student_id = s.id
+            WHERE lp.timeline_max_months <= ? {'AND lp.target_position = ?' if target_position else ''}
+            ORDER BY lp.timeline_max_months, lp.timeline_min_months
+            LIMIT ?
+        ''', (max_months, target_position, limit) if target_position else (max_months, limit))
+        
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                'id': row[0],
+                'target_position': row[1],
+                'overall_timeline': row[2],
+                'timeline_min_months': row[3],
+                'timeline_max_months': row[4],
+                'student_name': row[5],
+                'created_at': row[6]
+            }
+            for row in results
+        ]
+    
+    def get_compression_stats(self):
+        """Thống kê tỷ lệ nén của các cột văn bản dài"""
+        conn = self.reads.connect()
+        cursor = conn.cursor()
+        columns_stats = []
+        total_raw = 0
+        total_stored = 0
+        
+        for table, columns in COMPRESSED_COLUMNS.items():
+            for column in columns:
+                # Giá trị chưa nén: kích thước lưu trữ bằng kích thước gốc
+                cursor.execute(f'''
+                    SELECT COUNT(*), COALESCE(SUM(length(CAST({column} AS BLOB))), 0)
+                    FROM {table} WHERE typeof({column}) = 'text'
+                ''')
+                plain_rows, plain_bytes = cursor.fetchone()
+                
+                # Giá trị đã nén: kích thước gốc nằm trong header
+                cursor.execute(f'''
+                    SELECT substr({column}, 1, {_HEADER.size}), length({column})
+                    FROM {table} WHERE typeof({column}) = 'blob'
+                ''')
+                compressed_rows = 0
+                raw_bytes = plain_bytes
+                stored_bytes = plain_bytes
+                for header, stored_size in cursor:
+                    _, raw_size = _HEADER.unpack(header)
+                    compressed_rows += 1
+                    raw_bytes += raw_size
+                    stored_bytes += stored_size
+                
+                columns_stats.append({
+                    'table': table,
+                    'column': column,
+                    'rows': plain_rows + compressed_rows,
+                    'compressed_rows': compressed_rows,
+                    'raw_bytes': raw_bytes,
+                    'stored_bytes': stored_bytes,
+                    'ratio': round(raw_bytes / stored_bytes, 2) if stored_bytes else 1.0
+                })
+                total_raw += raw_bytes
+                total_stored += stored_bytes
+        
+        conn.close()
+        
+        return {
+            'columns': columns_stats,
+            'raw_bytes': total_raw,
+            'stored_bytes': total_stored,
+            'ratio': round(total_raw / total_stored, 2) if total_stored else 1.0
+        }
@@ -5,8 +5,8 @@ Script quản lý database SQLite - Reset, Backup, Restore
 
 import sqlite3
 import os
-import shutil
 from datetime import datetime
+import database_manager
 
 class DatabaseManager:
     """Quản lý database SQLite"""
@@ -32,7 +32,7 @@ class DatabaseManager:
         backup_path = os.path.join(self.backup_dir, backup_filename)
         
         try:
-            shutil.copy2(self.db_path, backup_path)
+            self._copy_database(self.db_path, backup_path)
             print(f"✅ Đã tạo backup: {backup_path}")
             return backup_path
         except Exception as e:
@@ -51,13 +51,56 @@ class DatabaseManager:
                 self.backup_database()
             
             # Restore từ backup
-            shutil.copy2(backup_path, self.db_path)
+            previous_version = self._read_cache_version()
+            self._copy_database(backup_path, self.db_path)
+            self._invalidate_read_cache(previous_version)
             print(f"✅ Đã khôi phục database từ: {backup_path}")
             return True
         except Exception as e:
             print(f"❌ Lỗi khi khôi phục: {e}")
             return False
     
+    @staticmethod
+    def _copy_database(source_path, target_path):
+        """Sao chép database qua backup API của SQLite
+        
+        Database chạy ở chế độ WAL nên copy file chính sẽ thiếu các transaction chưa checkpoint;
+        backup API chép một snapshot nhất quán trong khi ứng dụng vẫn đọc/ghi.
+        """
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    
+    def _read_cache_version(self):
+        """Phiên bản toàn cục của cache đọc trong database hiện tại (0 nếu chưa có)"""
+        if not os.path.exists(self.db_path):
+            return 0
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT version FROM cache_versions WHERE scope = ?",
+                               (database_manager.CACHE_SCOPE_ALL,)).fetchone()
+            return row[0] if row else 0
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            conn.close()
+    
+    def _invalidate_read_cache(self, previous_version):
+        """Báo cho cache đọc của ứng dụng đang chạy rằng toàn bộ dữ liệu đã thay đổi"""
+        # Tạo bảng cache_versions nếu backup được tạo từ phiên bản cũ
+        database_manager.DatabaseManager(self.db_path)
+        # Phiên bản mới phải khác cả phiên bản trước khi khôi phục lẫn phiên bản trong backup
+        version = max(previous_version, self._read_cache_version()) + 1
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT OR REPLACE INTO cache_versions (scope, version) VALUES (?, ?)",
+                     (database_manager.CACHE_SCOPE_ALL, version))
+        conn.commit()
+        conn.close()
+    
     def reset_database(self):
         """Reset database (xóa tất cả dữ liệu)"""
         if not os.path.exists(self.db_path):
@@ -74,16 +117,28 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Xóa tất cả dữ liệu nhưng giữ lại cấu trúc bảng
-            tables = ['export_history', 'important_courses', 'course_analyses', 
+            # Xóa tất cả dữ liệu nhưng giữ lại cấu trúc bảng. Job và yêu cầu đang gộp trỏ tới id lộ trình
+            # cũ nên cũng bị xóa (hai bảng này chỉ có khi đã chạy hàng đợi/bộ gộp yêu cầu)
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            existing = {row[0] for row in cursor.fetchall()}
+            tables = ['generation_jobs', 'inflight_requests',
+                     'similarity_matches', 'path_lsh_buckets', 'path_signatures',
+                     'export_history', 'skill_suggestions', 'important_courses', 'course_analyses', 
                      'learning_steps', 'learning_paths', 'students']
             
             for table in tables:
+                if table not in existing:
+                    continue
                 cursor.execute(f"DELETE FROM {table}")
                 print(f"🗑️ Đã xóa dữ liệu từ bảng: {table}")
             
-            # Reset auto-increment counters
-            cursor.execute("DELETE FROM sqlite_sequence")
+            # Giữ lại: model_usage là sổ token/ngân sách (reset dữ liệu không được xóa mức đã dùng),
+            # path_templates không chứa dữ liệu sinh viên và gắn với danh sách môn học chứ không với lộ trình
+            print("📌 Giữ lại: model_usage (token và ngân sách), path_templates (lộ trình mẫu)")
+            
+            # Không reset bộ đếm AUTOINCREMENT: id lộ trình/job mới không trùng id cũ mà phiên Streamlit
+            # hoặc client API còn giữ, id cũ chỉ còn trỏ tới lộ trình không tồn tại
+            database_manager.bump_cache_versions(cursor, [database_manager.CACHE_SCOPE_ALL])
             
             conn.commit()
             conn.close()
@@ -187,6 +242,43 @@ class DatabaseManager:
         else:
             print(f"✅ Đã xóa {deleted_count} backup cũ")
 
+    def compress_text_columns(self):
+        """Nén các cột văn bản dài chưa nén và báo cáo tỷ lệ nén"""
+        if not os.path.exists(self.db_path):
+            print(f"❌ Database không tồn tại: {self.db_path}")
+            return None
+        
+        # Backup trước khi chuyển đổi dữ liệu
+        if not self.backup_database():
+            print("❌ Không thể tạo backup, hủy nén dữ liệu")
+            return None
+        
+        storage = database_manager.DatabaseManager(self.db_path)
+        stats = storage.compress_existing_rows()
+        
+        print(f"✅ Đã nén {stats['converted_rows']} giá trị")
+        for column in stats['columns']:
+            print(f"  {column['table']}.{column['column']}: "
+                  f"{column['compressed_rows']}/{column['rows']} dòng nén, "
+                  f"{column['raw_bytes']} → {column['stored_bytes']} bytes (x{column['ratio']})")
+        print(f"📊 Tổng: {stats['raw_bytes']} → {stats['stored_bytes']} bytes (x{stats['ratio']})")
+        return stats
+    
+    def backfill_numeric_columns(self):
+        """Đọc lại các cột số (tín chỉ, điểm quan trọng, thời gian theo tháng) từ văn bản gốc"""
+        if not os.path.exists(self.db_path):
+            print(f"❌ Database không tồn tại: {self.db_path}")
+            return None
+        
+        # Chỉ ghi các cột số, văn bản gốc giữ nguyên nên không cần backup
+        storage = database_manager.DatabaseManager(self.db_path)
+        updated = storage.backfill_numeric_columns()
+        
+        print("✅ Đã cập nhật cột số")
+        for table, count in updated.items():
+            print(f"  {table}: {count} dòng")
+        return updated
+
 def show_menu():
     """Hiển thị menu"""
     print("\n" + "=" * 50)
@@ -198,7 +290,9 @@ def show_menu():
     print("4. 🔄 Khôi phục từ backup")
     print("5. 🗑️ Reset database (xóa tất cả dữ liệu)")
     print("6. 🧹 Cleanup backups cũ")
-    print("7. ❌ Thoát")
+    print("7. 🗜️ Nén dữ liệu văn bản")
+    print("8. 🔢 Cập nhật cột số (tín chỉ, điểm, thời gian)")
+    print("9. ❌ Thoát")
     print("=" * 50)
 
 def main():
@@ -209,7 +303,7 @@ def main():
         show_menu()
         
         try:
-            choice = input("Chọn chức năng (1-7): ").strip()
+            choice = input("Chọn chức năng (1-9): ").strip()
             
             if choice == '1':
                 db_manager.show_database_status()
@@ -271,6 +365,12 @@ def main():
                     print("❌ Số ngày không hợp lệ")
             
             elif choice == '7':
+                db_manager.compress_text_columns()
+            
+            elif choice == '8':
+                db_manager.backfill_numeric_columns()
+            
+            elif choice == '9':
                 print("👋 Tạm biệt!")
                 break
             
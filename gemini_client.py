@@ -1,17 +1,72 @@
-import google.generativeai as genai
-from config import GEMINI_API_KEY, MODEL_NAME, TEMPERATURE, MAX_OUTPUT_TOKENS
+from config import (GEMINI_API_KEY, MODEL_NAME, TEMPERATURE, MAX_OUTPUT_TOKENS, DECOMPOSED_GENERATION,
+                    SECTION_MAX_OUTPUT_TOKENS, SECTION_MAX_ATTEMPTS, COMPARE_MAX_POSITIONS)
+from database_manager import details_to_result
+from metrics import metrics
+from request_coalescer import SingleFlight, request_key
+from result_model import CourseAnalysis, ResultSchemaError, parse_result, parse_section
+from student_roster import normalize_name
+from usage_tracker import estimate_tokens
 import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Các phần của kết quả khi tạo tách rời: tên phần (cũng là khóa bắt buộc trong JSON trả về
+# và là operation ghi nhận token) -> các khóa kết quả thuộc phần đó
+RESULT_SECTIONS = {
+    'learning_path': ('target_position', 'analysis', 'learning_path', 'overall_timeline', 'recommendations'),
+    'course_analysis': ('course_analysis',),
+    'skill_suggestions': ('skill_suggestions',),
+}
+
+# Yêu cầu chung ở cuối các prompt tạo tách rời
+_SECTION_RULES = """QUAN TRỌNG: 
+        - Chỉ trả về JSON hợp lệ, không có text thêm
+        - TẤT CẢ nội dung trong JSON phải được viết bằng TIẾNG VIỆT
+        - Không sử dụng tiếng Anh trong bất kỳ phần nào của response"""
+
+# SDK Gemini được import ở lần gọi model đầu tiên để khởi động nhanh
+genai = None
+
+
+def _load_genai():
+    """Import và cấu hình SDK Gemini (chỉ một lần)"""
+    global genai
+    if genai is None:
+        import google.generativeai as sdk
+        sdk.configure(api_key=GEMINI_API_KEY)
+        genai = sdk
+    return genai
 
 class GeminiClient:
-    def __init__(self):
-        """Khởi tạo client Gemini"""
+    def __init__(self, usage_tracker=None, coalescer=None, similarity_index=None, templates=None):
+        """Khởi tạo client Gemini
+        
+        Args:
+            usage_tracker (UsageTracker): Ghi nhận token và kiểm tra ngân sách (tùy chọn)
+            coalescer (SingleFlight): Gộp các yêu cầu giống nhau đang chạy (mặc định chỉ trong tiến trình)
+            similarity_index (SimilarityIndex): Dùng lại lộ trình đã lưu cho yêu cầu gần giống (tùy chọn)
+            templates (PathTemplates): Lộ trình mẫu dựng sẵn theo vị trí × mức GPA (tùy chọn)
+        """
         if not GEMINI_API_KEY:
             raise ValueError("Vui lòng cung cấp GEMINI_API_KEY trong file .env")
         
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(MODEL_NAME)
+        self._model = None
+        self.usage_tracker = usage_tracker
+        self.coalescer = coalescer or SingleFlight()
+        self.similarity_index = similarity_index
+        self.templates = templates
+    
+    @property
+    def model(self):
+        """Model Gemini, được khởi tạo khi gọi lần đầu"""
+        if self._model is None:
+            self._model = _load_genai().GenerativeModel(MODEL_NAME)
+        return self._model
         
-    def generate_learning_path(self, target_position, student_gpa=None, preferences=None, strengths=None, weaknesses=None, courses_data=None):
+    def generate_learning_path(self, target_position, student_gpa=None, preferences=None, strengths=None, weaknesses=None, courses_data=None, student_name=None, reuse_similar=True):
         """
         Tạo lộ trình học đến vị trí mục tiêu và phân tích môn học
         
@@ -22,10 +77,429 @@ class GeminiClient:
             strengths (str): Điểm mạnh của sinh viên
             weaknesses (str): Điểm yếu cần cải thiện
             courses_data (list): Danh sách môn học để phân tích
+            student_name (str): Tên sinh viên, dùng cho thống kê token và ngân sách
+            reuse_similar (bool): Cho phép dùng lại/tham khảo lộ trình đã lưu của yêu cầu gần giống
+                (False khi người dùng chủ động tạo lại)
             
         Returns:
             dict: Lộ trình học và phân tích môn học được cá nhân hóa
         """
+        usage_context = {'student_name': student_name, 'target_position': target_position}
+        stored, reference_result, fixed_sections = self._resolve_without_model(
+            target_position, student_gpa, preferences, strengths, weaknesses, courses_data, student_name, usage_context, reuse_similar
+        )
+        if stored is not None:
+            return stored
+        
+        # Các yêu cầu giống hệt đang chạy đồng thời chỉ gọi model một lần
+        key = request_key(target_position, student_gpa, preferences, strengths, weaknesses, courses_data, reuse_similar)
+        result, flight_status = self.coalescer.run(key, lambda: self._generate_learning_path_uncoalesced(
+            target_position, student_gpa, preferences, strengths, weaknesses, courses_data, usage_context,
+            reference_result, fixed_sections
+        ))
+        if flight_status != 'leader':
+            logger.info("Dùng chung kết quả đang tạo cho vị trí %s (%s)", target_position, flight_status)
+            if self.usage_tracker:
+                self.usage_tracker.record('learning_path', 0, 0, 0.0, 'coalesced', **usage_context)
+        return result
+    
+    def compare_positions(self, target_positions, student_gpa=None, preferences=None, strengths=None, weaknesses=None, courses_data=None,
+                          student_name=None, reuse_similar=True):
+        """
+        Tạo lộ trình cho nhiều vị trí cùng lúc để so sánh
+        
+        Vị trí trả lời được không cần model (vượt ngân sách, lộ trình gần giống, lộ trình mẫu) dùng luôn kết quả đó.
+        Các vị trí còn lại gọi model song song: lộ trình và đề xuất kỹ năng mỗi vị trí một lời gọi, phân tích môn học
+        của mọi vị trí gộp trong một lời gọi nên danh sách môn học chỉ gửi một lần. Thời gian chờ gần bằng tạo
+        một lộ trình thay vì tổng của các vị trí.
+        
+        Args:
+            target_positions (list): Các vị trí cần so sánh (tối đa COMPARE_MAX_POSITIONS)
+            student_gpa, preferences, strengths, weaknesses, courses_data, student_name, reuse_similar:
+                Như generate_learning_path
+            
+        Returns:
+            dict: Vị trí -> kết quả như generate_learning_path, theo thứ tự target_positions
+        """
+        target_positions = list(dict.fromkeys(target_positions))
+        if len(target_positions) > COMPARE_MAX_POSITIONS:
+            raise ValueError(f"Chỉ so sánh tối đa {COMPARE_MAX_POSITIONS} vị trí")
+        
+        results = {}
+        pending = {}  # vị trí -> (usage_context, lộ trình tham khảo, các phần đã có sẵn)
+        for position in target_positions:
+            usage_context = {'student_name': student_name, 'target_position': position}
+            stored, reference_result, fixed_sections = self._resolve_without_model(
+                position, student_gpa, preferences, strengths, weaknesses, courses_data, student_name, usage_context, reuse_similar
+            )
+            results[position] = stored
+            if stored is None:
+                pending[position] = (usage_context, reference_result, fixed_sections or {})
+        if not pending:
+            return results
+        
+        with metrics.span('prompt_build'):
+            prompts = {
+                position: self._build_section_prompts(position, student_gpa, preferences, strengths, weaknesses, courses_data,
+                                                      reference_result)
+                for position, (_, reference_result, _) in pending.items()
+            }
+            shared = [position for position, (_, _, fixed_sections) in pending.items() if 'course_analysis' not in fixed_sections]
+            shared_prompt = (self._build_shared_course_analysis_prompt(shared, student_gpa, preferences, strengths, weaknesses,
+                                                                       courses_data) if shared else None)
+        
+        sections = [section for section in RESULT_SECTIONS if section != 'course_analysis']
+        with ThreadPoolExecutor(max_workers=len(pending) * len(sections) + 1) as executor:
+            shared_future = (executor.submit(self._generate_shared_course_analysis, shared, shared_prompt,
+                                             {'student_name': student_name, 'target_position': ', '.join(shared)})
+                             if shared else None)
+            futures = {(position, section): executor.submit(self._generate_section, section, prompts[position][section],
+                                                            pending[position][0])
+                       for position in pending for section in sections}
+            outcomes = {position: {} for position in pending}
+            for (position, section), future in futures.items():
+                outcomes[position][section] = future.result()
+            shared_outcomes = shared_future.result() if shared_future else {}
+        
+        for position, (usage_context, _, fixed_sections) in pending.items():
+            if 'course_analysis' in fixed_sections:
+                outcomes[position]['course_analysis'] = (fixed_sections['course_analysis'], None)
+                if self.usage_tracker:
+                    self.usage_tracker.record('course_analysis', 0, 0, 0.0, 'template', **usage_context)
+            else:
+                outcomes[position]['course_analysis'] = shared_outcomes[position]
+            results[position] = self._assemble_sections(position, outcomes[position], courses_data, strengths, weaknesses)
+        return results
+    
+    def _resolve_without_model(self, target_position, student_gpa, preferences, strengths, weaknesses, courses_data, student_name,
+                               usage_context, reuse_similar):
+        """Trả lời yêu cầu không cần gọi model nếu được (vượt ngân sách, lộ trình gần giống, lộ trình mẫu)
+        
+        Returns:
+            tuple: (kết quả trả về luôn hoặc None, lộ trình tham khảo cho prompt, các phần đã có sẵn)
+        """
+        # Vượt ngân sách: trả về kết quả đã lưu hoặc kết quả tạo cục bộ thay vì gọi model
+        budget_reason = self.usage_tracker.check_budget(student_name) if self.usage_tracker else None
+        if budget_reason:
+            logger.info("Bỏ qua gọi model: %s", budget_reason)
+            return self._budget_degraded_result(budget_reason, usage_context, target_position, courses_data, strengths, weaknesses), None, None
+        
+        # Yêu cầu gần giống một lộ trình đã lưu: trả về luôn hoặc dùng lộ trình đó làm tham khảo trong prompt
+        reference_result = None
+        if self.similarity_index and reuse_similar:
+            action, match, stored = self._find_similar(target_position, student_gpa, preferences, strengths, weaknesses, student_name)
+            if action == 'reuse':
+                logger.info("Dùng lại lộ trình #%s (độ tương tự %.2f) cho vị trí %s",
+                            match['learning_path_id'], match['similarity'], target_position)
+                if self.usage_tracker:
+                    self.usage_tracker.record('learning_path', 0, 0, 0.0, 'similar', **usage_context)
+                stored['reused_from'] = match
+                return stored, None, None
+            if action == 'seed':
+                reference_result = stored
+        
+        # Có lộ trình mẫu cho vị trí và mức GPA: trả về luôn nếu sinh viên không nhập thông tin cá nhân,
+        # ngược lại cá nhân hóa từ mẫu và dùng lại phân tích môn học của mẫu
+        fixed_sections = None
+        if self.templates and reuse_similar and reference_result is None:
+            with metrics.span('template_lookup'):
+                template = self.templates.find(target_position, student_gpa, courses_data)
+            if template:
+                if not (preferences or strengths or weaknesses):
+                    logger.info("Dùng lộ trình mẫu %s cho vị trí %s", template['template'], target_position)
+                    if self.usage_tracker:
+                        self.usage_tracker.record('learning_path', 0, 0, 0.0, 'template', **usage_context)
+                    return template, None, None
+                reference_result = template
+                fixed_sections = {'course_analysis': {'course_analysis': template['course_analysis']}}
+        return None, reference_result, fixed_sections
+    
+    def _find_similar(self, target_position, student_gpa, preferences, strengths, weaknesses, student_name):
+        """Tìm lộ trình đã lưu gần nhất và ghi nhật ký, trả về (hành động, lần khớp, kết quả đã lưu)"""
+        student_data = {'gpa': student_gpa, 'preferences': preferences, 'strengths': strengths, 'weaknesses': weaknesses}
+        with metrics.span('similarity_lookup'):
+            match = self.similarity_index.find(target_position, student_data)
+            stored = None
+            if match:
+                details = self.similarity_index.db_manager.get_learning_path_details(match['learning_path_id'])
+                stored = details_to_result(details)
+        if not stored:
+            return None, None, None
+        
+        action = self.similarity_index.action_for(match)
+        self.similarity_index.record_match(match, action, student_name, target_position)
+        return action, match, stored
+    
+    def _generate_learning_path_uncoalesced(self, target_position, student_gpa, preferences, strengths, weaknesses, courses_data, usage_context,
+                                            reference_result=None, fixed_sections=None):
+        """Tạo prompt, gọi model và parse kết quả của một yêu cầu tạo lộ trình
+        
+        fixed_sections (phần -> dữ liệu đã có, ví dụ phân tích môn học của lộ trình mẫu) chỉ được dùng
+        khi tạo tách rời; tạo một prompt thì lộ trình tham khảo vẫn nằm trong prompt.
+        """
+        if DECOMPOSED_GENERATION:
+            return self._generate_learning_path_decomposed(target_position, student_gpa, preferences, strengths, weaknesses,
+                                                           courses_data, usage_context, reference_result, fixed_sections)
+        
+        with metrics.span('prompt_build'):
+            prompt = self._build_learning_path_prompt(target_position, student_gpa, preferences, strengths, weaknesses, courses_data,
+                                                      reference_result)
+        
+        try:
+            response_text = self._generate_text(prompt, operation='learning_path', usage_context=usage_context)
+            
+            # Kiểm tra response có tồn tại không
+            if not response_text:
+                return {"error": "API không trả về dữ liệu"}
+            
+            # Parse và kiểm tra cấu trúc ngay tại đây, nếu thất bại thì tạo JSON từ text
+            try:
+                with metrics.span('json_parse'):
+                    cleaned_text = self._clean_json_response(response_text)
+                    result = parse_result(json.loads(cleaned_text))
+            except (json.JSONDecodeError, ResultSchemaError) as e:
+                # Nếu không phải JSON hợp lệ hoặc sai cấu trúc, tạo response mẫu
+                logger.warning("Response không hợp lệ (%s), dùng fallback cho vị trí %s", e, target_position)
+                with metrics.span('fallback'):
+                    result = self._create_fallback_response(response_text, target_position, courses_data, strengths, weaknesses)
+            
+            return result
+            
+        except Exception as e:
+            return {"error": f"Lỗi khi tạo lộ trình học: {str(e)}"}
+    
+    def _generate_learning_path_decomposed(self, target_position, student_gpa, preferences, strengths, weaknesses, courses_data, usage_context,
+                                           reference_result=None, fixed_sections=None):
+        """Gọi model cho ba phần song song với prompt và ngân sách token riêng rồi ghép thành kết quả đầy đủ
+        
+        Thời gian chờ gần bằng phần chậm nhất thay vì tổng các phần; phần lỗi được gọi lại riêng,
+        hết lượt thì phần đó dùng nội dung mẫu thay vì bỏ cả kết quả. Các phần có trong fixed_sections
+        không gọi model.
+        """
+        fixed_sections = fixed_sections or {}
+        with metrics.span('prompt_build'):
+            prompts = self._build_section_prompts(target_position, student_gpa, preferences, strengths, weaknesses,
+                                                  courses_data, reference_result)
+            prompts = {section: prompt for section, prompt in prompts.items() if section not in fixed_sections}
+        
+        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+            futures = {section: executor.submit(self._generate_section, section, prompt, usage_context)
+                       for section, prompt in prompts.items()}
+            outcomes = {section: future.result() for section, future in futures.items()}
+        for section, data in fixed_sections.items():
+            outcomes[section] = (data, None)
+            if self.usage_tracker:
+                self.usage_tracker.record(section, 0, 0, 0.0, 'template', **usage_context)
+        return self._assemble_sections(target_position, outcomes, courses_data, strengths, weaknesses)
+    
+    def _assemble_sections(self, target_position, outcomes, courses_data, strengths, weaknesses):
+        """Ghép kết quả các phần (phần -> (dữ liệu, lỗi)), phần lỗi dùng nội dung mẫu"""
+        result = {}
+        fallback = None
+        for section, (data, error) in outcomes.items():
+            if data is None:
+                # Lỗi gọi model ở phần lộ trình chính: báo lỗi để nơi gọi thử lại cả yêu cầu như chế độ một prompt
+                if section == 'learning_path' and not isinstance(error, ValueError):
+                    return {"error": f"Lỗi khi tạo lộ trình học: {str(error)}"}
+                with metrics.span('fallback'):
+                    fallback = fallback or self._create_fallback_response('', target_position, courses_data, strengths, weaknesses)
+                data = fallback
+            result.update({key: data[key] for key in RESULT_SECTIONS[section] if key in data})
+        return result
+    
+    def _generate_section(self, section, prompt, usage_context):
+        """Gọi model cho một phần, gọi lại riêng phần này khi lỗi; trả về (dữ liệu, None) hoặc (None, lỗi cuối cùng)"""
+        error = None
+        for attempt in range(1, SECTION_MAX_ATTEMPTS + 1):
+            try:
+                response_text = self._generate_text(prompt, operation=section, usage_context=usage_context,
+                                                    max_output_tokens=SECTION_MAX_OUTPUT_TOKENS[section])
+                if not response_text:
+                    raise RuntimeError("API không trả về dữ liệu")
+                with metrics.span('json_parse'):
+                    data = parse_section(section, json.loads(self._clean_json_response(response_text)))
+                return data, None
+            except Exception as e:
+                error = e
+                logger.warning("Tạo phần %s thất bại (lượt %s/%s): %s", section, attempt, SECTION_MAX_ATTEMPTS, e)
+        return None, error
+    
+    def _generate_shared_course_analysis(self, target_positions, prompt, usage_context):
+        """Một lời gọi phân tích môn học cho nhiều vị trí, gọi lại khi lỗi hoặc thiếu vị trí
+        
+        Returns:
+            dict: Vị trí -> (dữ liệu, None) hoặc (None, lỗi cuối cùng) như _generate_section
+        """
+        outcomes = {}
+        error = None
+        by_key = {normalize_name(position): position for position in target_positions}
+        for attempt in range(1, SECTION_MAX_ATTEMPTS + 1):
+            try:
+                response_text = self._generate_text(prompt, operation='course_analysis', usage_context=usage_context,
+                                                    max_output_tokens=SECTION_MAX_OUTPUT_TOKENS['course_analysis'] * len(target_positions))
+                if not response_text:
+                    raise RuntimeError("API không trả về dữ liệu")
+                with metrics.span('json_parse'):
+                    data = json.loads(self._clean_json_response(response_text))
+                    items = data.get('course_analyses') if isinstance(data, dict) else None
+                    if not isinstance(items, list):
+                        raise ResultSchemaError("Response thiếu phần course_analyses")
+                    for index, item in enumerate(items):
+                        if not isinstance(item, dict):
+                            continue
+                        # Khớp theo tên vị trí, model đổi cách viết tên thì khớp theo thứ tự
+                        position = by_key.get(normalize_name(item.get('target_position')))
+                        if position is None and index < len(target_positions):
+                            position = target_positions[index]
+                        if position is None or position in outcomes:
+                            continue
+                        try:
+                            outcomes[position] = (parse_section('course_analysis', item), None)
+                        except ResultSchemaError as e:
+                            error = e
+                missing = [position for position in target_positions if position not in outcomes]
+                if not missing:
+                    return outcomes
+                error = ResultSchemaError(f"Response thiếu phân tích môn học cho: {', '.join(missing)}")
+            except Exception as e:
+                error = e
+            logger.warning("Phân tích môn học chung thất bại (lượt %s/%s): %s", attempt, SECTION_MAX_ATTEMPTS, error)
+        for position in target_positions:
+            outcomes.setdefault(position, (None, error))
+        return outcomes
+    
+    def analyze_courses(self, courses_data, target_position=None, student_gpa=None):
+        """
+        Phân tích danh sách môn học để chọn 5 môn quan trọng nhất
+        
+        Args:
+            courses_data (list): Danh sách môn học
+            target_position (str): Vị trí mục tiêu
+            student_gpa (float): Điểm GPA của sinh viên
+            
+        Returns:
+            dict: Phân tích và 5 môn học quan trọng nhất
+        """
+        usage_context = {'target_position': target_position}
+        budget_reason = self.usage_tracker.check_budget() if self.usage_tracker else None
+        if budget_reason:
+            logger.info("Bỏ qua gọi model: %s", budget_reason)
+            self.usage_tracker.record('course_analysis', 0, 0, 0.0, 'budget_local', target_position=target_position)
+            result = self._create_course_fallback_response('', courses_data)
+            result['degraded'] = budget_reason
+            return result
+        
+        courses_text = "\n".join([f"- {course['name']} ({course['credits']} tín chỉ)" for course in courses_data])
+        
+        prompt = f"""
+        Bạn là một chuyên gia giáo dục CNTT. Hãy phân tích danh sách môn học sau và chọn ra 5 môn học quan trọng nhất:
+
+        Danh sách môn học:
+        {courses_text}
+        
+        Thông tin bổ sung:
+        - Vị trí mục tiêu: {target_position if target_position else 'Chưa xác định'}
+        - Điểm GPA: {student_gpa if student_gpa else 'Chưa có'}
+        
+        Yêu cầu:
+        1. Phân tích tầm quan trọng của từng môn học
+        2. Chọn 5 môn học quan trọng nhất dựa trên:
+           - Tính cần thiết cho nghề nghiệp CNTT
+           - Nền tảng cho các môn học khác
+           - Tính thực tiễn và ứng dụng
+           - Phù hợp với vị trí mục tiêu (nếu có)
+        3. Giải thích lý do chọn từng môn
+        4. Đưa ra lời khuyên học tập cho từng môn
+        
+        QUAN TRỌNG: Chỉ trả về JSON hợp lệ, không có text thêm. Cấu trúc JSON:
+        {{
+            "analysis_summary": "Tổng quan phân tích",
+            "important_courses": [
+                {{
+                    "name": "Tên môn học",
+                    "credits": "Số tín chỉ",
+                    "importance_score": "8/10",
+                    "reason": "Lý do quan trọng",
+                    "study_tips": "Lời khuyên học tập"
+                }}
+            ],
+            "general_recommendations": "Lời khuyên chung về việc học tập"
+        }}
+        """
+        
+        try:
+            response_text = self._generate_text(prompt, operation='course_analysis', usage_context=usage_context)
+            
+            # Kiểm tra response có tồn tại không
+            if not response_text:
+                return {"error": "API không trả về dữ liệu"}
+            
+            # Parse và kiểm tra cấu trúc ngay tại đây, nếu thất bại thì tạo JSON từ text
+            try:
+                with metrics.span('json_parse'):
+                    cleaned_text = self._clean_json_response(response_text)
+                    result = CourseAnalysis.from_dict(json.loads(cleaned_text)).to_dict()
+            except (json.JSONDecodeError, ResultSchemaError):
+                # Nếu không phải JSON hợp lệ hoặc sai cấu trúc, tạo response mẫu
+                logger.warning("Response phân tích môn học không hợp lệ, dùng fallback")
+                with metrics.span('fallback'):
+                    result = self._create_course_fallback_response(response_text, courses_data)
+            
+            return result
+            
+        except Exception as e:
+            return {"error": f"Lỗi khi phân tích môn học: {str(e)}"}
+    
+    def _budget_degraded_result(self, reason, usage_context, target_position, courses_data, strengths, weaknesses):
+        """Kết quả thay thế khi vượt ngân sách: ưu tiên lộ trình đã lưu, nếu không có thì tạo cục bộ"""
+        result = self.usage_tracker.db_manager.get_latest_result_for_position(target_position)
+        cache_status = 'budget_cached'
+        if not result:
+            result = self._create_fallback_response('', target_position, courses_data, strengths, weaknesses)
+            result.pop('raw_response', None)
+            cache_status = 'budget_local'
+        
+        self.usage_tracker.record('learning_path', 0, 0, 0.0, cache_status, **usage_context)
+        result['degraded'] = reason
+        return result
+    
+    def _generate_text(self, prompt, operation, usage_context=None, max_output_tokens=MAX_OUTPUT_TOKENS):
+        """Gọi model ở chế độ stream để đo time-to-first-byte và tổng thời gian"""
+        model = self.model
+        started = time.perf_counter()
+        response = model.generate_content(
+            prompt,
+            generation_config=_load_genai().types.GenerationConfig(
+                temperature=TEMPERATURE,
+                max_output_tokens=max_output_tokens
+            ),
+            stream=True
+        )
+        
+        parts = []
+        for chunk in response:
+            if not parts:
+                metrics.observe_phase('model_ttfb', time.perf_counter() - started, operation=operation)
+            parts.append(chunk.text)
+        latency = time.perf_counter() - started
+        metrics.observe_phase('model_total', latency, operation=operation)
+        
+        text = ''.join(parts)
+        logger.debug("Raw response %s (%d ký tự): %s", operation, len(text), text[:500])
+        
+        if self.usage_tracker:
+            # SDK mới trả về usage_metadata, nếu không có thì ước lượng theo độ dài
+            usage = getattr(response, 'usage_metadata', None)
+            prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt)
+            output_tokens = getattr(usage, 'candidates_token_count', None) or estimate_tokens(text)
+            self.usage_tracker.record(operation, prompt_tokens, output_tokens, round(latency * 1000, 1),
+                                      'miss', **(usage_context or {}))
+        return text
+    
+    @staticmethod
+    def _build_learning_path_prompt(target_position, student_gpa=None, preferences=None, strengths=None, weaknesses=None, courses_data=None,
+                                    reference_result=None):
+        """Tạo prompt cho việc sinh lộ trình học"""
         prompt = f"""
         Bạn là một chuyên gia tư vấn nghề nghiệp CNTT. Hãy tạo một lộ trình học chi tiết để đạt được vị trí "{target_position}" và phân tích các môn học quan trọng.
 
@@ -36,8 +510,8 @@ class GeminiClient:
         - Điểm yếu cần cải thiện: {weaknesses if weaknesses else 'Chưa có'}
         
         Danh sách môn học có sẵn:
-        {self._format_courses_for_prompt(courses_data) if courses_data else 'Chưa có danh sách môn học'}
-        
+        {GeminiClient._format_courses_for_prompt(courses_data) if courses_data else 'Chưa có danh sách môn học'}
+        {GeminiClient._format_reference_for_prompt(reference_result) if reference_result else ''}
         Yêu cầu:
         1. Phân tích vị trí "{target_position}" và xác định các domain kiến thức cần thiết
         2. Sắp xếp các domain từ dễ đến khó
@@ -110,116 +584,186 @@ class GeminiClient:
             }}
         }}
         """
-        
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=TEMPERATURE,
-                    max_output_tokens=MAX_OUTPUT_TOKENS
-                )
-            )
-            
-            # Debug: In ra response để kiểm tra
-            print(f"Debug - Raw response: {response.text}")
-            
-            # Kiểm tra response có tồn tại không
-            if not response.text:
-                return {"error": "API không trả về dữ liệu"}
-            
-            # Thử parse JSON, nếu thất bại thì tạo JSON từ text
-            try:
-                cleaned_text = self._clean_json_response(response.text)
-                result = json.loads(cleaned_text)
-            except json.JSONDecodeError:
-                # Nếu không phải JSON hợp lệ, tạo response mẫu
-                result = self._create_fallback_response(response.text, target_position, courses_data, strengths, weaknesses)
-            
-            return result
-            
-        except Exception as e:
-            return {"error": f"Lỗi khi tạo lộ trình học: {str(e)}"}
+        return prompt
     
-    def analyze_courses(self, courses_data, target_position=None, student_gpa=None):
+    @staticmethod
+    def _build_section_prompts(target_position, student_gpa=None, preferences=None, strengths=None, weaknesses=None, courses_data=None,
+                               reference_result=None):
+        """Tạo prompt riêng cho từng phần của kết quả (chế độ tạo tách rời), trả về dict phần -> prompt"""
+        student_info = GeminiClient._format_student_for_prompt(student_gpa, preferences, strengths, weaknesses)
+        rules = _SECTION_RULES
+        
+        learning_path_prompt = f"""
+        Bạn là một chuyên gia tư vấn nghề nghiệp CNTT. Hãy tạo một lộ trình học chi tiết để đạt được vị trí "{target_position}".
+
+        {student_info}
+        {GeminiClient._format_reference_for_prompt(reference_result) if reference_result else ''}
+        Yêu cầu:
+        1. Phân tích vị trí "{target_position}" và xác định các domain kiến thức cần thiết
+        2. Sắp xếp các domain từ dễ đến khó
+        3. Với mỗi domain, liệt kê các kỹ năng cụ thể cần học
+        4. Đưa ra timeline học tập phù hợp với trình độ hiện tại
+        5. Gợi ý các tài nguyên học tập (khóa học, sách, project thực hành)
+        6. Tận dụng điểm mạnh và đưa ra giải pháp cải thiện điểm yếu
+        
+        {rules}
+        
+        Cấu trúc JSON:
+        {{
+            "target_position": "{target_position}",
+            "analysis": "Phân tích về vị trí này",
+            "learning_path": [
+                {{
+                    "domain": "Tên lĩnh vực",
+                    "difficulty_level": "Cơ bản",
+                    "skills": ["Kỹ năng 1", "Kỹ năng 2"],
+                    "timeline": "Thời gian học",
+                    "resources": ["Tài nguyên 1", "Tài nguyên 2"]
+                }}
+            ],
+            "overall_timeline": "Tổng thời gian học",
+            "recommendations": "Lời khuyên cá nhân hóa"
+        }}
         """
-        Phân tích danh sách môn học để chọn 5 môn quan trọng nhất
         
-        Args:
-            courses_data (list): Danh sách môn học
-            target_position (str): Vị trí mục tiêu
-            student_gpa (float): Điểm GPA của sinh viên
-            
-        Returns:
-            dict: Phân tích và 5 môn học quan trọng nhất
+        course_analysis_prompt = f"""
+        Bạn là một chuyên gia giáo dục CNTT. Hãy chọn 5 môn học quan trọng nhất cho sinh viên muốn trở thành "{target_position}".
+
+        {student_info}
+        
+        Danh sách môn học có sẵn:
+        {GeminiClient._format_courses_for_prompt(courses_data) if courses_data else 'Chưa có danh sách môn học'}
+        
+        Yêu cầu:
+        1. Phân tích và chọn 5 môn học quan trọng nhất từ danh sách có sẵn
+        2. Giải thích lý do chọn từng môn và đưa ra lời khuyên học tập
+        
+        {rules}
+        
+        Cấu trúc JSON:
+        {{
+            "course_analysis": {{
+                "analysis_summary": "Tổng quan phân tích môn học",
+                "important_courses": [
+                    {{
+                        "name": "Tên môn học",
+                        "credits": "Số tín chỉ",
+                        "importance_score": "8/10",
+                        "reason": "Lý do quan trọng",
+                        "study_tips": "Lời khuyên học tập"
+                    }}
+                ],
+                "general_recommendations": "Lời khuyên chung về việc học tập"
+            }}
+        }}
         """
-        courses_text = "\n".join([f"- {course['name']} ({course['credits']} tín chỉ)" for course in courses_data])
         
-        prompt = f"""
-        Bạn là một chuyên gia giáo dục CNTT. Hãy phân tích danh sách môn học sau và chọn ra 5 môn học quan trọng nhất:
+        skill_suggestions_prompt = f"""
+        Bạn là một chuyên gia tư vấn nghề nghiệp CNTT. Hãy đề xuất kỹ năng bổ sung cho sinh viên muốn trở thành "{target_position}".
 
-        Danh sách môn học:
-        {courses_text}
+        {student_info}
         
-        Thông tin bổ sung:
-        - Vị trí mục tiêu: {target_position if target_position else 'Chưa xác định'}
-        - Điểm GPA: {student_gpa if student_gpa else 'Chưa có'}
+        Yêu cầu:
+        1. Đề xuất kỹ năng giúp tận dụng điểm mạnh
+        2. Đề xuất kỹ năng giúp cải thiện điểm yếu
+        3. Đề xuất kỹ năng mở rộng cơ hội nghề nghiệp
+        
+        {rules}
+        
+        Cấu trúc JSON:
+        {{
+            "skill_suggestions": {{
+                "strength_based_skills": [
+                    {{
+                        "skill_name": "Tên kỹ năng",
+                        "reason": "Lý do đề xuất dựa trên điểm mạnh",
+                        "benefit": "Lợi ích cho nghề nghiệp",
+                        "learning_path": "Cách học kỹ năng này"
+                    }}
+                ],
+                "weakness_improvement_skills": [
+                    {{
+                        "skill_name": "Tên kỹ năng",
+                        "reason": "Lý do đề xuất để cải thiện điểm yếu",
+                        "benefit": "Lợi ích khi cải thiện",
+                        "learning_path": "Cách học kỹ năng này"
+                    }}
+                ],
+                "career_expansion_skills": [
+                    {{
+                        "skill_name": "Tên kỹ năng",
+                        "reason": "Lý do đề xuất để mở rộng cơ hội",
+                        "benefit": "Lợi ích cho sự nghiệp",
+                        "learning_path": "Cách học kỹ năng này"
+                    }}
+                ]
+            }}
+        }}
+        """
+        
+        return {
+            'learning_path': learning_path_prompt,
+            'course_analysis': course_analysis_prompt,
+            'skill_suggestions': skill_suggestions_prompt,
+        }
+    
+    @staticmethod
+    def _build_shared_course_analysis_prompt(target_positions, student_gpa=None, preferences=None, strengths=None, weaknesses=None,
+                                             courses_data=None):
+        """Prompt phân tích môn học cho nhiều vị trí trong một lời gọi (chế độ so sánh), danh sách môn học chỉ gửi một lần"""
+        positions_text = "\n".join(f'        - "{position}"' for position in target_positions)
+        return f"""
+        Bạn là một chuyên gia giáo dục CNTT. Với mỗi vị trí dưới đây, hãy chọn 5 môn học quan trọng nhất cho sinh viên muốn trở thành vị trí đó.
+
+        Các vị trí cần phân tích:
+{positions_text}
+
+        {GeminiClient._format_student_for_prompt(student_gpa, preferences, strengths, weaknesses)}
+        
+        Danh sách môn học có sẵn:
+        {GeminiClient._format_courses_for_prompt(courses_data) if courses_data else 'Chưa có danh sách môn học'}
         
         Yêu cầu:
-        1. Phân tích tầm quan trọng của từng môn học
-        2. Chọn 5 môn học quan trọng nhất dựa trên:
-           - Tính cần thiết cho nghề nghiệp CNTT
-           - Nền tảng cho các môn học khác
-           - Tính thực tiễn và ứng dụng
-           - Phù hợp với vị trí mục tiêu (nếu có)
-        3. Giải thích lý do chọn từng môn
-        4. Đưa ra lời khuyên học tập cho từng môn
+        1. Với từng vị trí, phân tích và chọn 5 môn học quan trọng nhất từ danh sách có sẵn
+        2. Giải thích lý do chọn từng môn và đưa ra lời khuyên học tập
+        3. Mỗi vị trí có đúng một phần tử trong "course_analyses", theo thứ tự đã liệt kê, ghi đúng tên vị trí
         
-        QUAN TRỌNG: Chỉ trả về JSON hợp lệ, không có text thêm. Cấu trúc JSON:
+        {_SECTION_RULES}
+        
+        Cấu trúc JSON:
         {{
-            "analysis_summary": "Tổng quan phân tích",
-            "important_courses": [
+            "course_analyses": [
                 {{
-                    "name": "Tên môn học",
-                    "credits": "Số tín chỉ",
-                    "importance_score": "8/10",
-                    "reason": "Lý do quan trọng",
-                    "study_tips": "Lời khuyên học tập"
+                    "target_position": "Tên vị trí",
+                    "course_analysis": {{
+                        "analysis_summary": "Tổng quan phân tích môn học",
+                        "important_courses": [
+                            {{
+                                "name": "Tên môn học",
+                                "credits": "Số tín chỉ",
+                                "importance_score": "8/10",
+                                "reason": "Lý do quan trọng",
+                                "study_tips": "Lời khuyên học tập"
+                            }}
+                        ],
+                        "general_recommendations": "Lời khuyên chung về việc học tập"
+                    }}
                 }}
-            ],
-            "general_recommendations": "Lời khuyên chung về việc học tập"
+            ]
         }}
         """
-        
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=TEMPERATURE,
-                    max_output_tokens=MAX_OUTPUT_TOKENS
-                )
-            )
-            
-            # Debug: In ra response để kiểm tra
-            print(f"Debug - Raw response: {response.text}")
-            
-            # Kiểm tra response có tồn tại không
-            if not response.text:
-                return {"error": "API không trả về dữ liệu"}
-            
-            # Thử parse JSON, nếu thất bại thì tạo JSON từ text
-            try:
-                cleaned_text = self._clean_json_response(response.text)
-                result = json.loads(cleaned_text)
-            except json.JSONDecodeError:
-                # Nếu không phải JSON hợp lệ, tạo response mẫu
-                result = self._create_course_fallback_response(response.text, courses_data)
-            
-            return result
-            
-        except Exception as e:
-            return {"error": f"Lỗi khi phân tích môn học: {str(e)}"}
     
-    def _format_courses_for_prompt(self, courses_data):
+    @staticmethod
+    def _format_student_for_prompt(student_gpa=None, preferences=None, strengths=None, weaknesses=None):
+        """Thông tin sinh viên dùng chung cho các prompt tạo tách rời"""
+        return f"""Thông tin sinh viên:
+        - Điểm GPA: {student_gpa if student_gpa else 'Chưa có'}
+        - Sở thích: {preferences if preferences else 'Chưa có'}
+        - Điểm mạnh: {strengths if strengths else 'Chưa có'}
+        - Điểm yếu cần cải thiện: {weaknesses if weaknesses else 'Chưa có'}"""
+    
+    @staticmethod
+    def _format_courses_for_prompt(courses_data):
         """Format danh sách môn học cho prompt"""
         if not courses_data:
             return "Chưa có danh sách môn học"
@@ -227,6 +771,28 @@ class GeminiClient:
         courses_text = "\n".join([f"- {course['name']} ({course['credits']} tín chỉ)" for course in courses_data])
         return courses_text
     
+    @staticmethod
+    def _format_reference_for_prompt(reference_result):
+        """Tóm tắt lộ trình đã lưu của một yêu cầu gần giống (hoặc lộ trình mẫu) để model điều chỉnh thay vì tạo từ đầu"""
+        if reference_result.get('template'):
+            heading = ("Lộ trình mẫu (đã tạo cho vị trí này với mức GPA tương đương, hãy cá nhân hóa theo sở thích, "
+                       "điểm mạnh và điểm yếu của sinh viên này):")
+        else:
+            heading = ("Lộ trình tham khảo (đã tạo cho sinh viên có thông tin gần giống, hãy điều chỉnh theo thông tin "
+                       "của sinh viên này, không sao chép nguyên văn):")
+        lines = [
+            "",
+            heading,
+            f"- Tổng thời gian: {reference_result.get('overall_timeline') or 'Chưa có'}"
+        ]
+        for i, step in enumerate(reference_result.get('learning_path', []), 1):
+            lines.append(f"- Bước {i}: {step.get('domain', '')} ({step.get('difficulty_level', '')}, "
+                         f"{step.get('timeline', '')}): {', '.join(step.get('skills', []))}")
+        courses = reference_result.get('course_analysis', {}).get('important_courses', [])
+        if courses:
+            lines.append(f"- Môn học quan trọng: {', '.join(course.get('name', '') for course in courses)}")
+        return "\n        ".join(lines) + "\n"
+    
     def _clean_json_response(self, text):
         """Làm sạch response text để có thể parse JSON"""
         import re
@@ -0,0 +1,157 @@
+"""
+Ghi database qua một luồng ghi duy nhất với group commit
+
+Các phiên Streamlit, worker và API gửi thao tác ghi (lưu lộ trình, lưu lịch sử xuất file) vào hàng đợi;
+luồng ghi gom các thao tác đến trong vài mili giây vào một transaction, commit một lần rồi trả id
+cho từng nơi gọi qua Future. Mỗi thao tác chạy trong savepoint riêng nên một thao tác lỗi không làm hỏng
+các thao tác khác trong cùng lô.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_MAX_DELAY
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+# Một luồng ghi cho mỗi database trong tiến trình
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path):
+    """Luồng ghi dùng chung của database trong tiến trình hiện tại (khởi động ở lần gọi đầu)"""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None or not writer.is_alive():
+            writer = _writers[db_path] = GroupCommitWriter(db_path).start()
+        return writer
+
+
+class GroupCommitWriter:
+    """Luồng ghi nhận thao tác qua hàng đợi và commit theo lô"""
+
+    def __init__(self, db_path, max_batch=GROUP_COMMIT_MAX_BATCH, max_delay=GROUP_COMMIT_MAX_DELAY):
+        """
+        Args:
+            db_path (str): Đường dẫn database
+            max_batch (int): Số thao tác tối đa trong một transaction
+            max_delay (float): Thời gian tối đa (giây) chờ gom thêm thao tác sau thao tác đầu tiên của lô
+        """
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"group-commit:{db_path}", daemon=True)
+        self._stats = {'operations': 0, 'transactions': 0, 'failed_operations': 0}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def submit(self, func, *args):
+        """
+        Đưa thao tác ghi vào hàng đợi
+
+        Args:
+            func: Hàm func(cursor, *args) thực hiện ghi trong transaction đang mở, không tự commit
+
+        Returns:
+            Future: Nhận giá trị trả về của func sau khi transaction đã commit
+        """
+        future = Future()
+        self._queue.put((func, args, future))
+        return future
+
+    def stop(self, timeout=None):
+        """Ghi nốt các thao tác đang chờ rồi dừng luồng ghi"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch, stopping = self._collect(item)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _collect(self, first):
+        """Gom thêm các thao tác đến trong max_delay giây (hoặc đến khi đủ max_batch)"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                # Lấy ngay các thao tác đã xếp hàng, chỉ chờ thêm khi hàng đợi rỗng
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, conn, batch):
+        """Chạy cả lô trong một transaction, mỗi thao tác trong một savepoint"""
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            for func, args, future in batch:
+                cursor.execute('SAVEPOINT operation')
+                try:
+                    outcomes.append((future, func(cursor, *args), None))
+                    cursor.execute('RELEASE operation')
+                except Exception as e:
+                    cursor.execute('ROLLBACK TO operation')
+                    cursor.execute('RELEASE operation')
+                    outcomes.append((future, None, e))
+            conn.execute('COMMIT')
+        except Exception as e:
+            logger.exception("Commit lô %d thao tác thất bại", len(batch))
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        failed = 0
+        for future, value, error in outcomes:
+            if error is None:
+                future.set_result(value)
+            else:
+                failed += 1
+                future.set_exception(error)
+        with self._stats_lock:
+            self._stats['operations'] += len(batch)
+            self._stats['transactions'] += 1
+            self._stats['failed_operations'] += failed
+
+    def stats(self):
+        """Số thao tác, số transaction và số thao tác trung bình mỗi lần commit"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['operations_per_commit'] = round(stats['operations'] / stats['transactions'], 2) if stats['transactions'] else 0.0
+        stats['pending'] = self._queue.qsize()
+        return stats
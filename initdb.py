@@ -71,6 +71,7 @@ class DatabaseInitializer:
                     analysis TEXT,
                     overall_timeline TEXT,
                     recommendations TEXT,
+                    raw_response TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (student_id) REFERENCES students (id)
                 )
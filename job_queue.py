@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Hàng đợi công việc bền vững trên SQLite để tạo lộ trình học ngoài luồng script Streamlit
+
+Ví dụ chạy worker riêng:
+    python job_queue.py --workers 4
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from config import (JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS, JOB_POLL_INTERVAL, LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE,
+                    SIMILARITY_ENABLED, GROUP_COMMIT_WRITES, TEMPLATES_ENABLED)
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái job: queued -> running -> done | queued (thử lại) | dead (hết lượt thử)
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class LeaseLostError(RuntimeError):
+    """Worker không còn giữ lease của job (đã hết hạn và được worker khác nhận lại)"""
+
+
+def complete_in_transaction(cursor, job_id, worker_id, learning_path_id):
+    """Đánh dấu job hoàn thành trong transaction đang lưu lộ trình
+
+    Raises:
+        LeaseLostError: Worker đã mất lease, nơi gọi rollback để lộ trình không bị lưu hai lần
+    """
+    cursor.execute('''
+        UPDATE generation_jobs
+        SET status = 'done', learning_path_id = ?, lease_owner = NULL, error = NULL,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND status = 'running' AND lease_owner = ?
+    ''', (learning_path_id, job_id, worker_id))
+    if cursor.rowcount != 1:
+        raise LeaseLostError(f"Worker {worker_id} đã mất lease của job {job_id}")
+
+
+class JobQueue:
+    """Hàng đợi job lưu trong bảng generation_jobs với lease, giới hạn thử lại và dead-letter"""
+
+    def __init__(self, db_path="learning_paths.db"):
+        self.db_path = db_path
+        self.init_table()
+
+    def _connect(self):
+        """Mở kết nối với timeout đủ dài cho nhiều worker cùng ghi"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_table(self):
+        """Tạo bảng job và bật WAL để worker ghi không chặn người đọc"""
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'running', 'done', 'dead'
+                payload TEXT NOT NULL, -- JSON
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                learning_path_id INTEGER,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs(status, available_at)')
+        conn.close()
+
+    def submit(self, payload, max_attempts=JOB_MAX_ATTEMPTS):
+        """Đưa một yêu cầu tạo lộ trình vào hàng đợi, trả về id job"""
+        conn = self._connect()
+        cursor = conn.execute('''
+            INSERT INTO generation_jobs (payload, max_attempts, available_at)
+            VALUES (?, ?, ?)
+        ''', (json.dumps(payload, ensure_ascii=False), max_attempts, time.time()))
+        job_id = cursor.lastrowid
+        conn.close()
+        return job_id
+
+    def claim(self, worker_id, lease_seconds=JOB_LEASE_SECONDS):
+        """Nhận job tiếp theo (job mới hoặc job có lease đã hết hạn), None nếu hàng đợi rỗng"""
+        conn = self._connect()
+        try:
+            while True:
+                now = time.time()
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute('''
+                    SELECT * FROM generation_jobs
+                    WHERE (status = 'queued' AND available_at <= ?)
+                       OR (status = 'running' AND lease_expires_at < ?)
+                    ORDER BY id
+                    LIMIT 1
+                ''', (now, now)).fetchone()
+
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+
+                # Worker trước đã chết khi đang chạy lượt cuối: chuyển sang dead-letter
+                if row['status'] == 'running' and row['attempts'] >= row['max_attempts']:
+                    conn.execute('''
+                        UPDATE generation_jobs
+                        SET status = 'dead', lease_owner = NULL, updated_at = CURRENT_TIMESTAMP,
+                            error = COALESCE(error, 'Lease hết hạn ở lượt thử cuối')
+                        WHERE id = ?
+                    ''', (row['id'],))
+                    conn.execute('COMMIT')
+                    continue
+
+                conn.execute('''
+                    UPDATE generation_jobs
+                    SET status = 'running', attempts = attempts + 1, lease_owner = ?,
+                        lease_expires_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (worker_id, now + lease_seconds, row['id']))
+                conn.execute('COMMIT')
+
+                job = dict(row)
+                job['attempts'] += 1
+                job['payload'] = json.loads(job['payload'])
+                return job
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=JOB_LEASE_SECONDS):
+        """Gia hạn lease cho job đang chạy, trả về False nếu worker đã mất lease"""
+        conn = self._connect()
+        cursor = conn.execute('''
+            UPDATE generation_jobs SET lease_expires_at = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+        ''', (time.time() + lease_seconds, job_id, worker_id))
+        conn.close()
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, learning_path_id):
+        """Đánh dấu job hoàn thành với id lộ trình đã lưu (worker dùng complete_in_transaction khi lưu)"""
+        conn = self._connect()
+        conn.execute('''
+            UPDATE generation_jobs
+            SET status = 'done', learning_path_id = ?, lease_owner = NULL, error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_owner = ?
+        ''', (learning_path_id, job_id, worker_id))
+        conn.close()
+
+    def fail(self, job_id, worker_id, error):
+        """Ghi nhận lỗi: xếp lại hàng đợi với backoff hoặc chuyển sang dead-letter khi hết lượt"""
+        conn = self._connect()
+        row = conn.execute('SELECT attempts, max_attempts FROM generation_jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            conn.close()
+            return
+
+        if row['attempts'] >= row['max_attempts']:
+            status, available_at = 'dead', time.time()
+        else:
+            status, available_at = 'queued', time.time() + 2 ** row['attempts']
+
+        conn.execute('''
+            UPDATE generation_jobs
+            SET status = ?, available_at = ?, error = ?, lease_owner = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_owner = ?
+        ''', (status, available_at, str(error), job_id, worker_id))
+        conn.close()
+
+    def get_job(self, job_id):
+        """Lấy trạng thái job theo id"""
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM generation_jobs WHERE id = ?', (job_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def list_dead_letters(self, limit=50):
+        """Các job đã hết lượt thử"""
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT id, attempts, error, updated_at FROM generation_jobs
+            WHERE status = 'dead' ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def requeue(self, job_id):
+        """Đưa job dead-letter trở lại hàng đợi với số lần thử được đặt lại"""
+        conn = self._connect()
+        cursor = conn.execute('''
+            UPDATE generation_jobs
+            SET status = 'queued', attempts = 0, available_at = ?, error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'dead'
+        ''', (time.time(), job_id))
+        conn.close()
+        return cursor.rowcount == 1
+
+
+class _LeaseKeeper:
+    """Thread gia hạn lease định kỳ trong lúc worker đang xử lý job"""
+
+    def __init__(self, queue, job_id, worker_id, lease_seconds):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(queue, job_id, worker_id, lease_seconds), daemon=True
+        )
+
+    def _run(self, queue, job_id, worker_id, lease_seconds):
+        while not self._stop.wait(lease_seconds / 3):
+            try:
+                if not queue.heartbeat(job_id, worker_id, lease_seconds):
+                    logger.warning("Worker %s mất lease của job %s, kết quả sẽ không được lưu", worker_id, job_id)
+                    return
+            except Exception as e:
+                # Lỗi tạm thời (database bị khóa...): thử lại ở nhịp sau, lease còn hạn đến lúc đó
+                logger.warning("Gia hạn lease job %s thất bại: %s", job_id, e)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+
+
+def process_job(job, client, db_manager, courses, worker_id):
+    """Tạo lộ trình cho job, lưu và đánh dấu job hoàn thành trong cùng transaction, trả về id lộ trình"""
+    return generate_and_save(job['payload'], client, db_manager, courses, job_lease=(job['id'], worker_id))
+
+
+def generate_and_save(payload, client, db_manager, courses, job_lease=None):
+    """Tạo lộ trình theo payload {'target_position', 'student_data', 'reuse_similar'} và lưu, trả về id lộ trình
+
+    job_lease (job_id, worker_id): chỉ lưu nếu worker vẫn giữ lease của job (LeaseLostError nếu không)
+    """
+    student_data = payload['student_data']
+
+    result = client.generate_learning_path(
+        target_position=payload['target_position'],
+        student_gpa=student_data.get('gpa'),
+        preferences=student_data.get('preferences'),
+        strengths=student_data.get('strengths'),
+        weaknesses=student_data.get('weaknesses'),
+        courses_data=courses,
+        student_name=student_data.get('student_name'),
+        reuse_similar=payload.get('reuse_similar', True)
+    )
+    if "error" in result:
+        raise RuntimeError(result["error"])
+
+    return db_manager.save_learning_path(student_data, result, job_lease=job_lease)
+
+
+def run_worker(db_path="learning_paths.db", worker_id=None, stop_event=None,
+               poll_interval=JOB_POLL_INTERVAL, lease_seconds=JOB_LEASE_SECONDS):
+    """Vòng lặp worker: nhận job, tạo lộ trình, lưu kết quả và cập nhật trạng thái"""
+    from data_processor import DataProcessor
+    from database_manager import DatabaseManager
+    from gemini_client import GeminiClient
+    from metrics import configure_logging
+    from path_templates import PathTemplates
+    from request_coalescer import SingleFlight
+    from similarity_index import SimilarityIndex
+    from usage_tracker import UsageTracker
+
+    configure_logging(LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queue = JobQueue(db_path)
+    db_manager = DatabaseManager(db_path, group_commit=GROUP_COMMIT_WRITES)
+    client = GeminiClient(usage_tracker=UsageTracker(db_manager), coalescer=SingleFlight(db_path),
+                          similarity_index=SimilarityIndex(db_manager) if SIMILARITY_ENABLED else None,
+                          templates=PathTemplates(db_manager) if TEMPLATES_ENABLED else None)
+    logger.info("Worker %s bắt đầu nhận job", worker_id)
+
+    while stop_event is None or not stop_event.is_set():
+        try:
+            job = queue.claim(worker_id, lease_seconds)
+        except sqlite3.Error as e:
+            # "database is locked" khi tải ghi cao: chờ rồi nhận lại, không để tiến trình worker chết
+            logger.warning("Worker %s không nhận được job: %s", worker_id, e)
+            time.sleep(poll_interval)
+            continue
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        logger.info("Worker %s xử lý job %s (lượt %s/%s)", worker_id, job['id'], job['attempts'], job['max_attempts'])
+        try:
+            with _LeaseKeeper(queue, job['id'], worker_id, lease_seconds):
+                process_job(job, client, db_manager, DataProcessor.load_courses(), worker_id)
+        except LeaseLostError as e:
+            # Job đã thuộc về worker khác: không ghi lỗi đè lên lượt đang chạy của worker đó
+            logger.warning("Bỏ kết quả job %s: %s", job['id'], e)
+        except Exception as e:
+            logger.warning("Job %s thất bại: %s", job['id'], e)
+            try:
+                queue.fail(job['id'], worker_id, e)
+            except sqlite3.Error as fail_error:
+                # Lease sẽ hết hạn và job được nhận lại (hoặc dead-letter ở lượt cuối)
+                logger.error("Không ghi được lỗi của job %s: %s", job['id'], fail_error)
+
+
+class WorkerPool:
+    """Nhóm tiến trình worker chạy nền"""
+
+    def __init__(self, workers=2, db_path="learning_paths.db"):
+        self.workers = workers
+        self.db_path = db_path
+        self._context = multiprocessing.get_context('spawn')
+        self._stop_event = self._context.Event()
+        self._processes = []
+
+    def start(self):
+        """Khởi động các tiến trình worker"""
+        for index in range(self.workers):
+            process = self._context.Process(
+                target=run_worker,
+                kwargs={'db_path': self.db_path, 'stop_event': self._stop_event},
+                name=f"learning-path-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        return self
+
+    def stop(self, timeout=5):
+        """Dừng các worker sau khi xong job đang chạy"""
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+
+    def alive_workers(self):
+        """Số worker còn đang chạy"""
+        return sum(1 for process in self._processes if process.is_alive())
+
+
+def main():
+    """Hàm main"""
+    parser = argparse.ArgumentParser(description="Chạy worker xử lý hàng đợi tạo lộ trình học")
+    parser.add_argument('--workers', type=int, default=2, help="Số tiến trình worker")
+    parser.add_argument('--db', default='learning_paths.db', help="Đường dẫn database")
+    args = parser.parse_args()
+
+    print(f"🚀 Khởi động {args.workers} worker cho {args.db}")
+    pool = WorkerPool(args.workers, args.db).start()
+    try:
+        while pool.alive_workers():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n👋 Đang dừng worker...")
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
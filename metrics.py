@@ -0,0 +1,198 @@
+"""
+Đo thời gian theo từng giai đoạn xử lý, xuất histogram dạng Prometheus và logging có lấy mẫu
+"""
+
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Các mốc bucket (giây) cho histogram độ trễ
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _escape_label_value(value):
+    """Escape giá trị nhãn theo định dạng text của Prometheus (\\, \" và xuống dòng)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _escape_help(text):
+    """Escape dòng HELP (\\ và xuống dòng)"""
+    return str(text).replace('\\', '\\\\').replace('\n', '\\n')
+
+
+class Histogram:
+    """Histogram tích lũy theo bucket, tương thích định dạng Prometheus"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Bucket cuối là +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Ghi nhận một giá trị"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Ước lượng phân vị q (0-1) bằng nội suy tuyến tính trong bucket"""
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= target and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                # Bucket +Inf không có cận trên, trả về cận dưới
+                if index == len(self.buckets):
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Lưu các histogram theo tên metric và nhãn"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, help_text=None, **labels):
+        """Ghi nhận giá trị vào histogram `name` với các nhãn tương ứng"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+            if help_text:
+                self._help.setdefault(name, help_text)
+
+    @contextmanager
+    def span(self, phase, **labels):
+        """Đo thời gian của một giai đoạn xử lý"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - started, **labels)
+
+    def observe_phase(self, phase, seconds, **labels):
+        """Ghi nhận thời gian (giây) của một giai đoạn đã đo sẵn"""
+        self.observe('learning_path_phase_seconds', seconds,
+                     help_text="Thời gian xử lý theo từng giai đoạn tạo lộ trình học",
+                     phase=phase, **labels)
+
+    def summary(self):
+        """Tóm tắt các histogram để hiển thị (số lần, trung bình, p50, p95 theo ms)"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return [
+                {
+                    'metric': name,
+                    **dict(labels),
+                    'count': histogram.count,
+                    'avg_ms': round(histogram.sum / histogram.count * 1000, 2) if histogram.count else 0.0,
+                    'p50_ms': round(histogram.quantile(0.50) * 1000, 2),
+                    'p95_ms': round(histogram.quantile(0.95) * 1000, 2)
+                }
+                for (name, labels), histogram in items
+            ]
+
+    def to_prometheus(self):
+        """Xuất tất cả histogram theo định dạng text của Prometheus"""
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self._histograms})
+            for name in names:
+                if name in self._help:
+                    lines.append(f"# HELP {name} {_escape_help(self._help[name])}")
+                lines.append(f"# TYPE {name} histogram")
+
+                for (metric_name, labels), histogram in sorted(self._histograms.items()):
+                    if metric_name != name:
+                        continue
+                    label_text = ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels)
+                    prefix = f"{label_text}," if label_text else ''
+
+                    cumulative = 0
+                    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                        cumulative += bucket_count
+                        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+
+                    suffix = f"{{{label_text}}}" if label_text else ''
+                    lines.append(f"{name}_sum{suffix} {histogram.sum}")
+                    lines.append(f"{name}_count{suffix} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, file_path):
+        """Ghi metrics ra file (dùng cho textfile collector của node_exporter)"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+
+# Registry dùng chung trong tiến trình (tồn tại qua các lần rerun của Streamlit)
+metrics = MetricsRegistry()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, registry=metrics):
+    """Mở endpoint HTTP /metrics trong thread nền (chỉ khởi động một lần mỗi tiến trình)"""
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+class SamplingFilter(logging.Filter):
+    """Chỉ giữ lại một tỷ lệ các bản ghi dưới mức INFO (các mức cao hơn luôn được giữ)"""
+
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        if record.levelno >= logging.INFO:
+            return True
+        return random.random() < self.sample_rate
+
+
+def configure_logging(level='INFO', debug_sample_rate=1.0):
+    """Cấu hình logging của ứng dụng với lấy mẫu cho log DEBUG"""
+    root = logging.getLogger()
+    if not any(isinstance(f, SamplingFilter) for handler in root.handlers for f in handler.filters):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handler.addFilter(SamplingFilter(debug_sample_rate))
+        root.addHandler(handler)
+    root.setLevel(level)
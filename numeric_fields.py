@@ -0,0 +1,99 @@
+"""
+Đọc giá trị số từ các trường văn bản của kết quả model
+
+Model trả về số tín chỉ, điểm quan trọng và thời gian dưới dạng chuỗi ("3 tín chỉ", "8/10", "3-6 tháng").
+Các hàm ở đây được gọi một lần lúc ghi database để lưu thêm cột số bên cạnh văn bản gốc
+(xem NUMERIC_COLUMNS), truy vấn lọc/sắp xếp/tổng hợp dùng cột số và chỉ mục thay vì đọc lại chuỗi.
+"""
+
+import re
+import unicodedata
+
+_NUMBER = re.compile(r'(\d+(?:[.,]\d+)?)')
+_SCORE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:(/)\s*(\d+(?:[.,]\d+)?)|(%))?')
+_DURATION = re.compile(r'(\d+(?:[.,]\d+)?)\s*(tháng|năm|tuần|ngày|months?|years?|weeks?|days?)?')
+_RANGE_SEPARATOR = re.compile(r'\s*(?:-|–|—|~|\bđến\b|\btới\b|\bto\b)\s*')
+
+# Số tháng của mỗi đơn vị thời gian
+_MONTHS_PER_UNIT = {
+    'tháng': 1.0, 'month': 1.0, 'months': 1.0,
+    'năm': 12.0, 'year': 12.0, 'years': 12.0,
+    'tuần': 12 / 52, 'week': 12 / 52, 'weeks': 12 / 52,
+    'ngày': 12 / 365, 'day': 12 / 365, 'days': 12 / 365,
+}
+
+
+def _to_float(text):
+    return float(text.replace(',', '.'))
+
+
+def parse_credits(text):
+    """Số tín chỉ ("3", "3 tín chỉ" -> 3.0), None nếu không có số"""
+    match = _NUMBER.search(str(text if text is not None else ''))
+    return _to_float(match.group(1)) if match else None
+
+
+def parse_score(text):
+    """
+    Điểm quan trọng dạng (tử số, mẫu số)
+
+    "8/10" -> (8.0, 10.0), "4/5" -> (4.0, 5.0), "85%" -> (85.0, 100.0); không có mẫu số thì coi là thang 10
+    như prompt yêu cầu ("7,5" -> (7.5, 10.0)). Không đọc được hoặc mẫu số bằng 0 -> (None, None).
+    """
+    match = _SCORE.search(str(text if text is not None else ''))
+    if not match:
+        return None, None
+    numerator = _to_float(match.group(1))
+    if match.group(2):
+        denominator = _to_float(match.group(3))
+    elif match.group(4):
+        denominator = 100.0
+    else:
+        denominator = 10.0
+    if not denominator:
+        return None, None
+    return numerator, denominator
+
+
+def parse_timeline(text):
+    """
+    Khoảng thời gian quy ra tháng (ít nhất, nhiều nhất)
+
+    "3-6 tháng" -> (3.0, 6.0), "6 tháng - 1 năm" -> (6.0, 12.0), "2 tuần" -> (0.46, 0.46); các mốc của khoảng
+    ngăn bởi "-", "~", "đến", "to", trong một mốc các số được cộng dồn ("2 năm 6 tháng" -> (30.0, 30.0)).
+    Số không kèm đơn vị lấy đơn vị của số đứng sau, không có đơn vị nào thì tính là tháng. Không có số -> (None, None).
+    """
+    text = unicodedata.normalize('NFC', str(text if text is not None else '')).lower()
+    bounds = [_DURATION.findall(bound) for bound in _RANGE_SEPARATOR.split(text)]
+    bounds = [[(_to_float(value), unit) for value, unit in parts] for parts in bounds if parts]
+    if not bounds:
+        return None, None
+
+    months = []
+    unit = 'tháng'
+    for parts in reversed(bounds):
+        total = 0.0
+        for value, part_unit in reversed(parts):
+            unit = part_unit or unit
+            total += value * _MONTHS_PER_UNIT[unit]
+        months.append(round(total, 2))
+    return min(months), max(months)
+
+
+# Cột văn bản -> các cột số lưu kèm và hàm đọc (trả về tuple cùng độ dài với các cột số)
+NUMERIC_COLUMNS = {
+    'learning_paths': {'overall_timeline': (('timeline_min_months', 'timeline_max_months'), parse_timeline)},
+    'learning_steps': {'timeline': (('timeline_min_months', 'timeline_max_months'), parse_timeline)},
+    'important_courses': {
+        'credits': (('credits_value',), lambda text: (parse_credits(text),)),
+        'importance_score': (('score_numerator', 'score_denominator'), parse_score),
+    },
+}
+
+
+def numeric_values(table, row):
+    """Giá trị các cột số của một dòng (dict cột văn bản -> giá trị), theo thứ tự trong NUMERIC_COLUMNS"""
+    values = []
+    for source, (_, parser) in NUMERIC_COLUMNS[table].items():
+        values.extend(parser(row.get(source)))
+    return tuple(values)
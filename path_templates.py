@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Lộ trình mẫu dựng sẵn cho mỗi vị trí × mức GPA × phiên bản danh sách môn học
+
+Job warm-up gọi model trước cho mọi tổ hợp (chưa có sở thích, điểm mạnh, điểm yếu) và lưu kết quả
+vào bảng path_templates. Khi tạo lộ trình cho sinh viên, GeminiClient tìm mẫu cùng vị trí và mức GPA:
+- Sinh viên không nhập thông tin cá nhân: trả về luôn lộ trình mẫu
+- Có thông tin cá nhân: mẫu được đưa vào prompt để model cá nhân hóa, phân tích môn học của mẫu được dùng lại
+
+Phiên bản danh sách môn học là hash của danh sách môn; danh sách đổi thì mẫu cũ không còn được dùng
+và lần warm-up tiếp theo tạo lại mẫu rồi xóa các mẫu cũ.
+
+Ví dụ:
+    python path_templates.py warm
+    python path_templates.py warm --watch 3600
+    python path_templates.py list
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import GPA_BANDS, TEMPLATE_WARM_WORKERS
+from database_manager import compress_text, decompress_text
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_GPA_BAND = 'Không rõ'
+
+
+def gpa_band(gpa):
+    """Xếp loại học lực của GPA theo GPA_BANDS, UNKNOWN_GPA_BAND nếu chưa có GPA"""
+    if gpa is None:
+        return UNKNOWN_GPA_BAND
+    band = GPA_BANDS[0][1]
+    for low, label in GPA_BANDS:
+        if float(gpa) >= low:
+            band = label
+    return band
+
+
+def band_gpas():
+    """GPA đại diện (giữa khoảng) của từng mức dùng khi tạo mẫu, mức chưa có GPA ứng với None"""
+    gpas = {}
+    for i, (low, label) in enumerate(GPA_BANDS):
+        high = GPA_BANDS[i + 1][0] if i + 1 < len(GPA_BANDS) else 4.0
+        gpas[label] = round((low + high) / 2, 2)
+    gpas[UNKNOWN_GPA_BAND] = None
+    return gpas
+
+
+def catalog_version(courses_data):
+    """Hash ngắn của danh sách môn học (không phụ thuộc thứ tự dòng trong file)"""
+    courses = sorted((str(course.get('name', '')), str(course.get('credits', ''))) for course in courses_data or [])
+    return hashlib.sha1(json.dumps(courses, ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+
+
+class PathTemplates:
+    """Đọc/ghi lộ trình mẫu trong database"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def _connect(self):
+        return sqlite3.connect(self.db_manager.db_path, timeout=30)
+
+    def find(self, target_position, student_gpa, courses_data):
+        """
+        Lộ trình mẫu cho vị trí và mức GPA với danh sách môn học hiện tại
+
+        Returns:
+            dict: Kết quả (dạng kết quả của GeminiClient) kèm khóa 'template' mô tả mẫu, None nếu chưa có
+        """
+        key = (target_position, gpa_band(student_gpa), catalog_version(courses_data))
+        with self.db_manager.reads.snapshot() as conn:
+            row = conn.execute('''
+                SELECT result FROM path_templates
+                WHERE target_position = ? AND gpa_band = ? AND catalog_version = ?
+            ''', key).fetchone()
+        if not row:
+            return None
+
+        result = json.loads(decompress_text(row[0]))
+        result['template'] = {'target_position': key[0], 'gpa_band': key[1], 'catalog_version': key[2]}
+        return result
+
+    def exists(self, target_position, band, version):
+        with self.db_manager.reads.snapshot() as conn:
+            row = conn.execute('''
+                SELECT 1 FROM path_templates WHERE target_position = ? AND gpa_band = ? AND catalog_version = ?
+            ''', (target_position, band, version)).fetchone()
+        return row is not None
+
+    def save(self, target_position, band, version, result):
+        """Lưu (hoặc thay) lộ trình mẫu"""
+        payload = {key: value for key, value in result.items() if key not in ('raw_response', 'template')}
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT OR REPLACE INTO path_templates (target_position, gpa_band, catalog_version, result)
+                VALUES (?, ?, ?, ?)
+            ''', (target_position, band, version, compress_text(json.dumps(payload, ensure_ascii=False))))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def prune(self, keep_version):
+        """Xóa mẫu của các phiên bản danh sách môn học khác, trả về số mẫu đã xóa"""
+        conn = self._connect()
+        try:
+            deleted = conn.execute('DELETE FROM path_templates WHERE catalog_version != ?', (keep_version,)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return deleted
+
+    def list(self):
+        """Danh sách mẫu đã lưu"""
+        with self.db_manager.reads.snapshot() as conn:
+            rows = conn.execute('''
+                SELECT target_position, gpa_band, catalog_version, created_at
+                FROM path_templates
+                ORDER BY target_position, gpa_band
+            ''').fetchall()
+        return [
+            {'target_position': row[0], 'gpa_band': row[1], 'catalog_version': row[2], 'created_at': row[3]}
+            for row in rows
+        ]
+
+
+def warm_templates(gemini_client, templates, positions, courses_data, force=False, workers=TEMPLATE_WARM_WORKERS):
+    """
+    Tạo lộ trình mẫu còn thiếu cho mọi vị trí × mức GPA với danh sách môn học hiện tại
+
+    Args:
+        gemini_client (GeminiClient): Client dùng để gọi model
+        templates (PathTemplates): Nơi lưu mẫu
+        positions (list): Các vị trí cần tạo mẫu
+        courses_data (list): Danh sách môn học hiện tại
+        force (bool): Tạo lại cả các mẫu đã có
+        workers (int): Số tổ hợp tạo đồng thời
+
+    Returns:
+        dict: Số mẫu đã tạo, bỏ qua (đã có), thất bại và số mẫu cũ đã xóa
+    """
+    version = catalog_version(courses_data)
+    combinations = [(position, band, gpa) for position in positions for band, gpa in band_gpas().items()
+                    if force or not templates.exists(position, band, version)]
+    stats = {'catalog_version': version, 'generated': 0, 'failed': 0,
+             'skipped': len(positions) * len(band_gpas()) - len(combinations), 'pruned': 0}
+
+    def warm(combination):
+        position, band, gpa = combination
+        # reuse_similar=False: mẫu phải được tạo mới từ model, không dựa trên lộ trình đã lưu hay mẫu cũ
+        result = gemini_client.generate_learning_path(target_position=position, student_gpa=gpa,
+                                                      courses_data=courses_data, reuse_similar=False)
+        if 'error' in result or result.get('degraded'):
+            logger.warning("Không tạo được mẫu %s / %s: %s", position, band, result.get('error') or result.get('degraded'))
+            return False
+        templates.save(position, band, version, result)
+        return True
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for ok in executor.map(warm, combinations):
+            stats['generated' if ok else 'failed'] += 1
+
+    # Chỉ xóa mẫu cũ khi mọi tổ hợp đã có mẫu của phiên bản mới
+    if not stats['failed']:
+        stats['pruned'] = templates.prune(version)
+    return stats
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+    from data_processor import DataProcessor
+    from database_manager import DatabaseManager
+    from metrics import configure_logging
+    from config import LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE
+
+    parser = argparse.ArgumentParser(description="Lộ trình mẫu dựng sẵn cho mỗi vị trí × mức GPA")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm = subparsers.add_parser('warm', help="Tạo các mẫu còn thiếu (hoặc đã cũ do danh sách môn học thay đổi)")
+    warm.add_argument('--positions', help="Chỉ tạo cho các vị trí này, phân tách bằng dấu phẩy")
+    warm.add_argument('--force', action='store_true', help="Tạo lại cả các mẫu đã có")
+    warm.add_argument('--workers', type=int, default=TEMPLATE_WARM_WORKERS)
+    warm.add_argument('--watch', type=int, metavar='SECONDS', help="Chạy lại sau mỗi khoảng thời gian (tạo lại khi danh sách môn học đổi)")
+    subparsers.add_parser('list', help="Xem các mẫu đã lưu")
+
+    args = parser.parse_args()
+    configure_logging(LOG_LEVEL, DEBUG_LOG_SAMPLE_RATE)
+    db_manager = DatabaseManager()
+    templates = PathTemplates(db_manager)
+
+    if args.command == 'list':
+        rows = templates.list()
+        if rows:
+            print(tabulate(rows, headers='keys'))
+        else:
+            print("📊 Chưa có lộ trình mẫu nào")
+        return
+
+    from gemini_client import GeminiClient
+    from usage_tracker import UsageTracker
+    client = GeminiClient(usage_tracker=UsageTracker(db_manager))
+
+    while True:
+        positions = args.positions.split(',') if args.positions else DataProcessor.load_positions()
+        courses = DataProcessor.load_courses()
+        started = time.perf_counter()
+        stats = warm_templates(client, templates, positions, courses, force=args.force, workers=args.workers)
+        print(f"✅ Danh sách môn học {stats['catalog_version']}: tạo {stats['generated']} mẫu, "
+              f"đã có {stats['skipped']}, lỗi {stats['failed']}, xóa {stats['pruned']} mẫu cũ "
+              f"({time.perf_counter() - started:.1f}s)")
+        if not args.watch:
+            break
+        args.force = False
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Gợi ý vị trí mục tiêu từ sở thích, điểm mạnh, điểm yếu và GPA của sinh viên, không gọi model
+
+Mỗi vị trí có một vector TF-IDF tính sẵn một lần từ tên vị trí và các từ khóa trong
+tu_khoa_vi_tri.csv: đặc trưng gồm từ, cặp từ liền nhau và n-gram ký tự của từng từ (đã bỏ dấu,
+chữ thường) nên "hoc may", "Học máy" hay "machine-learning" đều khớp. Điểm của vị trí là độ tương đồng
+cosine với sở thích + điểm mạnh, trừ đi một phần độ tương đồng với điểm yếu và trừ thêm khi GPA thấp
+hơn GPA khuyến nghị của vị trí. Xếp hạng cả danh sách vị trí mất dưới một mili giây.
+
+Ví dụ:
+    python position_recommender.py --preferences "Thích phân tích số liệu, làm báo cáo" --gpa 3.1
+    python position_recommender.py --preferences "Thích làm app điện thoại" --weaknesses "Toán" --gpa 2.4
+"""
+
+import argparse
+import math
+import re
+import time
+from collections import Counter
+
+from config import RECOMMEND_WEAKNESS_WEIGHT, RECOMMEND_GPA_PENALTY
+from student_roster import normalize_name
+
+NGRAM_SIZE = 3  # Độ dài n-gram ký tự trong mỗi từ (có thêm khoảng trắng hai đầu)
+
+_WORD = re.compile(r'\w+')
+
+
+def _words(text):
+    """Các từ đã bỏ dấu, chữ thường ("Học máy (ML)" -> ['hoc', 'may', 'ml'])"""
+    return _WORD.findall(normalize_name(text))
+
+
+def features(text):
+    """Đếm đặc trưng của văn bản: từ, cặp từ liền nhau và n-gram ký tự của từng từ"""
+    words = _words(text)
+    counts = Counter(f"w:{word}" for word in words)
+    counts.update(f"b:{first} {second}" for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f" {word} "
+        counts.update(f"c:{padded[i:i + NGRAM_SIZE]}" for i in range(len(padded) - NGRAM_SIZE + 1))
+    return counts
+
+
+class PositionRecommender:
+    """Vector từ khóa tính sẵn của các vị trí, dùng lại cho mọi lần gợi ý"""
+
+    def __init__(self, positions, position_keywords=None):
+        """
+        Args:
+            positions (list): Tên vị trí theo thứ tự trong vi_tri.csv
+            position_keywords (dict): {vị trí: {'keywords', 'gpa'}} như DataProcessor.load_position_keywords(),
+                vị trí không có từ khóa chỉ được so khớp theo tên
+        """
+        position_keywords = position_keywords or {}
+        self.positions = list(positions)
+        self.keywords = {position: position_keywords.get(position, {}).get('keywords', []) for position in self.positions}
+        self.min_gpa = {position: position_keywords.get(position, {}).get('gpa') for position in self.positions}
+        # Từ khóa đã chuẩn hóa để liệt kê các từ khóa khớp với văn bản của sinh viên
+        self._keyword_keys = {
+            position: [(keyword, ' '.join(_words(keyword))) for keyword in [position] + self.keywords[position]]
+            for position in self.positions
+        }
+
+        documents = [features(' ; '.join([position] + self.keywords[position])) for position in self.positions]
+        document_frequency = Counter(feature for document in documents for feature in document)
+        total = len(documents)
+        self.idf = {feature: math.log((1 + total) / (1 + count)) + 1 for feature, count in document_frequency.items()}
+        self._unknown_idf = math.log(1 + total) + 1  # Đặc trưng không vị trí nào có: chỉ làm giảm độ tương đồng
+
+        # Chỉ mục ngược đặc trưng -> [(vị trí, trọng số)] của các vector đã chuẩn hóa
+        self._postings = {}
+        for index, document in enumerate(documents):
+            vector = self._normalize({feature: count * self.idf[feature] for feature, count in document.items()})
+            for feature, weight in vector.items():
+                self._postings.setdefault(feature, []).append((index, weight))
+
+    @staticmethod
+    def _normalize(vector):
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {feature: weight / norm for feature, weight in vector.items()} if norm else {}
+
+    def _similarities(self, text):
+        """Độ tương đồng cosine của văn bản với từng vị trí (theo thứ tự self.positions)"""
+        scores = [0.0] * len(self.positions)
+        vector = self._normalize({feature: count * self.idf.get(feature, self._unknown_idf)
+                                  for feature, count in features(text).items()})
+        for feature, weight in vector.items():
+            for index, position_weight in self._postings.get(feature, ()):
+                scores[index] += weight * position_weight
+        return scores
+
+    def _matched_keywords(self, position, text):
+        """Các từ khóa của vị trí xuất hiện nguyên cụm trong văn bản"""
+        padded = f" {' '.join(_words(text))} "
+        return [keyword for keyword, key in self._keyword_keys[position] if key and f" {key} " in padded]
+
+    def rank(self, student_data):
+        """
+        Xếp hạng toàn bộ vị trí cho một sinh viên
+
+        Args:
+            student_data (dict): 'preferences', 'strengths', 'weaknesses' và 'gpa' (có thể None)
+
+        Returns:
+            list: {'position', 'score', 'matched' (từ khóa khớp), 'weak_matched', 'min_gpa'} theo điểm giảm dần,
+                cùng điểm thì giữ thứ tự trong vi_tri.csv
+        """
+        interests = ' ; '.join(filter(None, [student_data.get('preferences'), student_data.get('strengths')]))
+        weaknesses = student_data.get('weaknesses') or ''
+        interest_scores = self._similarities(interests)
+        weakness_scores = self._similarities(weaknesses) if weaknesses.strip() else [0.0] * len(self.positions)
+        gpa = student_data.get('gpa')
+
+        ranking = []
+        for index, position in enumerate(self.positions):
+            score = interest_scores[index] - RECOMMEND_WEAKNESS_WEIGHT * weakness_scores[index]
+            min_gpa = self.min_gpa[position]
+            if gpa is not None and min_gpa is not None and gpa < min_gpa:
+                score -= RECOMMEND_GPA_PENALTY * (min_gpa - gpa)
+            ranking.append({
+                'position': position,
+                'score': round(score, 4),
+                'matched': self._matched_keywords(position, interests),
+                'weak_matched': self._matched_keywords(position, weaknesses),
+                'min_gpa': min_gpa,
+            })
+        ranking.sort(key=lambda row: -row['score'])
+        return ranking
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+    from data_processor import DataProcessor
+
+    parser = argparse.ArgumentParser(description="Gợi ý vị trí mục tiêu từ thông tin của sinh viên")
+    parser.add_argument('--preferences', default='', help="Sở thích")
+    parser.add_argument('--strengths', default='', help="Điểm mạnh")
+    parser.add_argument('--weaknesses', default='', help="Điểm yếu")
+    parser.add_argument('--gpa', type=float, help="GPA hệ 4")
+    args = parser.parse_args()
+
+    recommender = PositionRecommender(DataProcessor.load_positions(), DataProcessor.load_position_keywords())
+    started = time.perf_counter()
+    ranking = recommender.rank({'preferences': args.preferences, 'strengths': args.strengths,
+                                'weaknesses': args.weaknesses, 'gpa': args.gpa})
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(tabulate([
+        [number, row['position'], f"{row['score']:.3f}", ', '.join(row['matched']), ', '.join(row['weak_matched']),
+         row['min_gpa'] if row['min_gpa'] is not None else '']
+        for number, row in enumerate(ranking, 1)
+    ], headers=['#', 'Vị trí', 'Điểm', 'Khớp sở thích/điểm mạnh', 'Khớp điểm yếu', 'GPA khuyến nghị']))
+    print(f"⏱️ {elapsed_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Cache đọc cho thống kê, lịch sử sinh viên và chi tiết lộ trình, vô hiệu hóa theo phiên bản dữ liệu
+
+Mỗi lần save_learning_path / save_export_record commit sẽ tăng phiên bản của các phạm vi bị ảnh hưởng
+trong bảng cache_versions (xem database_manager.bump_cache_versions). Cache chỉ đọc lại bảng phiên bản
+khi PRAGMA data_version báo có tiến trình/kết nối khác vừa ghi, nên khi dữ liệu không đổi
+mỗi lần đọc không phải truy vấn bảng nào.
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from config import READ_CACHE_MAX_ENTRIES
+from database_manager import CACHE_SCOPE_ALL, CACHE_SCOPE_STATISTICS, student_cache_scope
+
+
+class ReadModelCache:
+    """Cache các truy vấn đọc của DatabaseManager, dùng chung giữa các phiên trong một tiến trình
+
+    Giá trị trả về được dùng chung, nơi gọi không được sửa trực tiếp.
+    """
+
+    def __init__(self, db_manager, max_entries=READ_CACHE_MAX_ENTRIES):
+        self.db_manager = db_manager
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # khóa -> (token phiên bản, giá trị)
+        self._versions = {}
+        self._data_version = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'version_reads': 0}
+
+    def _refresh_versions(self):
+        """Đọc lại bảng phiên bản nếu database đã được ghi từ kết nối khác (gọi khi đang giữ lock)"""
+        if self._conn is None:
+            # Kết nối chỉ dùng để đọc phiên bản, không bao giờ ghi nên data_version đổi nghĩa là có ghi từ nơi khác
+            self._conn = sqlite3.connect(self.db_manager.db_path, check_same_thread=False)
+
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version != self._data_version:
+            self._versions = dict(self._conn.execute('SELECT scope, version FROM cache_versions'))
+            self._data_version = data_version
+            self._stats['version_reads'] += 1
+
+    def _get(self, key, scope, loader):
+        with self._lock:
+            self._refresh_versions()
+            token = (self._versions.get(scope), self._versions.get(CACHE_SCOPE_ALL))
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+
+        # Đọc ngoài lock; token lấy trước khi đọc nên nếu có ghi xen giữa thì lần sau sẽ đọc lại
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (token, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def get_statistics(self):
+        """Thống kê tổng quan (như DatabaseManager.get_statistics)"""
+        # Khi thống kê đọc từ bản sao trong bộ nhớ, giá trị chỉ đổi sau mỗi lần làm mới bản sao
+        snapshot = getattr(self.db_manager, 'statistics_snapshot', None)
+        key = ('statistics', snapshot.generation if snapshot else None)
+        return self._get(key, CACHE_SCOPE_STATISTICS, self.db_manager.get_statistics)
+
+    def get_student_history(self, student_name):
+        """Lịch sử lộ trình của sinh viên (như DatabaseManager.get_student_history)"""
+        return self._get(('history', student_name), student_cache_scope(student_name),
+                         lambda: self.db_manager.get_student_history(student_name))
+
+    def get_learning_path_details(self, learning_path_id, load_text=True):
+        """Chi tiết lộ trình; lộ trình đã lưu không thay đổi nên chỉ bị vô hiệu hóa khi reset/khôi phục database"""
+        return self._get(('details', learning_path_id, load_text), CACHE_SCOPE_ALL,
+                         lambda: self.db_manager.get_learning_path_details(learning_path_id, load_text=load_text))
+
+    def get_text_field(self, learning_path_id, field):
+        """Một trường văn bản dài đã giải nén (như DatabaseManager.get_text_field)"""
+        return self._get(('text', learning_path_id, field), CACHE_SCOPE_ALL,
+                         lambda: self.db_manager.get_text_field(learning_path_id, field))
+
+    def stats(self):
+        """Số lần trúng/trượt cache và số lần phải đọc lại bảng phiên bản"""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
@@ -0,0 +1,191 @@
+"""
+Đường đọc tách khỏi đường ghi: kết nối chỉ đọc dùng lại và bản sao thống kê trong bộ nhớ
+
+Database chạy ở chế độ WAL (DatabaseManager.init_database) nên người đọc không phải chờ người ghi.
+Mỗi lần đọc mở một transaction đọc, các câu truy vấn trong cùng lần đọc thấy cùng một snapshot
+kể cả khi một lô ghi lớn đang chạy. Kết nối mở bằng URI mode=ro và PRAGMA query_only nên đường đọc
+không thể ghi nhầm hay giữ khóa ghi.
+
+Thống kê/dashboard có thể đọc từ bản sao trong bộ nhớ của vài cột cần thiết, được làm mới định kỳ
+ở luồng nền (STATISTICS_SNAPSHOT_SECONDS > 0): các truy vấn quét toàn bảng không chạm vào file database.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from config import READ_POOL_MAX_IDLE, STATISTICS_SNAPSHOT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def read_only_uri(db_path):
+    """URI mở database ở chế độ chỉ đọc"""
+    return f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+
+
+class _BorrowedConnection:
+    """Kết nối mượn từ pool; close() trả kết nối về thay vì đóng"""
+
+    __slots__ = ('_conn', '_release')
+
+    def __init__(self, conn, release):
+        self._conn = conn
+        self._release = release
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def execute(self, sql, parameters=()):
+        return self._conn.execute(sql, parameters)
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReadConnectionPool:
+    """Các kết nối chỉ đọc của một database, dùng lại giữa các luồng (Streamlit chạy mỗi lượt trên luồng mới)"""
+
+    def __init__(self, db_path, max_idle=READ_POOL_MAX_IDLE):
+        """
+        Args:
+            db_path (str): Đường dẫn database (phải đã được tạo)
+            max_idle (int): Số kết nối rảnh giữ lại, kết nối dư được đóng khi trả về
+        """
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(read_only_uri(self.db_path), uri=True, timeout=30,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA query_only = 1')
+        return conn
+
+    def connect(self):
+        """Kết nối đã mở transaction đọc; snapshot được giữ đến khi close()"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        conn.execute('BEGIN')
+        return _BorrowedConnection(conn, self._release)
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def snapshot(self):
+        """with pool.snapshot() as conn: các truy vấn bên trong đọc cùng một snapshot"""
+        conn = self.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        """Đóng các kết nối rảnh"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class StatisticsSnapshot:
+    """Bản sao trong bộ nhớ của các cột dùng cho thống kê, làm mới định kỳ ở luồng nền"""
+
+    # Bảng -> các cột được sao chép
+    TABLES = {
+        'students': ('id', 'student_name', 'gpa'),
+        'learning_paths': ('id', 'student_id', 'target_position', 'created_at'),
+        'export_history': ('id', 'learning_path_id', 'export_type', 'created_at'),
+    }
+
+    def __init__(self, db_path, interval=STATISTICS_SNAPSHOT_SECONDS):
+        """
+        Args:
+            db_path (str): Đường dẫn database nguồn
+            interval (float): Chu kỳ làm mới (giây)
+        """
+        self.db_path = db_path
+        self.interval = interval
+        self.generation = 0
+        self.refreshed_at = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Tạo bản sao đầu tiên rồi làm mới ở luồng nền"""
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name=f"statistics-snapshot:{self.db_path}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except sqlite3.Error:
+                # Giữ bản sao cũ, lần sau thử lại
+                logger.exception("Làm mới bản sao thống kê thất bại")
+
+    def refresh(self):
+        """Sao chép lại các bảng trong một transaction đọc (một snapshot nhất quán) rồi đổi sang bản mới"""
+        with self._refresh_lock:
+            copy = sqlite3.connect('file::memory:', uri=True, isolation_level=None, check_same_thread=False)
+            try:
+                copy.execute('ATTACH DATABASE ? AS source', (read_only_uri(self.db_path),))
+                copy.execute('BEGIN')
+                for table, columns in self.TABLES.items():
+                    copy.execute(f"CREATE TABLE main.{table} AS SELECT {', '.join(columns)} FROM source.{table}")
+                copy.execute('COMMIT')
+                copy.execute('DETACH DATABASE source')
+                copy.execute('PRAGMA query_only = 1')
+            except Exception:
+                copy.close()
+                raise
+
+            with self._lock:
+                previous, self._conn = self._conn, copy
+                self.generation += 1
+                self.refreshed_at = time.time()
+            if previous is not None:
+                previous.close()
+
+    def connect(self):
+        """Kết nối tới bản sao hiện tại (giữ lock đến khi close(), các truy vấn trên bộ nhớ rất ngắn)"""
+        self._lock.acquire()
+        if self._conn is None:
+            self._lock.release()
+            self.refresh()
+            self._lock.acquire()
+        return _BorrowedConnection(self._conn, lambda conn: self._lock.release())
@@ -0,0 +1,227 @@
+"""
+Gộp các yêu cầu tạo lộ trình giống nhau đang chạy đồng thời (single-flight)
+
+Người gọi đầu tiên thực hiện lời gọi model, các yêu cầu trùng lặp đến sau chờ và dùng chung kết quả:
+- Trong cùng tiến trình: chờ chung một Future
+- Giữa các tiến trình: bảng khóa inflight_requests trong SQLite, kết quả được ghi lại để tiến trình khác đọc
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from config import COALESCE_LEASE_SECONDS, COALESCE_RESULT_TTL, COALESCE_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_text(value):
+    """Bỏ khoảng trắng thừa và không phân biệt hoa thường"""
+    return ' '.join(str(value).split()).lower() if value else ''
+
+
+def request_key(target_position, student_gpa=None, preferences=None, strengths=None, weaknesses=None,
+                courses_data=None, reuse_similar=True):
+    """Khóa chuẩn hóa của một yêu cầu tạo lộ trình (các yêu cầu cùng khóa cho cùng prompt)
+
+    reuse_similar nằm trong khóa: yêu cầu tạo lại không được nhận lộ trình dùng lại/lộ trình mẫu của yêu cầu khác.
+    """
+    normalized = {
+        'target_position': _normalize_text(target_position),
+        'student_gpa': round(float(student_gpa), 2) if student_gpa is not None else None,
+        'preferences': _normalize_text(preferences),
+        'strengths': _normalize_text(strengths),
+        'weaknesses': _normalize_text(weaknesses),
+        'courses': [[course.get('name'), str(course.get('credits'))] for course in courses_data or []],
+        'reuse_similar': bool(reuse_similar)
+    }
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _is_error(result):
+    """GeminiClient báo lỗi bằng dict {'error': ...} thay vì ném exception"""
+    return isinstance(result, dict) and 'error' in result
+
+
+class SingleFlight:
+    """Thực hiện mỗi khóa một lần tại một thời điểm, các lời gọi trùng lặp dùng chung kết quả"""
+
+    def __init__(self, db_path=None, lease_seconds=COALESCE_LEASE_SECONDS,
+                 result_ttl=COALESCE_RESULT_TTL, poll_interval=COALESCE_POLL_INTERVAL):
+        """
+        Args:
+            db_path (str): Database chứa bảng khóa; None thì chỉ gộp trong tiến trình hiện tại
+            lease_seconds (int): Thời gian giữ khóa tối đa của người gọi đầu tiên
+            result_ttl (int): Thời gian giữ kết quả cho các tiến trình đang chờ đọc
+            poll_interval (float): Chu kỳ kiểm tra khóa của tiến trình đang chờ
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._stats = {'upstream_calls': 0, 'coalesced_local': 0, 'coalesced_remote': 0}
+        if db_path:
+            self.init_table()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_table(self):
+        """Tạo bảng khóa dùng chung giữa các tiến trình"""
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS inflight_requests (
+                request_key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL, -- 'running', 'done'
+                result TEXT, -- JSON
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.close()
+
+    def run(self, key, func):
+        """
+        Thực hiện func() cho khóa, hoặc chờ kết quả của lời gọi cùng khóa đang chạy
+
+        Returns:
+            tuple: (kết quả, trạng thái) với trạng thái 'leader', 'coalesced_local' hoặc 'coalesced_remote'
+        """
+        while True:
+            with self._lock:
+                future = self._futures.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = self._futures[key] = Future()
+                else:
+                    self._stats['coalesced_local'] += 1
+
+            if is_leader:
+                break
+            result = future.result()
+            if not _is_error(result):
+                return copy.deepcopy(result), 'coalesced_local'
+            # Lỗi tạm thời của leader (hết quota, mất mạng) không chia cho người chờ: tự gọi lại
+            with self._lock:
+                self._stats['coalesced_local'] -= 1
+
+        # Gỡ future trước khi báo kết quả để người chờ gọi lại sau lỗi không gặp lại future cũ
+        try:
+            result, status = self._run_across_processes(key, func)
+        except BaseException as e:
+            self._forget(key)
+            future.set_exception(e)
+            raise
+        self._forget(key)
+        future.set_result(result)
+        return copy.deepcopy(result), status
+
+    def _forget(self, key):
+        with self._lock:
+            self._futures.pop(key, None)
+
+    def _run_across_processes(self, key, func):
+        """Giành khóa trong bảng inflight_requests rồi gọi func(), hoặc chờ tiến trình đang giữ khóa"""
+        if not self.db_path:
+            return self._call(func), 'leader'
+
+        waited = False
+        while True:
+            state, result = self._acquire(key, waited)
+            waited = True
+            if state == 'done':
+                self._count('coalesced_remote')
+                return result, 'coalesced_remote'
+            if state == 'acquired':
+                break
+            time.sleep(self.poll_interval)
+
+        try:
+            result = self._call(func)
+        except BaseException:
+            self._release(key)
+            raise
+        if _is_error(result):
+            self._release(key)
+        else:
+            self._publish(key, result)
+        return result, 'leader'
+
+    def _call(self, func):
+        self._count('upstream_calls')
+        return func()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _acquire(self, key, waited):
+        """Trả về ('acquired', None), ('waiting', None) hoặc ('done', kết quả)
+
+        Kết quả đã xong chỉ được dùng lại cho lời gọi đã chờ nó từ lúc đang chạy;
+        lời gọi mới đến sau khi xong (ví dụ người dùng bấm tạo lại) sẽ gọi model.
+        """
+        conn = self._connect()
+        try:
+            now = time.time()
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT owner, status, result, expires_at FROM inflight_requests WHERE request_key = ?',
+                               (key,)).fetchone()
+
+            if row is not None and row['expires_at'] >= now:
+                if row['status'] == 'running':
+                    conn.execute('COMMIT')
+                    return 'waiting', None
+                if waited:
+                    conn.execute('COMMIT')
+                    return 'done', json.loads(row['result'])
+
+            # Chưa có ai giữ khóa, người giữ đã quá hạn (tiến trình chết giữa chừng) hoặc kết quả cũ không dành cho lời gọi này
+            conn.execute('DELETE FROM inflight_requests WHERE expires_at < ?', (now - self.result_ttl,))
+            conn.execute('''
+                INSERT OR REPLACE INTO inflight_requests (request_key, owner, status, result, expires_at)
+                VALUES (?, ?, 'running', NULL, ?)
+            ''', (key, self.owner, now + self.lease_seconds))
+            conn.execute('COMMIT')
+            return 'acquired', None
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _publish(self, key, result):
+        """Ghi kết quả để các tiến trình đang chờ đọc trong result_ttl giây"""
+        conn = self._connect()
+        conn.execute('''
+            UPDATE inflight_requests SET status = 'done', result = ?, expires_at = ?
+            WHERE request_key = ? AND owner = ?
+        ''', (json.dumps(result, ensure_ascii=False), time.time() + self.result_ttl, key, self.owner))
+        conn.close()
+
+    def _release(self, key):
+        """Bỏ khóa khi lời gọi lỗi (exception hoặc dict lỗi) để tiến trình đang chờ tự gọi lại"""
+        conn = self._connect()
+        conn.execute('DELETE FROM inflight_requests WHERE request_key = ? AND owner = ?', (key, self.owner))
+        conn.close()
+
+    def stats(self):
+        """Số lời gọi model thật và số lời gọi được tiết kiệm nhờ gộp"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['saved_calls'] = stats['coalesced_local'] + stats['coalesced_remote']
+        return stats
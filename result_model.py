@@ -0,0 +1,244 @@
+"""
+Kiểm tra và chuẩn hóa cấu trúc kết quả lộ trình một lần khi parse response (các lớp dùng __slots__)
+
+Response của model được kiểm tra ngay khi parse thay vì lúc hiển thị:
+- Giá trị vô hướng được đưa về chuỗi, danh sách chuỗi về tuple, trường thiếu nhận giá trị rỗng
+- Cấu trúc sai (ví dụ learning_path không phải danh sách object) báo ResultSchemaError
+
+parse_result() / parse_section() trả về dict đã chuẩn hóa: giao diện, renderer, API, hàng đợi và cache vẫn
+dùng dict (dạng lưu được vào session và JSON). Object có kiểu chỉ dùng trong lúc kiểm tra và ở
+DatabaseManager.save_learning_path (đọc thuộc tính thay vì dò dict lồng nhau); benchmark.py so sánh bộ nhớ
+của hai dạng cho mã xử lý lô muốn giữ nhiều kết quả.
+
+to_dict() / from_dict() (và to_json() / from_json()) chuyển đổi không mất dữ liệu với kết quả đã chuẩn hóa.
+Các khóa ngoài cấu trúc ở cấp kết quả (raw_response, degraded, reused_from...) được giữ nguyên trong extras.
+"""
+
+import json
+import sys
+
+TEXT = 'text'
+TEXTS = 'texts'
+
+# Chuỗi ngắn (độ khó, tên kỹ năng, tên môn, số tín chỉ...) lặp lại rất nhiều giữa các lộ trình nên được intern
+# để các kết quả đang giữ (dict hoặc object) dùng chung một bản
+_INTERN_MAX_CHARS = 64
+
+
+class ResultSchemaError(ValueError):
+    """Dữ liệu không đúng cấu trúc kết quả lộ trình"""
+
+
+def _coerce_text(value, path):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return sys.intern(value) if len(value) <= _INTERN_MAX_CHARS else value
+    if isinstance(value, (int, float)):
+        return sys.intern(str(value))
+    if isinstance(value, (list, tuple)):
+        # Model đôi khi trả về danh sách ý thay vì một đoạn văn
+        return '\n'.join(_coerce_text(item, path) for item in value)
+    raise ResultSchemaError(f"{path} phải là chuỗi")
+
+
+def _coerce_texts(value, path):
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (_coerce_text(value, path),)
+    if isinstance(value, (list, tuple)):
+        return tuple(_coerce_text(item, f"{path}[{i}]") for i, item in enumerate(value))
+    raise ResultSchemaError(f"{path} phải là danh sách chuỗi")
+
+
+def _many(record_class):
+    def coerce(value, path):
+        if value is None:
+            return ()
+        if not isinstance(value, (list, tuple)):
+            raise ResultSchemaError(f"{path} phải là danh sách")
+        return tuple(record_class.from_dict(item, f"{path}[{i}]") for i, item in enumerate(value))
+    return coerce
+
+
+def _one(record_class):
+    def coerce(value, path):
+        return None if value is None else record_class.from_dict(value, path)
+    return coerce
+
+
+def _dump(value):
+    if isinstance(value, tuple):
+        return [_dump(item) for item in value]
+    if isinstance(value, _Record):
+        return value.to_dict()
+    return value
+
+
+class _Record:
+    """Lớp cơ sở: mỗi lớp con khai báo __slots__ và _fields = ((tên, kiểu), ...)
+
+    Kiểu là TEXT, TEXTS, [Lớp] (danh sách object) hoặc (Lớp,) (một object, có thể không có).
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _required = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Dựng sẵn hàm chuẩn hóa của từng trường để from_dict chỉ còn một vòng lặp
+        coercers = []
+        for name, kind in cls._fields:
+            if kind == TEXT:
+                coercers.append((name, _coerce_text, ''))
+            elif kind == TEXTS:
+                coercers.append((name, _coerce_texts, ()))
+            elif isinstance(kind, list):
+                coercers.append((name, _many(kind[0]), ()))
+            else:
+                coercers.append((name, _one(kind[0]), None))
+        cls._coercers = tuple(coercers)
+
+    def __init__(self, **values):
+        for name, _, default in self._coercers:
+            setattr(self, name, values.get(name, default))
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        """Kiểm tra và chuẩn hóa dict (JSON đã parse) thành object"""
+        path = path or cls.__name__
+        if isinstance(data, cls):
+            return data
+        if not isinstance(data, dict):
+            raise ResultSchemaError(f"{path} phải là object")
+        for name in cls._required:
+            if data.get(name) is None:
+                raise ResultSchemaError(f"{path} thiếu trường {name}")
+
+        record = cls.__new__(cls)
+        for name, coerce, _ in cls._coercers:
+            setattr(record, name, coerce(data.get(name), f"{path}.{name}"))
+        return record
+
+    def to_dict(self):
+        """Dict tương thích JSON (bỏ qua object con không có)"""
+        result = {}
+        for name, _, _ in self._coercers:
+            value = getattr(self, name)
+            if value is not None:
+                result[name] = _dump(value)
+        return result
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name, _, _ in self._coercers)
+        return f"{type(self).__name__}({fields})"
+
+
+class LearningStep(_Record):
+    """Một bước (domain) trong lộ trình học"""
+    __slots__ = ('domain', 'difficulty_level', 'skills', 'timeline', 'resources')
+    _fields = (('domain', TEXT), ('difficulty_level', TEXT), ('skills', TEXTS),
+               ('timeline', TEXT), ('resources', TEXTS))
+
+
+class ImportantCourse(_Record):
+    """Môn học quan trọng trong phân tích môn học"""
+    __slots__ = ('name', 'credits', 'importance_score', 'reason', 'study_tips')
+    _fields = (('name', TEXT), ('credits', TEXT), ('importance_score', TEXT), ('reason', TEXT), ('study_tips', TEXT))
+
+
+class CourseAnalysis(_Record):
+    """Phân tích môn học"""
+    __slots__ = ('analysis_summary', 'important_courses', 'general_recommendations')
+    _fields = (('analysis_summary', TEXT), ('important_courses', [ImportantCourse]), ('general_recommendations', TEXT))
+
+
+class SkillSuggestion(_Record):
+    """Một kỹ năng được đề xuất"""
+    __slots__ = ('skill_name', 'reason', 'benefit', 'learning_path')
+    _fields = (('skill_name', TEXT), ('reason', TEXT), ('benefit', TEXT), ('learning_path', TEXT))
+
+
+class SkillSuggestions(_Record):
+    """Các nhóm kỹ năng đề xuất"""
+    __slots__ = ('strength_based_skills', 'weakness_improvement_skills', 'career_expansion_skills')
+    _fields = (('strength_based_skills', [SkillSuggestion]), ('weakness_improvement_skills', [SkillSuggestion]),
+               ('career_expansion_skills', [SkillSuggestion]))
+
+    # Nhóm kỹ năng -> skill_type lưu trong database
+    SKILL_TYPES = (('strength_based_skills', 'strength_based'),
+                   ('weakness_improvement_skills', 'weakness_improvement'),
+                   ('career_expansion_skills', 'career_expansion'))
+
+
+class LearningPathResult(_Record):
+    """Kết quả tạo lộ trình: lộ trình học, đề xuất kỹ năng và phân tích môn học"""
+    __slots__ = ('target_position', 'analysis', 'learning_path', 'overall_timeline', 'recommendations',
+                 'skill_suggestions', 'course_analysis', 'extras')
+    _fields = (('target_position', TEXT), ('analysis', TEXT), ('learning_path', [LearningStep]),
+               ('overall_timeline', TEXT), ('recommendations', TEXT),
+               ('skill_suggestions', (SkillSuggestions,)), ('course_analysis', (CourseAnalysis,)))
+    _required = ('learning_path',)
+
+    def __init__(self, extras=None, **values):
+        super().__init__(**values)
+        self.extras = extras
+
+    @classmethod
+    def from_dict(cls, data, path=None):
+        record = super().from_dict(data, path)
+        if record is not data:
+            extras = {key: value for key, value in data.items() if key not in _RESULT_FIELD_NAMES}
+            record.extras = extras or None
+        return record
+
+    def to_dict(self):
+        result = super().to_dict()
+        if self.extras:
+            result.update(self.extras)
+        return result
+
+    def get_extra(self, key, default=None):
+        """Giá trị ngoài cấu trúc (raw_response, degraded, reused_from...)"""
+        return self.extras.get(key, default) if self.extras else default
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+_RESULT_FIELD_NAMES = frozenset(name for name, _ in LearningPathResult._fields)
+
+# Mô hình của từng phần khi tạo tách rời (gemini_client.RESULT_SECTIONS)
+_SECTION_MODELS = {
+    'course_analysis': CourseAnalysis,
+    'skill_suggestions': SkillSuggestions,
+}
+
+
+def parse_result(data):
+    """Kiểm tra và chuẩn hóa kết quả đầy đủ, trả về dict (dạng mà các phần còn lại của ứng dụng dùng)
+
+    Raises:
+        ResultSchemaError: Thiếu learning_path hoặc một phần sai cấu trúc
+    """
+    return LearningPathResult.from_dict(data).to_dict()
+
+
+def parse_section(section, data):
+    """Kiểm tra và chuẩn hóa một phần của kết quả (chế độ tạo tách rời), trả về dict của phần đó"""
+    if not isinstance(data, dict) or data.get(section) is None:
+        raise ResultSchemaError(f"Response thiếu phần {section}")
+    if section == 'learning_path':
+        return parse_result(data)
+    return {section: _SECTION_MODELS[section].from_dict(data[section], section).to_dict()}
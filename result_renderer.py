@@ -0,0 +1,273 @@
+"""
+Dựng sẵn từng phần kết quả lộ trình thành một khối markdown/HTML để mỗi phần chỉ gửi một delta Streamlit
+
+Kết quả dựng được nhớ theo hash nội dung của phần đó, các lần rerun với cùng kết quả không phải dựng lại.
+Nội dung được hiển thị bằng st.markdown(..., unsafe_allow_html=True) nên mọi giá trị từ kết quả (model, lộ trình
+đã lưu, thông tin sinh viên) đều phải qua _text() (trong thẻ HTML) hoặc _markdown_text() (trong markdown).
+"""
+
+import hashlib
+import html
+import json
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from config import RENDER_CACHE_MAX_ENTRIES
+from student_roster import normalize_name
+
+_COLUMNS_STYLE = 'display:grid;grid-template-columns:1fr 1fr;gap:1rem'
+_METRIC_STYLE = 'font-size:1.75rem;line-height:1.2'
+_SHARED_STYLE = 'background:#fff3b0;border-radius:3px;padding:0 2px'
+# Ký tự cú pháp markdown (các ký tự HTML <, >, &, " do html.escape xử lý)
+_MARKDOWN_SPECIAL = re.compile(r'([\\`*_{}\[\]()#+\-.!|~])')
+
+
+def _text(value, default=''):
+    """Escape văn bản để đặt trong thẻ HTML (giữ xuống dòng, không tạo dòng trống cắt khối HTML)"""
+    if value is None or value == '':
+        value = default
+    return html.escape(str(value)).replace('\n', '<br>')
+
+
+def _markdown_text(value, default=''):
+    """Escape văn bản để đặt trong markdown: không tạo thẻ HTML, liên kết, tiêu đề hay danh sách (giữ xuống dòng)"""
+    if value is None or value == '':
+        value = default
+    return html.escape(_MARKDOWN_SPECIAL.sub(r'\\\1', str(value)))
+
+
+def _bullets(items):
+    if not items:
+        return ''
+    return '<ul>' + ''.join(f'<li>{_text(item)}</li>' for item in items) + '</ul>'
+
+
+def _columns(left, right):
+    return f'<div style="{_COLUMNS_STYLE}"><div>{left}</div><div>{right}</div></div>'
+
+
+def _expander(summary, body):
+    """Khối thu gọn tương đương st.expander, viết trên một dòng để markdown không tách khối HTML"""
+    return f'<details><summary>{_text(summary)}</summary>{body}</details>'
+
+
+def _skill_group(skills):
+    return '\n\n'.join(
+        _expander(
+            f"#{i} {skill.get('skill_name', 'N/A')}",
+            _columns(
+                f"<b>Lý do đề xuất:</b><p>{_text(skill.get('reason'), 'Không có lý do')}</p>"
+                f"<b>Lợi ích:</b><p>{_text(skill.get('benefit'), 'Không có thông tin')}</p>",
+                f"<b>Cách học:</b><p>{_text(skill.get('learning_path'), 'Không có hướng dẫn')}</p>"
+            )
+        )
+        for i, skill in enumerate(skills, 1)
+    )
+
+
+def render_learning_path(result):
+    """Phần lộ trình học: phân tích vị trí, các bước học và lời khuyên"""
+    steps = '\n\n'.join(
+        _expander(
+            f"Bước {i}: {step.get('domain', 'N/A')} ({step.get('difficulty_level', 'N/A')})",
+            _columns(
+                '<b>Kỹ năng cần học:</b>' + _bullets(step.get('skills', [])),
+                f"<b>Thời gian:</b> {_text(step.get('timeline'), 'N/A')}<br><b>Tài nguyên:</b>"
+                + _bullets(step.get('resources', []))
+            )
+        )
+        for i, step in enumerate(result.get('learning_path', []), 1)
+    )
+    return (
+        "### 📊 Phân tích Vị trí\n\n"
+        f"{_markdown_text(result.get('analysis'), 'Không có phân tích')}\n\n"
+        "### 📈 Lộ trình Học Chi tiết\n\n"
+        f"{steps}\n\n"
+        "### 💡 Lời khuyên\n\n"
+        f"{_markdown_text(result.get('recommendations'), 'Không có lời khuyên')}"
+    )
+
+
+def render_course_analysis(result):
+    """Phần phân tích môn học: tổng quan, các môn quan trọng và lời khuyên chung"""
+    course_analysis = result.get('course_analysis', {})
+    courses = '\n\n'.join(
+        _expander(
+            f"#{i} {course.get('name', 'N/A')} ({course.get('credits', 'N/A')} tín chỉ)",
+            _columns(
+                f"Điểm quan trọng<div style=\"{_METRIC_STYLE}\">{_text(course.get('importance_score', 'N/A'))}/10</div>"
+                f"<b>Lý do quan trọng:</b><p>{_text(course.get('reason'), 'Không có lý do')}</p>",
+                f"<b>Lời khuyên học tập:</b><p>{_text(course.get('study_tips'), 'Không có lời khuyên')}</p>"
+            )
+        )
+        for i, course in enumerate(course_analysis.get('important_courses', []), 1)
+    )
+    return (
+        "### 📊 Tổng quan Phân tích Môn học\n\n"
+        f"{_markdown_text(course_analysis.get('analysis_summary'), 'Không có tổng quan')}\n\n"
+        "### ⭐ Các môn học Quan trọng\n\n"
+        f"{courses}\n\n"
+        "### 💡 Lời khuyên Chung về Học tập\n\n"
+        f"{_markdown_text(course_analysis.get('general_recommendations'), 'Không có lời khuyên')}"
+    )
+
+
+def render_skill_suggestions(result):
+    """Phần đề xuất kỹ năng, None nếu kết quả không có đề xuất"""
+    skill_suggestions = result.get('skill_suggestions', {})
+    if not skill_suggestions:
+        return None
+
+    parts = [
+        "### 🎯 Đề xuất Kỹ năng Cá nhân hóa\n\n"
+        "Dựa trên điểm mạnh và điểm yếu của bạn, hệ thống đề xuất các kỹ năng bổ sung để:\n\n"
+        "- Tận dụng tối đa điểm mạnh hiện có\n"
+        "- Cải thiện những điểm yếu cần khắc phục\n"
+        "- Mở rộng cơ hội nghề nghiệp trong tương lai"
+    ]
+    groups = [
+        ('strength_based_skills', "💪 Kỹ năng Dựa trên Điểm mạnh",
+         "Những kỹ năng này sẽ giúp bạn phát huy tối đa điểm mạnh hiện có:"),
+        ('weakness_improvement_skills', "🔧 Kỹ năng Cải thiện Điểm yếu",
+         "Những kỹ năng này sẽ giúp bạn khắc phục những điểm yếu hiện tại:"),
+        ('career_expansion_skills', "🚀 Kỹ năng Mở rộng Cơ hội",
+         "Những kỹ năng này sẽ mở ra nhiều cơ hội nghề nghiệp mới:"),
+    ]
+    for key, title, description in groups:
+        skills = skill_suggestions.get(key, [])
+        if skills:
+            parts.append(f"### {title}\n\n{description}\n\n{_skill_group(skills)}")
+
+    parts.append(
+        "---\n\n"
+        "### 💡 Lời khuyên Tổng hợp\n\n"
+        "- **Ưu tiên học tập:** Bắt đầu với những kỹ năng cải thiện điểm yếu\n"
+        "- **Phát huy điểm mạnh:** Tiếp tục phát triển những kỹ năng bạn đã giỏi\n"
+        "- **Mở rộng tầm nhìn:** Khám phá những kỹ năng mới để có nhiều lựa chọn nghề nghiệp\n"
+        "- **Thực hành thường xuyên:** Áp dụng những kỹ năng đã học vào các dự án thực tế"
+    )
+    return '\n\n'.join(parts)
+
+
+def _comparison_items(result):
+    """Kỹ năng (các bước học và đề xuất kỹ năng) và môn quan trọng của một kết quả, không trùng lặp"""
+    skills = [skill for step in result.get('learning_path', []) for skill in step.get('skills', [])]
+    skills += [skill.get('skill_name') for group in (result.get('skill_suggestions') or {}).values() for skill in group]
+    courses = [course.get('name') for course in result.get('course_analysis', {}).get('important_courses', [])]
+    return ({normalize_name(skill): skill for skill in skills if skill},
+            {normalize_name(course): course for course in courses if course})
+
+
+def render_comparison(data):
+    """So sánh lộ trình nhiều vị trí theo cột thẳng hàng, kỹ năng/môn học có ở từ hai vị trí trở lên được tô màu"""
+    results = data['results']
+    items = [_comparison_items(result) for result in results]
+    shared_skills = {key for key, count in Counter(key for skills, _ in items for key in skills).items() if count > 1}
+    shared_courses = {key for key, count in Counter(key for _, courses in items for key in courses).items() if count > 1}
+
+    def _mark(values, shared):
+        return '<ul>' + ''.join(
+            f'<li><span style="{_SHARED_STYLE}">{_text(value)}</span></li>' if key in shared else f'<li>{_text(value)}</li>'
+            for key, value in values.items()
+        ) + '</ul>'
+
+    rows = [
+        [f"<b>{_text(result.get('target_position'), 'N/A')}</b>" for result in results],
+        [f"<b>Tổng thời gian:</b> {_text(result.get('overall_timeline'), 'N/A')}" for result in results],
+        ["<b>Các bước học:</b>" + _bullets([step.get('domain', 'N/A') for step in result.get('learning_path', [])])
+         for result in results],
+        ["<b>Kỹ năng:</b>" + _mark(skills, shared_skills) for skills, _ in items],
+        ["<b>Môn học quan trọng:</b>" + _mark(courses, shared_courses) for _, courses in items],
+    ]
+    grid = (f'<div style="display:grid;grid-template-columns:repeat({len(results)},1fr);gap:0.5rem 1rem">'
+            + ''.join(f'<div>{cell}</div>' for row in rows for cell in row) + '</div>')
+
+    summary = []
+    common_skills = [value for key, value in items[0][0].items() if all(key in skills for skills, _ in items)] if items else []
+    if len(results) > 1 and common_skills:
+        summary.append(f"**Kỹ năng chung của tất cả vị trí:** {_markdown_text(', '.join(common_skills))}")
+    summary.append(f'<span style="{_SHARED_STYLE}">Tô màu</span>: kỹ năng/môn học xuất hiện ở từ hai vị trí trở lên')
+    return grid + '\n\n' + '\n\n'.join(summary)
+
+
+def render_path_details(details):
+    """Chi tiết lộ trình đã lưu (phần xem lịch sử)"""
+    steps = '\n\n---\n\n'.join(
+        f"**Bước {i}: {_markdown_text(step['domain'])}**\n\n"
+        + _columns(
+            f"• <b>Độ khó:</b> {_text(step['difficulty_level'])}<br>• <b>Thời gian:</b> {_text(step['timeline'])}",
+            f"• <b>Kỹ năng:</b> {_text(', '.join(step['skills']))}<br>• <b>Tài nguyên:</b> {_text(', '.join(step['resources']))}"
+        )
+        for i, step in enumerate(details['learning_path'], 1)
+    )
+    courses = '\n'.join(
+        f"- **{_markdown_text(course['name'])}** ({_markdown_text(course['credits'])} tín chỉ) - "
+        f"{_markdown_text(course['importance_score'])}"
+        for course in details['course_analysis']['important_courses']
+    )
+    parts = [
+        "---\n\n"
+        f"### 📋 Chi tiết: {_markdown_text(details['target_position'])}\n\n"
+        + _columns(
+            f"<b>Sinh viên:</b> {_text(details['student_name'])}<br><b>GPA:</b> {_text(details['gpa'])}",
+            f"<b>Ngày tạo:</b> {_text(details['created_at'])}<br><b>Timeline:</b> {_text(details['overall_timeline'])}"
+        ),
+        f"### 📚 Lộ trình Học\n\n{steps}" + ("\n\n---" if steps else ''),
+        f"### ⭐ Môn học Quan trọng\n\n{courses}"
+    ]
+    if details['course_analysis'].get('general_recommendations'):
+        parts.append(f"### 💡 Lời khuyên Chung\n\n{_markdown_text(details['course_analysis']['general_recommendations'])}")
+    return '\n\n'.join(parts)
+
+
+def render_path_texts(texts):
+    """Các đoạn văn dài của lộ trình đã lưu, chỉ đọc khi người dùng mở (texts: trường -> văn bản đã giải nén)"""
+    sections = (('analysis', '📊 Phân tích Vị trí'), ('analysis_summary', '📝 Tổng quan Phân tích Môn học'),
+                ('recommendations', '💡 Lời khuyên'))
+    return '\n\n'.join(f"### {title}\n\n{_markdown_text(texts.get(field), 'Không có dữ liệu')}"
+                        for field, title in sections)
+
+
+_RENDERERS = {
+    'learning_path': render_learning_path,
+    'course_analysis': render_course_analysis,
+    'skill_suggestions': render_skill_suggestions,
+    'path_details': render_path_details,
+    'path_texts': render_path_texts,
+    'comparison': render_comparison,
+}
+
+
+class SectionRenderer:
+    """Dựng các phần kết quả và nhớ lại theo hash nội dung (LRU, dùng chung giữa các phiên)"""
+
+    def __init__(self, max_entries=RENDER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(data):
+        """Hash ổn định của dữ liệu kết quả"""
+        payload = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def render(self, section, data):
+        """Markdown của một phần kết quả (section là một trong các khóa của _RENDERERS)"""
+        key = (section, self.content_hash(data))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        markdown = _RENDERERS[section](data)
+        with self._lock:
+            self._cache[key] = markdown
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return markdown
+
+
+# Dùng chung trong tiến trình (tồn tại qua các lần rerun của Streamlit)
+section_renderer = SectionRenderer()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Xếp các môn học vào học kỳ ngay trên máy, không gọi model
+
+Đầu vào là danh sách môn học và số tín chỉ (danh_sach_monhoc.csv), các cặp môn tiên quyết
+(mon_tien_quyet.csv, không bắt buộc), thứ hạng môn quan trọng của lộ trình và số tín chỉ tối đa mỗi học kỳ.
+
+Mỗi học kỳ chọn trong các môn đã học xong môn tiên quyết một tập môn vừa giới hạn tín chỉ
+có tổng độ ưu tiên lớn nhất (bài toán cái túi 0/1, quy hoạch động theo số tín chỉ). Độ ưu tiên của môn gồm
+số tín chỉ (xếp kín học kỳ để ít học kỳ nhất), điểm quan trọng (môn tiên quyết của môn quan trọng được
+hưởng một nửa) và số môn phải chờ môn này. Danh mục khoảng 60 môn được xếp trong vài mili giây.
+
+Ví dụ:
+    python semester_planner.py
+    python semester_planner.py --cap 18 --important "Học máy" --important "Dữ liệu lớn" --only-important
+"""
+
+import argparse
+import logging
+import math
+import time
+
+from config import SEMESTER_CREDIT_CAP
+from numeric_fields import parse_credits, parse_score
+from student_roster import normalize_name
+
+logger = logging.getLogger(__name__)
+
+IMPORTANCE_WEIGHT = 10  # Độ ưu tiên cộng thêm của môn quan trọng điểm 10/10 (ngang 10 tín chỉ)
+UNLOCK_WEIGHT = 1  # Độ ưu tiên cộng thêm cho mỗi môn phải học sau môn này
+INHERITED_IMPORTANCE = 0.5  # Môn tiên quyết được hưởng phần này của điểm quan trọng của môn sau nó
+DEFAULT_IMPORTANCE = 0.8  # Điểm (thang 0-1) của môn quan trọng không đọc được điểm
+
+
+class SemesterPlanner:
+    """Danh mục môn học và quan hệ tiên quyết, dùng lại cho nhiều lần xếp kế hoạch"""
+
+    def __init__(self, courses, prerequisites=(), credit_cap=SEMESTER_CREDIT_CAP):
+        """
+        Args:
+            courses (list): [{'name', 'credits'}] như DataProcessor.load_courses(), môn trùng tên chỉ tính một lần
+            prerequisites (list): Các cặp (môn học, môn tiên quyết) như DataProcessor.load_prerequisites()
+            credit_cap (int): Số tín chỉ tối đa mỗi học kỳ mặc định
+
+        Raises:
+            ValueError: Quan hệ tiên quyết bị lặp vòng
+        """
+        self.credit_cap = credit_cap
+        self.courses = {}  # tên -> số tín chỉ, theo thứ tự trong file
+        for course in courses:
+            credits = parse_credits(course.get('credits'))
+            if course.get('name') and credits and course['name'] not in self.courses:
+                self.courses[course['name']] = int(math.ceil(credits))
+        self._keys = {normalize_name(name): name for name in self.courses}
+
+        self.prerequisites = {name: set() for name in self.courses}
+        for course, prerequisite in prerequisites:
+            course_name, prerequisite_name = self.match(course), self.match(prerequisite)
+            if course_name is None or prerequisite_name is None:
+                logger.warning("Bỏ qua môn tiên quyết không có trong danh sách môn học: %s <- %s", course, prerequisite)
+                continue
+            self.prerequisites[course_name].add(prerequisite_name)
+
+        self.dependents = {name: set() for name in self.courses}
+        for name, prerequisite_names in self.prerequisites.items():
+            for prerequisite in prerequisite_names:
+                self.dependents[prerequisite].add(name)
+        self.order = self._topological_order()
+
+    def match(self, name):
+        """Tên môn trong danh mục ứng với tên model trả về (không phân biệt dấu/hoa thường, cho phép ghi chú thêm)"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._keys:
+            return self._keys[key]
+        # "Học máy (Machine Learning)" -> "Học máy": chọn tên dài nhất nằm trong tên đã cho
+        contained = [catalog_key for catalog_key in self._keys if catalog_key in key]
+        if contained:
+            return self._keys[max(contained, key=len)]
+        containing = [catalog_key for catalog_key in self._keys if key in catalog_key]
+        return self._keys[min(containing, key=len)] if containing else None
+
+    def _topological_order(self):
+        """Thứ tự các môn sao cho môn tiên quyết luôn đứng trước (giữ thứ tự file khi không ràng buộc)"""
+        remaining = {name: len(prerequisites) for name, prerequisites in self.prerequisites.items()}
+        ready = [name for name in self.courses if not remaining[name]]
+        order = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependent in self.dependents[name]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        if len(order) < len(self.courses):
+            cycle = sorted(name for name, count in remaining.items() if count)
+            raise ValueError(f"Môn tiên quyết bị lặp vòng: {', '.join(cycle)}")
+        return order
+
+    def _ancestors(self, name):
+        """Tất cả môn phải học trước môn này (trực tiếp hoặc gián tiếp)"""
+        found = set()
+        stack = list(self.prerequisites[name])
+        while stack:
+            prerequisite = stack.pop()
+            if prerequisite not in found:
+                found.add(prerequisite)
+                stack.extend(self.prerequisites[prerequisite])
+        return found
+
+    def _importance(self, important_courses):
+        """{tên trong danh mục: (thứ hạng, điểm 0-1)} và các tên không khớp danh mục"""
+        importance = {}
+        unmatched = []
+        for rank, course in enumerate(important_courses or [], 1):
+            name = course.get('name') if isinstance(course, dict) else course
+            catalog_name = self.match(name)
+            if catalog_name is None:
+                unmatched.append(name)
+                continue
+            if catalog_name in importance:
+                continue
+            numerator, denominator = parse_score(course.get('importance_score') if isinstance(course, dict) else None)
+            score = min(numerator / denominator, 1.0) if numerator is not None else DEFAULT_IMPORTANCE
+            importance[catalog_name] = (rank, score)
+        return importance, unmatched
+
+    def plan(self, important_courses=None, only_important=False, credit_cap=None):
+        """
+        Xếp kế hoạch học kỳ
+
+        Args:
+            important_courses (list): Môn quan trọng theo thứ hạng ({'name', 'importance_score'} hoặc tên)
+            only_important (bool): Chỉ xếp môn quan trọng và các môn tiên quyết của chúng
+            credit_cap (int): Số tín chỉ tối đa mỗi học kỳ (mặc định theo lúc khởi tạo)
+
+        Returns:
+            dict: 'semesters' (mỗi học kỳ: số thứ tự, tổng tín chỉ, các môn), 'total_credits', 'lower_bound'
+                (số học kỳ tối thiểu theo tổng tín chỉ và chuỗi tiên quyết dài nhất), 'credit_cap' và 'unmatched'
+                (môn quan trọng không có trong danh mục)
+
+        Raises:
+            ValueError: Có môn nhiều tín chỉ hơn giới hạn mỗi học kỳ
+        """
+        cap = int(credit_cap or self.credit_cap)
+        importance, unmatched = self._importance(important_courses)
+
+        selected = set(self.courses)
+        if only_important:
+            selected = set(importance)
+            for name in importance:
+                selected |= self._ancestors(name)
+        for name in selected:
+            if self.courses[name] > cap:
+                raise ValueError(f"Môn \"{name}\" có {self.courses[name]} tín chỉ, vượt giới hạn {cap} tín chỉ mỗi học kỳ")
+
+        # Độ ưu tiên: môn sau được tính trước để môn tiên quyết hưởng điểm quan trọng của môn sau nó
+        inherited = {}
+        unlocks = {}
+        for name in reversed(self.order):
+            if name not in selected:
+                continue
+            dependents = [dependent for dependent in self.dependents[name] if dependent in selected]
+            inherited[name] = max([importance.get(name, (0, 0.0))[1]]
+                                  + [inherited[dependent] * INHERITED_IMPORTANCE for dependent in dependents])
+            unlocks[name] = set(dependents)
+            for dependent in dependents:
+                unlocks[name] |= unlocks[dependent]
+        values = {name: self.courses[name] + IMPORTANCE_WEIGHT * inherited[name] + UNLOCK_WEIGHT * len(unlocks[name])
+                  for name in selected}
+
+        semester_of = {}
+        semesters = []
+        remaining = [name for name in self.order if name in selected]
+        while remaining:
+            available = [name for name in remaining if all(prerequisite in semester_of for prerequisite in self.prerequisites[name])]
+            chosen = self._pack(available, cap, values)
+            for name in chosen:
+                semester_of[name] = len(semesters) + 1
+            chosen_set = set(chosen)
+            remaining = [name for name in remaining if name not in chosen_set]
+            semesters.append(chosen)
+
+        total_credits = sum(self.courses[name] for name in selected)
+        depth = {}
+        for name in self.order:
+            if name in selected:
+                depth[name] = 1 + max([depth[prerequisite] for prerequisite in self.prerequisites[name]] or [0])
+        lower_bound = max(math.ceil(total_credits / cap), max(depth.values(), default=0))
+
+        return {
+            'credit_cap': cap,
+            'total_credits': total_credits,
+            'lower_bound': lower_bound,
+            'unmatched': unmatched,
+            'semesters': [
+                {
+                    'semester': number,
+                    'credits': sum(self.courses[name] for name in names),
+                    'courses': [
+                        {
+                            'name': name,
+                            'credits': self.courses[name],
+                            'important_rank': importance[name][0] if name in importance else None,
+                            'prerequisites': sorted(self.prerequisites[name])
+                        }
+                        for name in sorted(names, key=lambda name: (importance.get(name, (math.inf,))[0], -values[name]))
+                    ]
+                }
+                for number, names in enumerate(semesters, 1)
+            ]
+        }
+
+    def _pack(self, names, cap, values):
+        """Tập môn có tổng độ ưu tiên lớn nhất với tổng tín chỉ không quá cap (quy hoạch động cái túi 0/1)"""
+        best = [0.0] * (cap + 1)
+        taken = []
+        for name in names:
+            credits = self.courses[name]
+            value = values[name]
+            row = [False] * (cap + 1)
+            for capacity in range(cap, credits - 1, -1):
+                candidate = best[capacity - credits] + value
+                if candidate > best[capacity]:
+                    best[capacity] = candidate
+                    row[capacity] = True
+            taken.append(row)
+
+        chosen = []
+        capacity = cap
+        for name, row in zip(reversed(names), reversed(taken)):
+            if row[capacity]:
+                chosen.append(name)
+                capacity -= self.courses[name]
+        return chosen
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+    from data_processor import DataProcessor
+
+    parser = argparse.ArgumentParser(description="Xếp các môn học vào học kỳ")
+    parser.add_argument('--cap', type=int, default=SEMESTER_CREDIT_CAP, help="Số tín chỉ tối đa mỗi học kỳ")
+    parser.add_argument('--important', action='append', help="Môn quan trọng theo thứ tự ưu tiên (lặp lại được)")
+    parser.add_argument('--only-important', action='store_true', help="Chỉ xếp môn quan trọng và môn tiên quyết của chúng")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        planner = SemesterPlanner(DataProcessor.load_courses(), DataProcessor.load_prerequisites(), args.cap)
+        plan = planner.plan(args.important, only_important=args.only_important)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(tabulate([
+        [semester['semester'], semester['credits'],
+         '\n'.join(('⭐ ' if course['important_rank'] else '') + f"{course['name']} ({course['credits']})"
+                   for course in semester['courses'])]
+        for semester in plan['semesters']
+    ], headers=['Học kỳ', 'Tín chỉ', 'Môn học'], tablefmt='grid'))
+    print(f"📊 {len(plan['semesters'])} học kỳ cho {plan['total_credits']} tín chỉ "
+          f"(tối thiểu {plan['lower_bound']} học kỳ, tối đa {plan['credit_cap']} tín chỉ/học kỳ)")
+    if plan['unmatched']:
+        print(f"⚠️ Không có trong danh sách môn học: {', '.join(plan['unmatched'])}")
+    print(f"⏱️ {elapsed_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Chỉ mục tương tự (MinHash + LSH) trên thông tin đầu vào của các lộ trình đã lưu
+
+Yêu cầu mới gần giống một yêu cầu đã có (cùng vị trí, GPA gần nhau, sở thích/điểm mạnh/điểm yếu
+gần giống) được trả lời bằng lộ trình đã lưu hoặc dùng lộ trình đó làm tham khảo trong prompt.
+Mỗi lần khớp được ghi vào bảng similarity_matches kèm độ tương tự để kiểm tra lại.
+
+Ví dụ:
+    python similarity_index.py rebuild
+    python similarity_index.py matches --limit 20
+"""
+
+import argparse
+import hashlib
+import random
+import sqlite3
+import struct
+
+from config import (MINHASH_PERMUTATIONS, LSH_BANDS, SIMILARITY_SHINGLE_SIZE, SIMILARITY_REUSE_THRESHOLD,
+                    SIMILARITY_SEED_THRESHOLD, SIMILARITY_GPA_TOLERANCE)
+from student_roster import normalize_name
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+
+# Hệ số hoán vị cố định để chữ ký lưu trong database dùng được giữa các tiến trình và các lần chạy
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                 for _ in range(MINHASH_PERMUTATIONS)]
+_ROWS_PER_BAND = MINHASH_PERMUTATIONS // LSH_BANDS
+_SIGNATURE = struct.Struct(f'>{MINHASH_PERMUTATIONS}Q')
+
+# Các trường văn bản được so sánh, mỗi trường có tiền tố riêng để "điểm mạnh" không khớp với "điểm yếu"
+_TEXT_FIELDS = (('p', 'preferences'), ('s', 'strengths'), ('w', 'weaknesses'))
+
+
+def _hash64(value):
+    """Hash 64 bit ổn định giữa các tiến trình (khác với hash() của Python)"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shingles(student_data):
+    """Tập n-gram ký tự của sở thích, điểm mạnh và điểm yếu (đã bỏ dấu, chữ thường)"""
+    result = set()
+    for prefix, field in _TEXT_FIELDS:
+        text = normalize_name(student_data.get(field))
+        if not text:
+            continue
+        if len(text) <= SIMILARITY_SHINGLE_SIZE:
+            result.add(f"{prefix}:{text}")
+            continue
+        for i in range(len(text) - SIMILARITY_SHINGLE_SIZE + 1):
+            result.add(f"{prefix}:{text[i:i + SIMILARITY_SHINGLE_SIZE]}")
+    return result
+
+
+def minhash(shingle_set):
+    """Chữ ký MinHash của một tập n-gram"""
+    hashes = [_hash64(shingle) for shingle in shingle_set]
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def band_keys(position_key, signature):
+    """Khóa bucket LSH của từng band, gắn với vị trí để chỉ so sánh các yêu cầu cùng vị trí"""
+    keys = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]
+        digest = hashlib.blake2b(f"{position_key}|{band}|{rows}".encode('utf-8'), digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return keys
+
+
+def estimate_similarity(signature, other):
+    """Ước lượng độ tương tự Jaccard bằng tỉ lệ giá trị MinHash trùng nhau"""
+    return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+
+def position_key(target_position):
+    return normalize_name(target_position)
+
+
+def create_tables(cursor):
+    """Tạo các bảng chữ ký, bucket LSH và nhật ký khớp (gọi từ DatabaseManager.init_database)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS path_signatures (
+            learning_path_id INTEGER PRIMARY KEY,
+            position_key TEXT NOT NULL,
+            gpa REAL,
+            signature BLOB NOT NULL,
+            FOREIGN KEY (learning_path_id) REFERENCES learning_paths (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS path_lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            learning_path_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_path_lsh_buckets ON path_lsh_buckets(band, bucket)')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS similarity_matches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_name TEXT,
+            target_position TEXT,
+            matched_learning_path_id INTEGER NOT NULL,
+            similarity REAL NOT NULL,
+            action TEXT NOT NULL, -- 'reuse', 'seed'
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def index_learning_path(cursor, learning_path_id, target_position, student_data):
+    """Thêm lộ trình vào chỉ mục trong transaction đang ghi, False nếu không có văn bản để so sánh"""
+    shingle_set = shingles(student_data)
+    if not shingle_set:
+        return False
+
+    key = position_key(target_position)
+    signature = minhash(shingle_set)
+    cursor.execute('''
+        INSERT OR REPLACE INTO path_signatures (learning_path_id, position_key, gpa, signature)
+        VALUES (?, ?, ?, ?)
+    ''', (learning_path_id, key, student_data.get('gpa'), _SIGNATURE.pack(*signature)))
+    cursor.executemany('INSERT INTO path_lsh_buckets (band, bucket, learning_path_id) VALUES (?, ?, ?)',
+                       [(band, bucket, learning_path_id) for band, bucket in band_keys(key, signature)])
+    return True
+
+
+def _gpa_compatible(gpa, other, tolerance):
+    if gpa is None or other is None:
+        return gpa is None and other is None
+    return abs(float(gpa) - float(other)) <= tolerance
+
+
+class SimilarityIndex:
+    """Tìm lộ trình đã lưu có thông tin đầu vào gần nhất với một yêu cầu mới"""
+
+    def __init__(self, db_manager, reuse_threshold=SIMILARITY_REUSE_THRESHOLD,
+                 seed_threshold=SIMILARITY_SEED_THRESHOLD, gpa_tolerance=SIMILARITY_GPA_TOLERANCE):
+        """
+        Args:
+            db_manager (DatabaseManager): Database chứa chỉ mục và lộ trình đã lưu
+            reuse_threshold (float): Độ tương tự tối thiểu để trả về luôn lộ trình đã lưu
+            seed_threshold (float): Độ tương tự tối thiểu để dùng lộ trình đã lưu làm tham khảo trong prompt
+            gpa_tolerance (float): Chênh lệch GPA tối đa giữa hai yêu cầu
+        """
+        self.db_manager = db_manager
+        self.reuse_threshold = reuse_threshold
+        self.seed_threshold = seed_threshold
+        self.gpa_tolerance = gpa_tolerance
+
+    def _connect(self):
+        return sqlite3.connect(self.db_manager.db_path, timeout=30)
+
+    def find(self, target_position, student_data):
+        """
+        Lộ trình gần nhất có độ tương tự từ seed_threshold trở lên
+
+        Returns:
+            dict: {'learning_path_id', 'similarity'} hoặc None
+        """
+        shingle_set = shingles(student_data)
+        if not shingle_set:
+            return None
+
+        signature = minhash(shingle_set)
+        keys = band_keys(position_key(target_position), signature)
+        conn = self.db_manager.reads.connect()
+        try:
+            # Ứng viên là các lộ trình trùng ít nhất một band; chỉ các ứng viên này mới được so chữ ký
+            placeholders = ' OR '.join(['(b.band = ? AND b.bucket = ?)'] * len(keys))
+            rows = conn.execute(f'''
+                SELECT DISTINCT s.learning_path_id, s.gpa, s.signature
+                FROM path_lsh_buckets b
+                JOIN path_signatures s ON s.learning_path_id = b.learning_path_id
+                WHERE {placeholders}
+            ''', [value for key in keys for value in key]).fetchall()
+        finally:
+            conn.close()
+
+        best = None
+        for learning_path_id, gpa, packed in rows:
+            if not _gpa_compatible(student_data.get('gpa'), gpa, self.gpa_tolerance):
+                continue
+            similarity = estimate_similarity(signature, _SIGNATURE.unpack(packed))
+            # Cùng độ tương tự thì ưu tiên lộ trình mới hơn
+            if best is None or (similarity, learning_path_id) > (best['similarity'], best['learning_path_id']):
+                best = {'learning_path_id': learning_path_id, 'similarity': similarity}
+
+        if best is None or best['similarity'] < self.seed_threshold:
+            return None
+        return best
+
+    def action_for(self, match):
+        """'reuse' nếu đủ gần để trả về luôn lộ trình đã lưu, ngược lại 'seed'"""
+        return 'reuse' if match['similarity'] >= self.reuse_threshold else 'seed'
+
+    def record_match(self, match, action, student_name=None, target_position=None):
+        """Ghi nhật ký một lần dùng lại/tham khảo lộ trình đã lưu"""
+        conn = self._connect()
+        conn.execute('''
+            INSERT INTO similarity_matches (student_name, target_position, matched_learning_path_id, similarity, action)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (student_name, target_position, match['learning_path_id'], round(match['similarity'], 4), action))
+        conn.commit()
+        conn.close()
+
+    def get_matches(self, limit=50):
+        """Các lần khớp gần nhất"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute('''
+            SELECT id, student_name, target_position, matched_learning_path_id, similarity, action, created_at
+            FROM similarity_matches
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def rebuild(self):
+        """Đánh chỉ mục lại toàn bộ lộ trình đã lưu (database tạo trước khi có chỉ mục), trả về số lộ trình"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT lp.id, lp.target_position, lp.preferences, lp.strengths, lp.weaknesses, s.gpa
+                FROM learning_paths lp
+                LEFT JOIN students s ON lp.student_id = s.id
+                ORDER BY lp.id
+            ''').fetchall()
+
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM path_lsh_buckets')
+            cursor.execute('DELETE FROM path_signatures')
+            indexed = 0
+            for learning_path_id, target_position, preferences, strengths, weaknesses, gpa in rows:
+                student_data = {'preferences': preferences, 'strengths': strengths,
+                                'weaknesses': weaknesses, 'gpa': gpa}
+                indexed += index_learning_path(cursor, learning_path_id, target_position, student_data)
+            conn.commit()
+            return indexed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+    from database_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Chỉ mục tương tự của các lộ trình đã lưu")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help="Đánh chỉ mục lại toàn bộ lộ trình đã lưu")
+    matches = subparsers.add_parser('matches', help="Xem nhật ký các lần dùng lại/tham khảo lộ trình")
+    matches.add_argument('--limit', type=int, default=50)
+
+    args = parser.parse_args()
+    index = SimilarityIndex(DatabaseManager())
+
+    if args.command == 'rebuild':
+        print(f"✅ Đã đánh chỉ mục {index.rebuild()} lộ trình")
+        return
+
+    rows = index.get_matches(args.limit)
+    if rows:
+        print(tabulate(rows, headers='keys'))
+    else:
+        print("📊 Chưa có lần khớp nào")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Danh sách sinh viên đánh chỉ mục theo Mã SV, tìm kiếm theo tiền tố không phân biệt dấu và phân trang
+"""
+
+import bisect
+import os
+import unicodedata
+from functools import lru_cache
+
+from config import GPA_FILE
+from data_processor import DataProcessor
+
+
+def normalize_name(text):
+    """Bỏ dấu tiếng Việt, chữ thường và gộp khoảng trắng ("Đặng Lê" -> "dang le")"""
+    text = unicodedata.normalize('NFD', str(text or '').replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    return ' '.join(text.lower().split())
+
+
+class StudentRoster:
+    """Chỉ mục sinh viên: tra cứu theo mã và tìm theo tiền tố của bất kỳ từ nào trong họ tên"""
+
+    def __init__(self, students):
+        """
+        Args:
+            students (list): Danh sách dict {'student_code', 'student_name', 'gpa'}, giữ nguyên thứ tự trong file
+        """
+        self.students = list(students)
+        self._by_code = {student['student_code']: student for student in self.students}
+        self._tokens = [normalize_name(student['student_name']).split() for student in self.students]
+
+        # Chỉ mục tiền tố: (từ đã chuẩn hóa, vị trí sinh viên) và (mã SV, vị trí) đã sắp xếp để tìm bằng bisect
+        self._token_index = sorted(
+            (token, position) for position, tokens in enumerate(self._tokens) for token in set(tokens)
+        )
+        self._code_index = sorted((student['student_code'], position) for position, student in enumerate(self.students))
+
+    def __len__(self):
+        return len(self.students)
+
+    def get(self, student_code):
+        """Sinh viên theo Mã SV, None nếu không có"""
+        return self._by_code.get(student_code)
+
+    @staticmethod
+    def _prefix_positions(index, prefix):
+        start = bisect.bisect_left(index, (prefix,))
+        positions = set()
+        for key, position in index[start:]:
+            if not key.startswith(prefix):
+                break
+            positions.add(position)
+        return positions
+
+    def _matches(self, query):
+        """Vị trí các sinh viên khớp truy vấn (theo thứ tự trong danh sách), None nếu truy vấn rỗng"""
+        terms = normalize_name(query).split()
+        if not terms:
+            return None
+
+        # Truy vấn là mã SV
+        if len(terms) == 1 and terms[0].isdigit():
+            return sorted(self._prefix_positions(self._code_index, terms[0]))
+
+        # Mỗi từ trong truy vấn phải là tiền tố của một từ trong họ tên, bắt đầu từ từ hiếm nhất
+        candidate_sets = sorted((self._prefix_positions(self._token_index, term) for term in terms), key=len)
+        positions = set.intersection(*candidate_sets)
+        return sorted(positions)
+
+    def search(self, query='', offset=0, limit=20):
+        """
+        Tìm sinh viên theo tên (không dấu, theo tiền tố từng từ) hoặc theo tiền tố Mã SV
+
+        Returns:
+            tuple: (danh sách sinh viên của trang, tổng số kết quả)
+        """
+        positions = self._matches(query)
+        if positions is None:
+            return self.students[offset:offset + limit], len(self.students)
+        return [self.students[position] for position in positions[offset:offset + limit]], len(positions)
+
+    @staticmethod
+    def label(student):
+        """Nhãn hiển thị của sinh viên trong ô chọn"""
+        gpa = student['gpa'] if student['gpa'] is not None else 'N/A'
+        return f"{student['student_name']} - {student['student_code']} (GPA: {gpa})"
+
+
+@lru_cache(maxsize=4)
+def _load_roster(file_path, mtime, with_gpa_only):
+    students = [
+        {'student_code': row['Mã SV'], 'student_name': row['Họ và tên'], 'gpa': row['TBCHT H4']}
+        for row in DataProcessor.load_gpa_data()
+        if row['Mã SV'] and (row['TBCHT H4'] is not None or not with_gpa_only)
+    ]
+    return StudentRoster(students)
+
+
+def load_roster(with_gpa_only=True):
+    """Roster từ file GPA, chỉ dựng lại chỉ mục khi file thay đổi"""
+    try:
+        mtime = os.path.getmtime(GPA_FILE)
+    except OSError:
+        return StudentRoster([])
+    return _load_roster(GPA_FILE, mtime, with_gpa_only)
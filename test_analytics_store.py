@@ -0,0 +1,162 @@
+"""
+Test bản sao dạng cột (analytics_store.py): so kết quả tổng hợp với SQLite trên dữ liệu sinh tổng hợp
+"""
+
+import sqlite3
+import statistics
+from collections import defaultdict
+
+import pytest
+
+from analytics_store import AnalyticsStore, GPA_BAND_LABELS
+from data_generator import SyntheticDataGenerator
+from database_manager import DatabaseManager
+from path_templates import gpa_band
+
+PATHS = 300
+RESULT = {'target_position': 'AI Engineer', 'analysis': 'Phân tích', 'overall_timeline': '2 năm 6 tháng',
+          'learning_path': [{'domain': 'Toán', 'timeline': '3-6 tháng'}], 'recommendations': 'Lời khuyên',
+          'course_analysis': {'important_courses': [{'name': 'Học máy', 'credits': '3', 'importance_score': '85%'}]}}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_path = str(tmp_path / 'analytics.db')
+    SyntheticDataGenerator(db_path, seed=7, batch_size=100).generate(PATHS)
+    db = DatabaseManager(db_path)
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    # Segment nhỏ và ít segment tối đa để đồng bộ tạo nhiều segment rồi gộp lại
+    return AnalyticsStore(db, directory=str(tmp_path / 'columns'), batch_size=40, max_segments=3)
+
+
+def _query(db, sql, params=()):
+    conn = sqlite3.connect(db.db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _grouped(rows):
+    groups = defaultdict(list)
+    for key, value in rows:
+        groups[key].append(value)
+    return groups
+
+
+def _by(rows, column, metric):
+    return {row[column]: row[metric] for row in rows}
+
+
+def test_sync_compacts_segments(store):
+    assert store.sync() == PATHS
+    info = store.info()
+    assert info['watermark'] == PATHS
+    assert info['rows']['paths'] == PATHS
+    assert info['segments'] == 1  # 8 segment được gộp lại vì vượt max_segments
+
+
+def test_paths_match_sqlite(db, store):
+    store.sync()
+    rows = _query(db, 'SELECT target_position, timeline_max_months FROM learning_paths')
+    groups = _grouped(rows)
+
+    result = store.aggregate('paths', group_by=['position'],
+                             metrics=['count', 'mean:timeline_max_months', 'median:timeline_max_months',
+                                      'min:timeline_max_months', 'max:timeline_max_months'])
+    assert _by(result, 'position', 'count') == {position: len(values) for position, values in groups.items()}
+    for row in result:
+        values = groups[row['position']]
+        assert row['mean:timeline_max_months'] == pytest.approx(statistics.mean(values), abs=1e-3)
+        assert row['median:timeline_max_months'] == pytest.approx(statistics.median(values), abs=1e-3)
+        assert row['min:timeline_max_months'] == min(values)
+        assert row['max:timeline_max_months'] == max(values)
+    # Sắp xếp giảm dần theo metric đầu tiên
+    assert [row['count'] for row in result] == sorted((row['count'] for row in result), reverse=True)
+
+
+def test_courses_match_sqlite(db, store):
+    store.sync()
+    rows = _query(db, '''
+        SELECT ic.course_name, ca.learning_path_id, ic.score_numerator * 10.0 / ic.score_denominator, s.gpa
+        FROM important_courses ic
+        JOIN course_analyses ca ON ic.course_analysis_id = ca.id
+        JOIN learning_paths lp ON lp.id = ca.learning_path_id
+        JOIN students s ON s.id = lp.student_id
+    ''')
+    scores = _grouped((course, score) for course, _, score, _ in rows)
+    paths = _grouped((course, path_id) for course, path_id, _, _ in rows)
+
+    result = store.aggregate('courses', group_by=['course'],
+                             metrics=['count', 'distinct_paths', 'mean:importance_score', 'median:importance_score'])
+    assert len(result) == len(scores)
+    for row in result:
+        assert row['count'] == len(scores[row['course']])
+        assert row['distinct_paths'] == len(set(paths[row['course']]))
+        assert row['mean:importance_score'] == pytest.approx(statistics.mean(scores[row['course']]), abs=1e-3)
+        assert row['median:importance_score'] == pytest.approx(statistics.median(scores[row['course']]), abs=1e-3)
+
+    # Nhóm theo hai cột, trong đó gpa_band là cột tính lúc nạp
+    by_band = store.aggregate('courses', group_by=['gpa_band', 'course'], metrics=['count'], limit=None)
+    expected = _grouped(((gpa_band(gpa), course), 1) for course, _, _, gpa in rows)
+    assert {(row['gpa_band'], row['course']): row['count'] for row in by_band} == {
+        key: len(values) for key, values in expected.items()}
+    assert {row['gpa_band'] for row in by_band} <= set(GPA_BAND_LABELS)
+
+
+def test_filters_match_sqlite(db, store):
+    store.sync()
+    position, since = _query(db, '''
+        SELECT target_position, (SELECT created_at FROM learning_paths ORDER BY created_at LIMIT 1 OFFSET 150)
+        FROM learning_paths GROUP BY target_position ORDER BY COUNT(*) DESC LIMIT 1
+    ''')[0]
+    expected = _query(db, '''
+        SELECT COUNT(*) FROM learning_paths
+        WHERE target_position = ? AND created_at >= ? AND timeline_max_months BETWEEN 10 AND 18
+    ''', (position, since))[0][0]
+
+    result = store.aggregate('paths', metrics=['count'], since=since,
+                             where={'position': position, 'timeline_max_months': (10, 18)})
+    assert expected > 0
+    assert result == [{'count': expected}]
+    assert store.aggregate('paths', where={'position': 'Không có vị trí này'}) == []
+
+
+def test_incremental_sync_after_new_rows(db, store):
+    store.sync()
+    first = db.save_learning_path({'student_name': 'Sinh viên mới', 'gpa': 3.4}, RESULT)
+    db.save_learning_path({'student_name': 'Sinh viên mới', 'gpa': 3.4}, RESULT)
+
+    assert store.sync() == 2  # Chỉ đọc các lộ trình sau watermark
+    assert store.info()['watermark'] == first + 1
+    assert store.info()['rows']['paths'] == PATHS + 2
+    added = store.aggregate('paths', metrics=['count', 'mean:timeline_max_months'], where={'path_id': (first, None)})
+    assert added == [{'count': 2, 'mean:timeline_max_months': 30.0}]
+    courses = store.aggregate('courses', group_by=['course'], metrics=['count', 'mean:importance_score'],
+                              where={'path_id': (first, None)})
+    assert courses == [{'course': 'Học máy', 'count': 2, 'mean:importance_score': 8.5}]
+    assert store.sync() == 0
+
+
+def test_rebuild_when_cache_version_changes(db, store):
+    store.sync()
+    # Nạp thêm dữ liệu bằng SQL tăng phiên bản 'all': bản sao được dựng lại từ đầu
+    SyntheticDataGenerator(db.db_path, seed=8, batch_size=100).generate(20)
+    assert store.sync() == PATHS + 20
+    assert store.info()['rows']['paths'] == PATHS + 20
+    assert sum(row['count'] for row in store.aggregate('paths', group_by=['position'])) == PATHS + 20
+
+
+def test_invalid_queries(store):
+    store.sync()
+    with pytest.raises(ValueError):
+        store.aggregate('paths', group_by=['gpa'])
+    with pytest.raises(ValueError):
+        store.aggregate('paths', metrics=['mode:gpa'])
+    with pytest.raises(ValueError):
+        store.aggregate('exams')
@@ -0,0 +1,104 @@
+"""
+Test giới hạn đồng thời của API (api_server.py): chỗ chỉ được trả khi luồng thực sự xong
+"""
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import api_server
+from api_server import HTTPError, LearningPathAPI
+
+BODY = json.dumps({'student_name': 'Sinh viên A', 'target_position': 'AI Engineer'}).encode('utf-8')
+
+
+async def _receive():
+    return {'type': 'http.request', 'body': BODY, 'more_body': False}
+
+
+async def _wait_unlocked(slots, timeout=5):
+    async def poll():
+        while slots.locked():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_generate_slot_held_until_generation_finishes(tmp_path, monkeypatch):
+    """Sau 504 lượt tạo vẫn giữ chỗ: request mới bị từ chối 429 đến khi lượt cũ lưu xong"""
+    monkeypatch.setattr(api_server, 'API_GENERATE_TIMEOUT', 0.05)
+    release = threading.Event()
+    saved = []
+
+    def generate_and_save(payload):
+        release.wait(5)
+        saved.append(payload)
+        return 1
+
+    async def scenario():
+        api = LearningPathAPI(str(tmp_path / 'api.db'), use_job_queue=False)
+        api._generate_executor = ThreadPoolExecutor(1)
+        api._generate_slots = asyncio.Semaphore(1)
+        api._generate_and_save = generate_and_save
+        try:
+            with pytest.raises(HTTPError) as timeout:
+                await api.create_learning_path({}, _receive)
+            assert timeout.value.status == 504
+
+            with pytest.raises(HTTPError) as busy:
+                await api.create_learning_path({}, _receive)
+            assert busy.value.status == 429
+
+            release.set()
+            await _wait_unlocked(api._generate_slots)
+            assert len(saved) == 1  # Lượt tạo sau 504 vẫn lưu kết quả
+
+            assert await api.create_learning_path({}, _receive) == (201, {'learning_path_id': 1,
+                                                                         'url': '/learning-paths/1'})
+        finally:
+            release.set()
+            api._generate_executor.shutdown(wait=True)
+
+    asyncio.run(scenario())
+
+
+def test_read_slot_released_when_read_finishes(monkeypatch):
+    monkeypatch.setattr(api_server, 'API_READ_TIMEOUT', 0.05)
+    release = threading.Event()
+
+    async def scenario():
+        api = LearningPathAPI()
+        api._read_executor = ThreadPoolExecutor(1)
+        api._read_slots = asyncio.Semaphore(1)
+        try:
+            with pytest.raises(HTTPError) as timeout:
+                await api._read(release.wait, 5)
+            assert timeout.value.status == 504
+            assert api._read_slots.locked()
+
+            release.set()
+            await _wait_unlocked(api._read_slots)
+            assert await api._read(sum, [1, 2]) == 3
+            assert not api._read_slots.locked()
+        finally:
+            release.set()
+            api._read_executor.shutdown(wait=True)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('raw', [b'[]', b'"x"', b'42', b'null'])
+def test_create_rejects_non_object_body(raw):
+    """Body là JSON hợp lệ nhưng không phải object trả 400 thay vì lỗi 500"""
+    async def receive():
+        return {'type': 'http.request', 'body': raw, 'more_body': False}
+
+    async def scenario():
+        api = LearningPathAPI(use_job_queue=False)
+        with pytest.raises(HTTPError) as error:
+            await api.create_learning_path({}, receive)
+        assert error.value.status == 400
+
+    asyncio.run(scenario())
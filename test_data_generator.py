@@ -0,0 +1,22 @@
+"""
+Test sinh dữ liệu tổng hợp (data_generator.py)
+"""
+
+import sqlite3
+
+from data_generator import SyntheticDataGenerator
+from database_manager import CACHE_SCOPE_ALL
+
+
+def test_generate_bumps_all_cache_scope(tmp_path):
+    """Nạp dữ liệu thẳng bằng SQL vẫn làm cache thống kê và AnalyticsStore hết hạn"""
+    db_path = str(tmp_path / 'generated.db')
+    assert SyntheticDataGenerator(db_path, batch_size=5).generate(3) == 3
+
+    conn = sqlite3.connect(db_path)
+    try:
+        version = conn.execute('SELECT version FROM cache_versions WHERE scope = ?', (CACHE_SCOPE_ALL,)).fetchone()
+        assert version is not None and version[0] >= 1
+        assert conn.execute('SELECT COUNT(*) FROM learning_paths').fetchone()[0] == 3
+    finally:
+        conn.close()
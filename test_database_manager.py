@@ -0,0 +1,109 @@
+"""
+Test nén cột văn bản dài và đọc chi tiết lộ trình (database_manager.py)
+"""
+
+import sqlite3
+
+import pytest
+
+import database_manager
+from database_manager import DatabaseManager, compress_text, decompress_text
+
+LONG_TEXT = "Sinh viên cần tập trung vào kiến thức nền tảng và thực hành dự án thực tế. " * 20
+RESULT = {'target_position': 'AI Engineer', 'analysis': LONG_TEXT, 'learning_path': [], 'overall_timeline': '6 tháng',
+          'recommendations': 'Lời khuyên ngắn',
+          'course_analysis': {'analysis_summary': LONG_TEXT, 'important_courses': [], 'general_recommendations': 'Học đều'}}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'paths.db'))
+    yield db
+    db.close()
+
+
+def _stored(db, column, table='learning_paths'):
+    conn = sqlite3.connect(db.db_path)
+    try:
+        return conn.execute(f'SELECT {column} FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('value', [None, '', 'Ngắn', LONG_TEXT])
+def test_compress_round_trip(value):
+    packed = compress_text(value)
+    if value is not None and len(value.encode('utf-8')) >= database_manager.COMPRESSION_MIN_BYTES:
+        assert isinstance(packed, bytes) and len(packed) < len(value.encode('utf-8'))
+    else:
+        assert packed is value  # Giá trị ngắn được lưu nguyên dạng
+    assert decompress_text(packed) == value
+
+
+def test_decompress_rejects_unknown_version():
+    with pytest.raises(ValueError):
+        decompress_text(b'\x09\x00\x00\x00\x01x')
+
+
+def test_saved_text_is_compressed_and_read_back(db):
+    learning_path_id = db.save_learning_path({'student_name': 'Sinh viên A'}, dict(RESULT, raw_response=LONG_TEXT))
+
+    assert isinstance(_stored(db, 'analysis'), bytes)
+    assert _stored(db, 'recommendations') == 'Lời khuyên ngắn'
+    details = db.get_learning_path_details(learning_path_id)
+    assert details['analysis'] == LONG_TEXT
+    assert details['recommendations'] == 'Lời khuyên ngắn'
+    assert details['raw_response'] == LONG_TEXT
+    assert details['course_analysis']['analysis_summary'] == LONG_TEXT
+
+
+def test_details_without_text_then_lazy_field(db):
+    """load_text=False không đọc các cột dài, get_text_field đọc riêng khi hiển thị"""
+    learning_path_id = db.save_learning_path({'student_name': 'Sinh viên A'}, RESULT)
+
+    details = db.get_learning_path_details(learning_path_id, load_text=False)
+    assert details['analysis'] is None and details['recommendations'] is None
+    assert details['course_analysis']['analysis_summary'] is None
+    assert details['course_analysis']['general_recommendations'] == 'Học đều'
+    assert 'raw_response' not in details
+
+    assert db.get_text_field(learning_path_id, 'analysis') == LONG_TEXT
+    assert db.get_text_field(learning_path_id, 'analysis_summary') == LONG_TEXT
+    assert db.get_text_field(learning_path_id, 'recommendations') == 'Lời khuyên ngắn'
+    assert db.get_text_field(learning_path_id + 1, 'analysis') is None
+    with pytest.raises(ValueError):
+        db.get_text_field(learning_path_id, 'student_name')
+
+
+def test_legacy_plaintext_rows_and_migration(db, monkeypatch):
+    """Dòng ghi trước khi bật nén vẫn đọc được và được nén bởi compress_existing_rows"""
+    monkeypatch.setattr(database_manager, 'COMPRESS_TEXT_COLUMNS', False)
+    learning_path_id = db.save_learning_path({'student_name': 'Sinh viên A'}, RESULT)
+    assert _stored(db, 'analysis') == LONG_TEXT
+    assert db.get_learning_path_details(learning_path_id)['analysis'] == LONG_TEXT
+
+    monkeypatch.setattr(database_manager, 'COMPRESS_TEXT_COLUMNS', True)
+    stats = db.compress_existing_rows(batch_size=1)
+    assert stats['converted_rows'] == 2  # analysis và analysis_summary; recommendations quá ngắn
+    assert stats['raw_bytes'] > stats['stored_bytes']
+    assert isinstance(_stored(db, 'analysis'), bytes)
+    assert isinstance(_stored(db, 'analysis_summary', 'course_analyses'), bytes)
+    assert _stored(db, 'recommendations') == 'Lời khuyên ngắn'
+
+    details = db.get_learning_path_details(learning_path_id)
+    assert details['analysis'] == LONG_TEXT
+    assert details['course_analysis']['analysis_summary'] == LONG_TEXT
+    assert db.compress_existing_rows()['converted_rows'] == 0
+
+
+def test_model_usage_goes_through_group_commit_writer(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'usage.db'), group_commit=True)
+    before = db.writer.stats()['operations']
+
+    first = db.record_model_usage({'student_name': 'Sinh viên A', 'prompt_tokens': 10, 'output_tokens': 20})
+    second = db.record_model_usage({'student_name': 'Sinh viên A', 'prompt_tokens': 5, 'output_tokens': 5})
+
+    assert second > first
+    assert db.writer.stats()['operations'] == before + 2
+    assert db.get_tokens_used(student_name='Sinh viên A') == 40
+    db.close()
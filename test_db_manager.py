@@ -0,0 +1,53 @@
+"""
+Test reset database (db_manager.py)
+"""
+
+import sqlite3
+
+import database_manager
+import db_manager
+from job_queue import JobQueue, generate_and_save
+from request_coalescer import SingleFlight
+from usage_tracker import UsageTracker
+
+PAYLOAD = {'target_position': 'AI Engineer', 'student_data': {'student_name': 'Sinh viên A', 'gpa': 3.2}}
+RESULT = {'target_position': 'AI Engineer', 'analysis': 'Phân tích', 'learning_path': [], 'overall_timeline': '6 tháng',
+          'recommendations': 'Lời khuyên', 'course_analysis': {'important_courses': []}}
+
+
+class _Client:
+    def generate_learning_path(self, **kwargs):
+        return dict(RESULT)
+
+
+def _count(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_reset_clears_jobs_and_never_reuses_ids(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = str(tmp_path / 'reset.db')
+    store = database_manager.DatabaseManager(db_path)
+    queue = JobQueue(db_path)
+    SingleFlight(db_path)
+    UsageTracker(store).record('learning_path', 10, 20, 5.0, 'miss', student_name='Sinh viên A')
+
+    job_id = queue.submit(PAYLOAD)
+    queue.claim('w1')
+    old_path_id = generate_and_save(PAYLOAD, _Client(), store, [], job_lease=(job_id, 'w1'))
+
+    assert db_manager.DatabaseManager(db_path).reset_database()
+
+    assert _count(db_path, 'learning_paths') == 0
+    assert _count(db_path, 'generation_jobs') == 0
+    assert _count(db_path, 'inflight_requests') == 0
+    assert _count(db_path, 'model_usage') == 1
+    assert queue.get_job(job_id) is None
+    # Id cũ (phiên Streamlit, client API còn giữ) không trỏ tới lộ trình mới của sinh viên khác
+    assert store.save_learning_path({'student_name': 'Sinh viên B'}, RESULT) > old_path_id
+    assert queue.submit(PAYLOAD) > job_id
+    store.close()
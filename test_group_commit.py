@@ -0,0 +1,74 @@
+"""
+Test luồng ghi group commit (group_commit.py): savepoint cho từng thao tác và ghi nốt khi dừng
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from group_commit import GroupCommitWriter
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'writes.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE notes (id INTEGER PRIMARY KEY AUTOINCREMENT, body TEXT NOT NULL)')
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _insert(cursor, body):
+    cursor.execute('INSERT INTO notes (body) VALUES (?)', (body,))
+    return cursor.lastrowid
+
+
+def _insert_then_fail(cursor, body):
+    _insert(cursor, body)
+    raise ValueError('Thao tác lỗi')
+
+
+def _bodies(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute('SELECT body FROM notes ORDER BY id')]
+    finally:
+        conn.close()
+
+
+def test_failing_operation_rolls_back_only_its_savepoint(db_path):
+    """Thao tác lỗi chỉ hủy phần ghi của nó, các thao tác khác cùng lô vẫn commit và nhận id"""
+    writer = GroupCommitWriter(db_path, max_batch=10, max_delay=0.05)
+    # Xếp hàng trước khi khởi động để cả ba thao tác vào cùng một lô
+    first = writer.submit(_insert, 'một')
+    failing = writer.submit(_insert_then_fail, 'lỗi')
+    last = writer.submit(_insert, 'ba')
+    writer.start()
+
+    first_id, last_id = first.result(timeout=5), last.result(timeout=5)
+    with pytest.raises(ValueError):
+        failing.result(timeout=5)
+    writer.stop(timeout=5)
+
+    assert first_id < last_id
+    assert _bodies(db_path) == ['một', 'ba']
+    stats = writer.stats()
+    assert stats['transactions'] == 1
+    assert stats['operations'] == 3
+    assert stats['failed_operations'] == 1
+
+
+def test_stop_flushes_pending_operations(db_path):
+    """Dừng luồng ghi vẫn commit các thao tác đang chờ, không đợi hết max_delay"""
+    writer = GroupCommitWriter(db_path, max_batch=100, max_delay=30).start()
+    futures = [writer.submit(_insert, f"ghi chú {i}") for i in range(5)]
+
+    started = time.monotonic()
+    writer.stop(timeout=5)
+    assert time.monotonic() - started < 5
+    assert not writer.is_alive()
+
+    assert len({future.result(timeout=0) for future in futures}) == 5
+    assert _bodies(db_path) == [f"ghi chú {i}" for i in range(5)]
@@ -0,0 +1,156 @@
+"""
+Test hàng đợi job (job_queue.py): lease, thử lại có backoff, dead-letter và lưu kết quả khi mất lease
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import gemini_client
+import job_queue
+from database_manager import DatabaseManager
+from job_queue import JobQueue, LeaseLostError, generate_and_save
+
+PAYLOAD = {'target_position': 'AI Engineer', 'student_data': {'student_name': 'Sinh viên A', 'gpa': 3.2}}
+RESULT = {'target_position': 'AI Engineer', 'analysis': 'Phân tích', 'learning_path': [], 'overall_timeline': '6 tháng',
+          'recommendations': 'Lời khuyên', 'course_analysis': {'important_courses': []}}
+
+
+class _Client:
+    """Client giả trả về kết quả cố định"""
+
+    def generate_learning_path(self, **kwargs):
+        return dict(RESULT)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+def _count_paths(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM learning_paths').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_claim_takes_over_expired_lease(db_path):
+    queue = JobQueue(db_path)
+    job_id = queue.submit(PAYLOAD)
+
+    first = queue.claim('w1', lease_seconds=0.05)
+    assert first['id'] == job_id and first['attempts'] == 1
+    assert queue.claim('w2') is None  # Lease còn hạn: không ai nhận được
+
+    time.sleep(0.1)
+    second = queue.claim('w2')
+    assert second['id'] == job_id and second['attempts'] == 2
+    assert not queue.heartbeat(job_id, 'w1')
+    assert queue.heartbeat(job_id, 'w2')
+
+
+def test_fail_backs_off_then_dead_letters_on_last_attempt(db_path):
+    queue = JobQueue(db_path)
+    job_id = queue.submit(PAYLOAD, max_attempts=2)
+
+    queue.claim('w1')
+    before = time.time()
+    queue.fail(job_id, 'w1', 'lỗi lượt 1')
+    job = queue.get_job(job_id)
+    assert job['status'] == 'queued'
+    assert job['available_at'] >= before + 2  # Backoff 2^attempts giây
+    assert queue.claim('w1') is None
+
+    conn = sqlite3.connect(db_path)
+    conn.execute('UPDATE generation_jobs SET available_at = 0 WHERE id = ?', (job_id,))
+    conn.commit()
+    conn.close()
+
+    assert queue.claim('w1')['attempts'] == 2
+    queue.fail(job_id, 'w1', 'lỗi lượt 2')
+    assert queue.get_job(job_id)['status'] == 'dead'
+    assert [job['id'] for job in queue.list_dead_letters()] == [job_id]
+    assert queue.claim('w1') is None
+
+
+def test_expired_lease_on_last_attempt_dead_letters(db_path):
+    queue = JobQueue(db_path)
+    job_id = queue.submit(PAYLOAD, max_attempts=1)
+    queue.claim('w1', lease_seconds=0.01)
+    time.sleep(0.05)
+
+    assert queue.claim('w2') is None
+    job = queue.get_job(job_id)
+    assert job['status'] == 'dead'
+    assert job['error'] == 'Lease hết hạn ở lượt thử cuối'
+
+
+def test_requeue_resets_dead_job_only(db_path):
+    queue = JobQueue(db_path)
+    job_id = queue.submit(PAYLOAD, max_attempts=1)
+    assert not queue.requeue(job_id)  # Chưa phải dead-letter
+
+    queue.claim('w1')
+    queue.fail(job_id, 'w1', 'lỗi')
+    assert queue.requeue(job_id)
+    job = queue.claim('w1')
+    assert job['id'] == job_id and job['attempts'] == 1
+
+
+@pytest.mark.parametrize('group_commit', [False, True])
+def test_save_after_lost_lease_is_rolled_back(db_path, group_commit):
+    queue = JobQueue(db_path)
+    db_manager = DatabaseManager(db_path, group_commit=group_commit)
+    job_id = queue.submit(PAYLOAD)
+    queue.claim('w1', lease_seconds=0.01)
+    time.sleep(0.05)
+    queue.claim('w2')
+
+    with pytest.raises(LeaseLostError):
+        generate_and_save(PAYLOAD, _Client(), db_manager, [], job_lease=(job_id, 'w1'))
+    assert _count_paths(db_path) == 0
+
+    learning_path_id = generate_and_save(PAYLOAD, _Client(), db_manager, [], job_lease=(job_id, 'w2'))
+    job = queue.get_job(job_id)
+    assert job['status'] == 'done' and job['learning_path_id'] == learning_path_id
+    assert _count_paths(db_path) == 1
+    db_manager.close()
+
+
+def test_worker_survives_database_errors(db_path, monkeypatch):
+    """Lỗi SQLite khi nhận job hoặc ghi lỗi job không làm worker dừng"""
+    queue = JobQueue(db_path)
+    job_id = queue.submit(PAYLOAD)
+    stop_event = threading.Event()
+    calls = {'claim': 0, 'fail': 0}
+    claim, fail = JobQueue.claim, JobQueue.fail
+
+    def flaky_claim(self, worker_id, lease_seconds):
+        calls['claim'] += 1
+        if calls['claim'] == 1:
+            raise sqlite3.OperationalError('database is locked')
+        if calls['claim'] >= 4:
+            stop_event.set()
+        return claim(self, worker_id, lease_seconds)
+
+    def flaky_fail(self, *args):
+        calls['fail'] += 1
+        fail(self, *args)
+        raise sqlite3.OperationalError('database is locked')
+
+    def failing_job(*args):
+        raise RuntimeError('Lỗi model')
+
+    monkeypatch.setattr(JobQueue, 'claim', flaky_claim)
+    monkeypatch.setattr(JobQueue, 'fail', flaky_fail)
+    monkeypatch.setattr(job_queue, 'process_job', failing_job)
+    monkeypatch.setattr(gemini_client, 'GEMINI_API_KEY', 'test-key')
+    job_queue.run_worker(db_path, worker_id='w1', stop_event=stop_event, poll_interval=0.01)
+
+    assert calls['claim'] >= 4
+    assert calls['fail'] == 1
+    assert queue.get_job(job_id)['status'] == 'queued'
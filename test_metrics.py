@@ -0,0 +1,17 @@
+"""
+Test xuất metrics theo định dạng Prometheus (metrics.py)
+"""
+
+from metrics import MetricsRegistry
+
+
+def test_prometheus_escapes_label_values_and_help():
+    registry = MetricsRegistry()
+    registry.observe('phase_seconds', 0.02, help_text='Thời gian\\giai đoạn\nmới', phase='tạo "lộ trình"\\a\nb')
+    text = registry.to_prometheus()
+
+    assert '# HELP phase_seconds Thời gian\\\\giai đoạn\\nmới\n' in text
+    assert 'phase_seconds_count{phase="tạo \\"lộ trình\\"\\\\a\\nb"} 1\n' in text
+    assert 'phase_seconds_bucket{phase="tạo \\"lộ trình\\"\\\\a\\nb",le="0.025"} 1\n' in text
+    # Mỗi mẫu nằm trọn trên một dòng
+    assert all(line.startswith(('#', 'phase_seconds_')) for line in text.splitlines())
@@ -0,0 +1,105 @@
+"""
+Test đọc giá trị số từ văn bản của model (numeric_fields.py) và migration điền cột số cho database cũ
+"""
+
+import sqlite3
+
+import pytest
+
+from database_manager import DatabaseManager
+from numeric_fields import parse_credits, parse_score, parse_timeline
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3-6 tháng', (3.0, 6.0)),
+    ('1 năm', (12.0, 12.0)),
+    ('6 tuần', (1.38, 1.38)),
+    ('2 năm 6 tháng', (30.0, 30.0)),
+    ('6 tháng - 1 năm', (6.0, 12.0)),
+    ('3 đến 6 tháng', (3.0, 6.0)),
+    ('12-18 months', (12.0, 18.0)),
+    ('1,5 Năm', (18.0, 18.0)),
+    ('4', (4.0, 4.0)),
+    ('Tùy tiến độ', (None, None)),
+    ('', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_timeline(text, expected):
+    assert parse_timeline(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('8/10', (8.0, 10.0)),
+    ('4 / 5', (4.0, 5.0)),
+    ('85%', (85.0, 100.0)),
+    ('9', (9.0, 10.0)),
+    ('7,5', (7.5, 10.0)),
+    ('5/0', (None, None)),
+    ('cao', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_score(text, expected):
+    assert parse_score(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3', 3.0),
+    ('3 tín chỉ', 3.0),
+    (4, 4.0),
+    ('ba tín chỉ', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_credits(text, expected):
+    assert parse_credits(text) == expected
+
+
+def _create_legacy_database(db_path):
+    """Database tạo từ phiên bản trước khi có cột số"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE students (id INTEGER PRIMARY KEY AUTOINCREMENT, student_code TEXT UNIQUE,
+                               student_name TEXT NOT NULL, gpa REAL, created_at TIMESTAMP, updated_at TIMESTAMP);
+        CREATE TABLE learning_paths (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id INTEGER,
+                                     target_position TEXT NOT NULL, preferences TEXT, strengths TEXT, weaknesses TEXT,
+                                     analysis TEXT, overall_timeline TEXT, recommendations TEXT,
+                                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE learning_steps (id INTEGER PRIMARY KEY AUTOINCREMENT, learning_path_id INTEGER, step_order INTEGER,
+                                     domain TEXT NOT NULL, difficulty_level TEXT, timeline TEXT, skills TEXT,
+                                     resources TEXT);
+        CREATE TABLE course_analyses (id INTEGER PRIMARY KEY AUTOINCREMENT, learning_path_id INTEGER,
+                                      analysis_summary TEXT, general_recommendations TEXT);
+        CREATE TABLE important_courses (id INTEGER PRIMARY KEY AUTOINCREMENT, course_analysis_id INTEGER,
+                                        course_name TEXT NOT NULL, credits TEXT, importance_score TEXT, reason TEXT,
+                                        study_tips TEXT);
+
+        INSERT INTO students (id, student_name, gpa) VALUES (1, 'Sinh viên A', 3.2);
+        INSERT INTO learning_paths (id, student_id, target_position, overall_timeline)
+        VALUES (1, 1, 'AI Engineer', '2 năm 6 tháng'), (2, 1, 'Data Analyst', 'Tùy tiến độ');
+        INSERT INTO learning_steps (id, learning_path_id, step_order, domain, timeline)
+        VALUES (1, 1, 1, 'Toán', '3-6 tháng');
+        INSERT INTO course_analyses (id, learning_path_id) VALUES (1, 1);
+        INSERT INTO important_courses (id, course_analysis_id, course_name, credits, importance_score)
+        VALUES (1, 1, 'Xác suất thống kê', '3 tín chỉ', '85%'), (2, 1, 'Triết học', '', 'cao');
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def test_opening_legacy_database_backfills_numeric_columns(tmp_path):
+    db_path = str(tmp_path / 'legacy.db')
+    _create_legacy_database(db_path)
+
+    DatabaseManager(db_path).close()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute('SELECT timeline_min_months, timeline_max_months FROM learning_paths ORDER BY id').fetchall() == [
+            (30.0, 30.0), (None, None)]
+        assert conn.execute('SELECT timeline_min_months, timeline_max_months FROM learning_steps').fetchall() == [
+            (3.0, 6.0)]
+        assert conn.execute('''
+            SELECT credits_value, score_numerator, score_denominator FROM important_courses ORDER BY id
+        ''').fetchall() == [(3.0, 85.0, 100.0), (None, None, None)]
+    finally:
+        conn.close()
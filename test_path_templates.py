@@ -0,0 +1,122 @@
+"""
+Test lộ trình mẫu (path_templates.py): warm-up, tìm theo mức GPA và xóa mẫu của danh sách môn học cũ
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from database_manager import DatabaseManager
+from path_templates import UNKNOWN_GPA_BAND, PathTemplates, band_gpas, catalog_version, gpa_band, warm_templates
+
+COURSES = [{'name': 'Học máy', 'credits': '3'}, {'name': 'Giải thuật', 'credits': '4'}]
+NEW_COURSES = COURSES + [{'name': 'Dữ liệu lớn', 'credits': '3'}]
+
+
+class _Client:
+    """Client giả ghi lại các lần gọi, trả lỗi cho các vị trí trong failing"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_learning_path(self, target_position, student_gpa=None, courses_data=None, reuse_similar=True):
+        with self._lock:
+            self.calls.append((target_position, student_gpa, reuse_similar))
+        if target_position in self.failing:
+            return {'error': 'Hết quota'}
+        return {'target_position': target_position, 'analysis': f"GPA {student_gpa}", 'learning_path': [],
+                'raw_response': '{...}'}
+
+
+@pytest.fixture
+def templates(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'templates.db'))
+    yield PathTemplates(db)
+    db.close()
+
+
+@pytest.mark.parametrize('gpa, band', [(None, UNKNOWN_GPA_BAND), (1.5, 'Yếu'), (2.0, 'Trung bình'), (3.19, 'Khá'),
+                                       (3.2, 'Giỏi'), (4.0, 'Xuất sắc')])
+def test_gpa_band(gpa, band):
+    assert gpa_band(gpa) == band
+
+
+def test_catalog_version_ignores_row_order():
+    assert catalog_version(COURSES) == catalog_version(list(reversed(COURSES)))
+    assert catalog_version(COURSES) != catalog_version(NEW_COURSES)
+
+
+def test_warm_then_find_by_band(templates):
+    client = _Client()
+    stats = warm_templates(client, templates, ['AI Engineer', 'Data Analyst'], COURSES, workers=2)
+
+    combinations = 2 * len(band_gpas())
+    assert stats == {'catalog_version': catalog_version(COURSES), 'generated': combinations, 'failed': 0,
+                     'skipped': 0, 'pruned': 0}
+    assert len(client.calls) == combinations
+    assert all(reuse_similar is False for _, _, reuse_similar in client.calls)
+    assert len(templates.list()) == combinations
+
+    # GPA 3.3 và 3.5 cùng mức "Giỏi": dùng mẫu tạo với GPA đại diện của mức đó
+    found = templates.find('AI Engineer', 3.3, COURSES)
+    assert found['analysis'] == f"GPA {band_gpas()['Giỏi']}"
+    assert found['template'] == {'target_position': 'AI Engineer', 'gpa_band': 'Giỏi',
+                                 'catalog_version': catalog_version(COURSES)}
+    assert 'raw_response' not in found
+    assert templates.find('AI Engineer', 3.5, COURSES)['analysis'] == found['analysis']
+    assert templates.find('AI Engineer', None, COURSES)['analysis'] == 'GPA None'
+    assert templates.find('Tester', 3.3, COURSES) is None
+
+    # Lần warm-up sau chỉ tạo các mẫu còn thiếu
+    again = warm_templates(_Client(), templates, ['AI Engineer', 'Data Analyst'], COURSES)
+    assert again['generated'] == 0 and again['skipped'] == combinations
+
+
+def test_catalog_change_regenerates_and_prunes(templates):
+    warm_templates(_Client(), templates, ['AI Engineer'], COURSES)
+    assert templates.find('AI Engineer', 3.3, NEW_COURSES) is None
+
+    stats = warm_templates(_Client(), templates, ['AI Engineer'], NEW_COURSES)
+    assert stats['generated'] == len(band_gpas())
+    assert stats['pruned'] == len(band_gpas())
+    assert {row['catalog_version'] for row in templates.list()} == {catalog_version(NEW_COURSES)}
+    assert templates.find('AI Engineer', 3.3, COURSES) is None
+
+
+def test_failed_warm_keeps_old_templates(templates):
+    warm_templates(_Client(), templates, ['AI Engineer', 'Data Analyst'], COURSES)
+
+    stats = warm_templates(_Client(failing=['Data Analyst']), templates, ['AI Engineer', 'Data Analyst'], NEW_COURSES)
+    assert stats['generated'] == len(band_gpas())
+    assert stats['failed'] == len(band_gpas())
+    assert stats['pruned'] == 0
+    # Mẫu cũ của vị trí chưa tạo lại được vẫn còn cho đến lần warm-up thành công
+    assert templates.exists('Data Analyst', 'Giỏi', catalog_version(COURSES))
+    assert not templates.exists('Data Analyst', 'Giỏi', catalog_version(NEW_COURSES))
+
+
+def test_force_regenerates_existing(templates):
+    warm_templates(_Client(), templates, ['AI Engineer'], COURSES)
+    client = _Client()
+    stats = warm_templates(client, templates, ['AI Engineer'], COURSES, force=True)
+    assert stats['generated'] == len(client.calls) == len(band_gpas())
+    assert len(templates.list()) == len(band_gpas())
+
+
+def test_failed_read_returns_connection_to_pool(templates):
+    """Truy vấn lỗi không để kết nối mượn nằm trong transaction đọc (chặn checkpoint WAL)"""
+    pool = templates.db_manager.reads
+    conn = sqlite3.connect(templates.db_manager.db_path)
+    conn.execute('DROP TABLE path_templates')
+    conn.close()
+
+    for read in (lambda: templates.find('AI Engineer', 3.3, COURSES),
+                 lambda: templates.exists('AI Engineer', 'Giỏi', catalog_version(COURSES)),
+                 templates.list):
+        with pytest.raises(sqlite3.OperationalError):
+            read()
+    assert pool._idle
+    assert all(not idle.in_transaction for idle in pool._idle)
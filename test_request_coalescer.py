@@ -0,0 +1,184 @@
+"""
+Test gộp yêu cầu trùng lặp (request_coalescer.py): leader/follower trong tiến trình, khóa giữa các tiến trình
+"""
+
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from request_coalescer import SingleFlight, request_key
+
+KEY = request_key('AI Engineer', 3.2, 'Python')
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'inflight.db')
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'Hết thời gian chờ'
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize('with_db', [False, True])
+def test_concurrent_callers_share_one_leader(db_path, with_db):
+    """N luồng cùng khóa: một leader gọi model, N-1 luồng còn lại dùng chung kết quả"""
+    callers = 8
+    flight = SingleFlight(db_path if with_db else None, poll_interval=0.01)
+    release = threading.Event()
+
+    def call_model():
+        release.wait(5)
+        return {'analysis': 'Phân tích'}
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(flight.run, KEY, call_model) for _ in range(callers)]
+        _wait_until(lambda: flight.stats()['coalesced_local'] == callers - 1)
+        release.set()
+        outcomes = [future.result(timeout=5) for future in futures]
+
+    statuses = sorted(status for _, status in outcomes)
+    assert statuses == ['coalesced_local'] * (callers - 1) + ['leader']
+    assert all(result == {'analysis': 'Phân tích'} for result, _ in outcomes)
+    # Mỗi người gọi nhận bản sao riêng
+    assert len({id(result) for result, _ in outcomes}) == callers
+    assert flight.stats()['upstream_calls'] == 1
+    assert flight.stats()['saved_calls'] == callers - 1
+
+
+def test_caller_after_publish_becomes_leader(db_path):
+    """Kết quả đã xong không dùng lại cho lời gọi mới (người dùng bấm tạo lại)"""
+    flight = SingleFlight(db_path)
+    calls = []
+
+    def call_model():
+        calls.append(1)
+        return {'attempt': len(calls)}
+
+    assert flight.run(KEY, call_model) == ({'attempt': 1}, 'leader')
+    assert flight.run(KEY, call_model) == ({'attempt': 2}, 'leader')
+    assert flight.stats()['upstream_calls'] == 2
+
+
+def test_waiting_process_reads_published_result(db_path):
+    """Tiến trình khác đang chờ khóa nhận kết quả đã ghi thay vì gọi model"""
+    leader = SingleFlight(db_path, poll_interval=0.01)
+    follower = SingleFlight(db_path, poll_interval=0.01)
+    leader.owner, follower.owner = 'host:1', 'host:2'
+    release = threading.Event()
+
+    def call_model():
+        release.wait(5)
+        return {'analysis': 'Phân tích'}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leading = executor.submit(leader.run, KEY, call_model)
+        _wait_until(lambda: leader.stats()['upstream_calls'] == 1)
+        following = executor.submit(follower.run, KEY, lambda: pytest.fail('Không được gọi model lần hai'))
+        time.sleep(0.05)
+        release.set()
+        assert leading.result(timeout=5) == ({'analysis': 'Phân tích'}, 'leader')
+        assert following.result(timeout=5) == ({'analysis': 'Phân tích'}, 'coalesced_remote')
+
+    assert follower.stats()['upstream_calls'] == 0
+
+
+def test_expired_lease_is_taken_over(db_path):
+    """Khóa của tiến trình đã chết (quá hạn lease) được tiến trình khác giành lại"""
+    flight = SingleFlight(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        INSERT INTO inflight_requests (request_key, owner, status, result, expires_at)
+        VALUES (?, 'dead-host:1', 'running', NULL, ?)
+    ''', (KEY, time.time() - 1))
+    conn.commit()
+
+    assert flight.run(KEY, lambda: {'analysis': 'Mới'}) == ({'analysis': 'Mới'}, 'leader')
+    row = conn.execute('SELECT owner, status FROM inflight_requests WHERE request_key = ?', (KEY,)).fetchone()
+    conn.close()
+    assert row == (flight.owner, 'done')
+
+
+def test_failed_leader_releases_key(db_path):
+    """Lời gọi lỗi bỏ khóa để lần gọi sau không phải chờ hết lease"""
+    flight = SingleFlight(db_path)
+
+    def failing():
+        raise RuntimeError('Lỗi model')
+
+    with pytest.raises(RuntimeError):
+        flight.run(KEY, failing)
+    assert flight.run(KEY, lambda: {'ok': True}) == ({'ok': True}, 'leader')
+
+
+def test_request_key_separates_regenerate_and_zero_gpa():
+    """Yêu cầu tạo lại không gộp với yêu cầu được dùng lại lộ trình; GPA 0.0 khác với không có GPA"""
+    assert request_key('AI Engineer', 3.2, 'Python', reuse_similar=False) != KEY
+    assert request_key('AI Engineer', 0.0) != request_key('AI Engineer', None)
+
+
+def test_error_result_is_not_shared_with_local_followers():
+    """Dict lỗi của leader không chia cho người chờ: mỗi người chờ tự gọi model"""
+    callers = 4
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    calls_lock = threading.Lock()
+
+    def call_model():
+        with calls_lock:
+            calls.append(1)
+            first = len(calls) == 1
+        if first:
+            release.wait(5)
+            return {'error': 'Hết quota'}
+        return {'analysis': 'Phân tích'}
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(flight.run, KEY, call_model) for _ in range(callers)]
+        _wait_until(lambda: flight.stats()['coalesced_local'] == callers - 1)
+        release.set()
+        results = [future.result(timeout=5)[0] for future in futures]
+
+    assert results.count({'error': 'Hết quota'}) == 1
+    assert results.count({'analysis': 'Phân tích'}) == callers - 1
+    assert flight.stats()['upstream_calls'] >= 2
+
+
+def test_error_result_is_not_published(db_path):
+    """Dict lỗi bỏ khóa thay vì lưu 'done' cho các tiến trình khác"""
+    flight = SingleFlight(db_path)
+    assert flight.run(KEY, lambda: {'error': 'Hết quota'}) == ({'error': 'Hết quota'}, 'leader')
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM inflight_requests').fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_remote_waiter_retries_after_error(db_path):
+    """Tiến trình đang chờ thấy khóa bị bỏ do lỗi thì tự gọi model"""
+    leader = SingleFlight(db_path, poll_interval=0.01)
+    follower = SingleFlight(db_path, poll_interval=0.01)
+    leader.owner, follower.owner = 'host:1', 'host:2'
+    release = threading.Event()
+
+    def failing_model():
+        release.wait(5)
+        return {'error': 'Mất mạng'}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leading = executor.submit(leader.run, KEY, failing_model)
+        _wait_until(lambda: leader.stats()['upstream_calls'] == 1)
+        following = executor.submit(follower.run, KEY, lambda: {'analysis': 'Phân tích'})
+        time.sleep(0.05)
+        release.set()
+        assert leading.result(timeout=5) == ({'error': 'Mất mạng'}, 'leader')
+        assert following.result(timeout=5) == ({'analysis': 'Phân tích'}, 'leader')
@@ -0,0 +1,72 @@
+"""
+Test kiểm tra/chuẩn hóa cấu trúc kết quả lộ trình (result_model.py)
+"""
+
+import pytest
+
+from result_model import LearningPathResult, ResultSchemaError, parse_result, parse_section
+
+RESULT = {
+    'target_position': 'AI Engineer',
+    'analysis': 'Phân tích',
+    'learning_path': [{'domain': 'Toán', 'difficulty_level': 'Cơ bản', 'skills': ['Đại số', 'Xác suất'],
+                       'timeline': '3-6 tháng', 'resources': ['Giáo trình']}],
+    'overall_timeline': '12 tháng',
+    'recommendations': 'Lời khuyên',
+    'skill_suggestions': {'strength_based_skills': [{'skill_name': 'Python', 'reason': 'Giỏi lập trình',
+                                                     'benefit': 'Làm dự án', 'learning_path': 'Tự học'}],
+                          'weakness_improvement_skills': [], 'career_expansion_skills': []},
+    'course_analysis': {'analysis_summary': 'Tóm tắt',
+                        'important_courses': [{'name': 'Học máy', 'credits': '3', 'importance_score': '9/10',
+                                               'reason': 'Cốt lõi', 'study_tips': 'Làm bài tập'}],
+                        'general_recommendations': 'Học đều'},
+}
+
+
+@pytest.mark.parametrize('data, message', [
+    ([], 'phải là object'),
+    ({'analysis': 'Thiếu lộ trình'}, 'thiếu trường learning_path'),
+    ({'learning_path': {'domain': 'Toán'}}, 'learning_path phải là danh sách'),
+    ({'learning_path': ['Toán']}, r'learning_path\[0\] phải là object'),
+    ({'learning_path': [{'domain': 'Toán', 'skills': {'tên': 'Đại số'}}]}, r'learning_path\[0\].skills'),
+    ({'learning_path': [], 'course_analysis': 'Tốt'}, 'course_analysis phải là object'),
+    ({'learning_path': [], 'course_analysis': {'important_courses': [{'name': {'vi': 'Học máy'}}]}},
+     r'important_courses\[0\].name phải là chuỗi'),
+    ({'learning_path': [], 'skill_suggestions': {'career_expansion_skills': 'Docker'}},
+     'career_expansion_skills phải là danh sách'),
+])
+def test_malformed_result_raises_schema_error(data, message):
+    with pytest.raises(ResultSchemaError, match=message):
+        parse_result(data)
+
+
+def test_parse_result_coerces_values():
+    result = parse_result({'learning_path': [{'domain': 'Toán', 'skills': 'Đại số', 'timeline': 6}],
+                           'recommendations': ['Ý một', 'Ý hai'], 'analysis': None})
+    assert result['learning_path'][0] == {'domain': 'Toán', 'difficulty_level': '', 'skills': ['Đại số'],
+                                          'timeline': '6', 'resources': []}
+    assert result['recommendations'] == 'Ý một\nÝ hai'
+    assert result['analysis'] == ''
+    assert 'course_analysis' not in result
+
+
+def test_round_trip_is_lossless_and_keeps_unknown_keys():
+    data = dict(RESULT, raw_response='{"nguyên": "văn"}', degraded=['skill_suggestions'], reused_from=12)
+    result = LearningPathResult.from_dict(data)
+
+    assert result.extras == {'raw_response': '{"nguyên": "văn"}', 'degraded': ['skill_suggestions'], 'reused_from': 12}
+    assert result.get_extra('reused_from') == 12
+    assert result.learning_path[0].skills == ('Đại số', 'Xác suất')
+    assert result.course_analysis.important_courses[0].importance_score == '9/10'
+    assert result.to_dict() == data
+    assert LearningPathResult.from_json(result.to_json()) == result
+    assert parse_result(data) == data
+
+
+def test_parse_section():
+    assert parse_section('course_analysis', {'course_analysis': RESULT['course_analysis']}) == {
+        'course_analysis': RESULT['course_analysis']}
+    with pytest.raises(ResultSchemaError, match='thiếu phần skill_suggestions'):
+        parse_section('skill_suggestions', {'learning_path': []})
+    with pytest.raises(ResultSchemaError):
+        parse_section('skill_suggestions', {'skill_suggestions': ['Python']})
@@ -0,0 +1,44 @@
+"""
+Test escape nội dung khi dựng các phần kết quả (result_renderer.py)
+"""
+
+from result_renderer import (render_comparison, render_course_analysis, render_learning_path, render_path_details,
+                             render_path_texts)
+
+PAYLOAD = '<img src=x onerror=alert(1)>'
+
+
+def _step(domain=PAYLOAD):
+    return {'domain': domain, 'difficulty_level': PAYLOAD, 'skills': [PAYLOAD, 'Python'], 'timeline': PAYLOAD,
+            'resources': [PAYLOAD]}
+
+
+def _course_analysis():
+    return {'analysis_summary': PAYLOAD, 'general_recommendations': PAYLOAD,
+            'important_courses': [{'name': PAYLOAD, 'credits': PAYLOAD, 'importance_score': PAYLOAD}]}
+
+
+def test_sections_escape_free_text():
+    """Không phần nào đưa thẻ HTML từ kết quả ra nguyên văn"""
+    result = {'target_position': PAYLOAD, 'analysis': PAYLOAD, 'recommendations': PAYLOAD,
+              'overall_timeline': PAYLOAD, 'learning_path': [_step()], 'course_analysis': _course_analysis(),
+              'skill_suggestions': {'career_expansion_skills': [{'skill_name': 'Python'}]}}
+    details = dict(result, student_name=PAYLOAD, gpa=PAYLOAD, created_at=PAYLOAD)
+    rendered = [
+        render_learning_path(result),
+        render_course_analysis(result),
+        render_path_details(details),
+        render_comparison({'results': [result, dict(result, learning_path=[_step('Khác')])]}),
+        render_path_texts({'analysis': PAYLOAD, 'analysis_summary': PAYLOAD, 'recommendations': PAYLOAD}),
+    ]
+    for markdown in rendered:
+        assert '<img' not in markdown
+        assert '&lt;img' in markdown
+
+
+def test_markdown_syntax_is_not_interpreted():
+    """Liên kết và tiêu đề markdown trong văn bản của model hiển thị như chữ thường"""
+    markdown = render_learning_path({'analysis': '[bấm](javascript:alert(1))\n# Tiêu đề', 'learning_path': []})
+    assert '](javascript' not in markdown
+    assert '\\[bấm\\]' in markdown
+    assert '\n# Tiêu đề' not in markdown
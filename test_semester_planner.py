@@ -0,0 +1,95 @@
+"""
+Test xếp môn học vào học kỳ (semester_planner.py)
+"""
+
+import pytest
+
+from data_processor import DataProcessor
+from semester_planner import SemesterPlanner
+
+COURSES = [
+    {'name': 'Nhập môn lập trình', 'credits': '4'},
+    {'name': 'Cấu trúc dữ liệu', 'credits': '4'},
+    {'name': 'Giải thuật', 'credits': '4'},
+    {'name': 'Xác suất thống kê', 'credits': '3'},
+    {'name': 'Học máy', 'credits': '4'},
+    {'name': 'Triết học', 'credits': '3'},
+    {'name': 'Tiếng Anh', 'credits': '3'},
+]
+PREREQUISITES = [
+    ('Cấu trúc dữ liệu', 'Nhập môn lập trình'),
+    ('Giải thuật', 'Cấu trúc dữ liệu'),
+    ('Học máy', 'Giải thuật'),
+    ('Học máy', 'Xác suất thống kê'),
+]
+
+
+def _semester_of(plan):
+    return {course['name']: semester['semester'] for semester in plan['semesters'] for course in semester['courses']}
+
+
+def _assert_valid(planner, plan):
+    semester_of = _semester_of(plan)
+    for name, prerequisites in planner.prerequisites.items():
+        for prerequisite in prerequisites:
+            if name in semester_of:
+                assert semester_of[prerequisite] < semester_of[name], f"{prerequisite} phải học trước {name}"
+    for semester in plan['semesters']:
+        assert semester['courses']
+        assert semester['credits'] <= plan['credit_cap']
+        assert semester['credits'] == sum(course['credits'] for course in semester['courses'])
+
+
+@pytest.mark.parametrize('cap', [4, 7, 8, 12, 20])
+def test_plan_respects_prerequisites_and_cap(cap):
+    planner = SemesterPlanner(COURSES, PREREQUISITES, credit_cap=cap)
+    plan = planner.plan()
+
+    _assert_valid(planner, plan)
+    assert sorted(_semester_of(plan)) == sorted(course['name'] for course in COURSES)
+    assert plan['total_credits'] == 25
+
+
+@pytest.mark.parametrize('cap, semesters', [(8, 4), (12, 4), (20, 4)])
+def test_plan_reaches_lower_bound(cap, semesters):
+    """Danh mục nhỏ: số học kỳ bằng cận dưới (tổng tín chỉ / giới hạn và chuỗi tiên quyết dài nhất)"""
+    plan = SemesterPlanner(COURSES, PREREQUISITES).plan(credit_cap=cap)
+    assert plan['lower_bound'] == semesters
+    assert len(plan['semesters']) == plan['lower_bound']
+
+
+def test_cycle_raises_value_error():
+    with pytest.raises(ValueError, match='lặp vòng'):
+        SemesterPlanner(COURSES, PREREQUISITES + [('Nhập môn lập trình', 'Giải thuật')])
+
+
+def test_course_over_cap_raises_value_error():
+    with pytest.raises(ValueError, match='vượt giới hạn'):
+        SemesterPlanner(COURSES, PREREQUISITES).plan(credit_cap=3)
+
+
+def test_only_important_pulls_in_ancestors():
+    planner = SemesterPlanner(COURSES, PREREQUISITES)
+    plan = planner.plan([{'name': 'Học máy (Machine Learning)', 'importance_score': '9/10'}, 'Thiên văn học'],
+                        only_important=True)
+
+    assert set(_semester_of(plan)) == {'Nhập môn lập trình', 'Cấu trúc dữ liệu', 'Giải thuật', 'Xác suất thống kê',
+                                       'Học máy'}
+    assert plan['unmatched'] == ['Thiên văn học']
+    assert _semester_of(plan)['Học máy'] == len(plan['semesters'])
+    _assert_valid(planner, plan)
+
+
+def test_important_course_is_scheduled_early():
+    """Môn quan trọng không có tiên quyết được xếp ngay học kỳ đầu khi học kỳ không đủ chỗ cho mọi môn"""
+    plan = SemesterPlanner(COURSES, PREREQUISITES).plan(['Tiếng Anh'], credit_cap=7)
+    assert _semester_of(plan)['Tiếng Anh'] == 1
+
+
+def test_bundled_catalog_plan_is_valid():
+    planner = SemesterPlanner(DataProcessor.load_courses(), DataProcessor.load_prerequisites())
+    plan = planner.plan()
+
+    _assert_valid(planner, plan)
+    assert len(_semester_of(plan)) == len(planner.courses)
+    assert len(plan['semesters']) >= plan['lower_bound']
@@ -0,0 +1,90 @@
+"""
+Test chỉ mục tương tự (similarity_index.py): ngưỡng dùng lại/tham khảo và tìm lộ trình gần giống
+"""
+
+import sqlite3
+
+import pytest
+
+from database_manager import DatabaseManager
+from similarity_index import SimilarityIndex
+
+RESULT = {'target_position': 'AI Engineer', 'analysis': 'Phân tích', 'learning_path': [], 'overall_timeline': '6 tháng',
+          'recommendations': 'Lời khuyên', 'course_analysis': {'important_courses': []}}
+STUDENT = {'student_name': 'Sinh viên A', 'gpa': 3.2,
+           'preferences': 'Thích trí tuệ nhân tạo, học máy và xử lý ngôn ngữ tự nhiên',
+           'strengths': 'Giỏi toán, lập trình Python tốt', 'weaknesses': 'Kỹ năng giao tiếp còn yếu'}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'similar.db'))
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize('similarity, action', [(1.0, 'reuse'), (0.9, 'reuse'), (0.89, 'seed'), (0.6, 'seed')])
+def test_action_for_thresholds(db, similarity, action):
+    index = SimilarityIndex(db, reuse_threshold=0.9, seed_threshold=0.6)
+    assert index.action_for({'learning_path_id': 1, 'similarity': similarity}) == action
+
+
+def test_find_identical_and_near_duplicate(db):
+    index = SimilarityIndex(db, reuse_threshold=0.9, seed_threshold=0.5)
+    learning_path_id = db.save_learning_path(STUDENT, RESULT)
+
+    assert index.find('AI Engineer', STUDENT) == {'learning_path_id': learning_path_id, 'similarity': 1.0}
+    # Không phân biệt dấu, hoa thường của vị trí
+    assert index.find('ai engineer', STUDENT)['learning_path_id'] == learning_path_id
+
+    # Gõ sai một từ: gần như trùng, trả về luôn lộ trình đã lưu
+    typo = index.find('AI Engineer', dict(STUDENT, gpa=3.4, strengths='Giỏi toán, lập trình Pyhton tốt'))
+    assert typo['learning_path_id'] == learning_path_id
+    assert 0.9 <= typo['similarity'] < 1.0
+    assert index.action_for(typo) == 'reuse'
+
+    # Thêm ý mới vào điểm yếu: chỉ dùng làm tham khảo trong prompt
+    near = index.find('AI Engineer', dict(STUDENT, gpa=3.0, weaknesses='Kỹ năng giao tiếp và thuyết trình còn yếu'))
+    assert near['learning_path_id'] == learning_path_id
+    assert 0.5 <= near['similarity'] < 0.9
+    assert index.action_for(near) == 'seed'
+
+
+@pytest.mark.parametrize('position, changes', [
+    ('Data Analyst', {}),  # Khác vị trí
+    ('AI Engineer', {'gpa': 2.5}),  # GPA chênh quá SIMILARITY_GPA_TOLERANCE
+    ('AI Engineer', {'gpa': None}),
+    ('AI Engineer', {'preferences': 'Thiết kế đồ họa', 'strengths': 'Vẽ đẹp', 'weaknesses': 'Ngại toán'}),
+    ('AI Engineer', {'preferences': '', 'strengths': '', 'weaknesses': ''}),  # Không có văn bản để so sánh
+])
+def test_find_returns_none_below_seed_or_incompatible(db, position, changes):
+    db.save_learning_path(STUDENT, RESULT)
+    assert SimilarityIndex(db, seed_threshold=0.6).find(position, dict(STUDENT, **changes)) is None
+
+
+def test_reused_paths_are_not_indexed(db):
+    db.save_learning_path(STUDENT, dict(RESULT, reused_from=1))
+    assert SimilarityIndex(db).find('AI Engineer', STUDENT) is None
+
+
+def test_rebuild_indexes_existing_paths(db):
+    learning_path_id = db.save_learning_path(STUDENT, RESULT)
+    db.save_learning_path(dict(STUDENT, preferences='', strengths='', weaknesses=''), RESULT)
+    conn = sqlite3.connect(db.db_path)
+    conn.execute('DELETE FROM path_lsh_buckets')
+    conn.execute('DELETE FROM path_signatures')
+    conn.commit()
+    conn.close()
+
+    index = SimilarityIndex(db)
+    assert index.find('AI Engineer', STUDENT) is None
+    assert index.rebuild() == 1  # Lộ trình không có văn bản không được đánh chỉ mục
+    assert index.find('AI Engineer', STUDENT) == {'learning_path_id': learning_path_id, 'similarity': 1.0}
+    assert index.rebuild() == 1  # Chạy lại không tạo bucket trùng
+
+
+def test_record_match(db):
+    index = SimilarityIndex(db)
+    index.record_match({'learning_path_id': 7, 'similarity': 0.93456}, 'reuse', 'Sinh viên B', 'AI Engineer')
+    assert [(row['matched_learning_path_id'], row['similarity'], row['action']) for row in index.get_matches()] == [
+        (7, 0.9346, 'reuse')]
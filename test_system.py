@@ -3,23 +3,24 @@
 Script test để kiểm tra tất cả imports và dependencies
 """
 
+import importlib.util
+import os
+
 def test_imports():
     """Test tất cả imports"""
     print("🔍 Kiểm tra imports...")
     
-    try:
-        import pandas as pd
-        print("✅ pandas imported successfully")
-    except ImportError as e:
-        print(f"❌ pandas import failed: {e}")
-        return False
-    
-    try:
-        import streamlit as st
-        print("✅ streamlit imported successfully")
-    except ImportError as e:
-        print(f"❌ streamlit import failed: {e}")
-        return False
+    # Chỉ kiểm tra thư viện đã được cài, không import để tránh tốn thời gian khởi động
+    for module_name in ["pandas", "streamlit", "google.generativeai"]:
+        try:
+            found = importlib.util.find_spec(module_name) is not None
+        except ModuleNotFoundError:
+            found = False
+        if found:
+            print(f"✅ {module_name} installed")
+        else:
+            print(f"❌ {module_name} not installed")
+            return False
     
     try:
         import sqlite3
@@ -43,17 +44,17 @@ def test_imports():
         return False
     
     try:
-        from export_manager import ExportManager
-        print("✅ ExportManager imported successfully")
+        from database_manager import DatabaseManager
+        print("✅ DatabaseManager imported successfully")
     except ImportError as e:
-        print(f"❌ ExportManager import failed: {e}")
+        print(f"❌ DatabaseManager import failed: {e}")
         return False
     
     try:
-        from database_manager import DatabaseManager
-        print("✅ DatabaseManager imported successfully")
+        from data_processor import DataProcessor
+        print("✅ DataProcessor imported successfully")
     except ImportError as e:
-        print(f"❌ DatabaseManager import failed: {e}")
+        print(f"❌ DataProcessor import failed: {e}")
         return False
     
     print("🎉 Tất cả imports thành công!")
@@ -66,8 +67,24 @@ def test_file_existence():
     required_files = [
         "config.py",
         "gemini_client.py", 
-        "export_manager.py",
+        "data_processor.py",
         "database_manager.py",
+        "job_queue.py",
+        "request_coalescer.py",
+        "api_server.py",
+        "read_model_cache.py",
+        "result_renderer.py",
+        "student_roster.py",
+        "similarity_index.py",
+        "result_model.py",
+        "group_commit.py",
+        "read_snapshot.py",
+        "analytics_store.py",
+        "course_importance.py",
+        "path_templates.py",
+        "numeric_fields.py",
+        "semester_planner.py",
+        "position_recommender.py",
         "data/vi_tri.csv",
         "data/danh_sach_monhoc.csv",
         "data/GPA.txt"
@@ -128,5 +145,4 @@ def main():
     return True
 
 if __name__ == "__main__":
-    import os
     main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Theo dõi token sử dụng, chi phí và ngân sách gọi model theo ngày và theo sinh viên
+
+Ví dụ:
+    python usage_tracker.py report --by day
+    python usage_tracker.py estimate --positions "AI Engineer,Data Analyst"
+"""
+
+import argparse
+import csv
+import math
+
+from config import (DAILY_TOKEN_BUDGET, STUDENT_DAILY_TOKEN_BUDGET, PRICE_PER_MILLION_INPUT_TOKENS,
+                    PRICE_PER_MILLION_OUTPUT_TOKENS, CHARS_PER_TOKEN, MAX_OUTPUT_TOKENS, MODEL_NAME,
+                    DECOMPOSED_GENERATION, SECTION_MAX_OUTPUT_TOKENS, VI_TRI_FILE, MON_HOC_FILE, GPA_FILE)
+from database_manager import DatabaseManager
+
+
+def estimate_tokens(text):
+    """Ước lượng số token của văn bản khi API không trả về số token"""
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def estimate_cost(prompt_tokens, output_tokens):
+    """Chi phí (USD) theo đơn giá cấu hình"""
+    return (prompt_tokens * PRICE_PER_MILLION_INPUT_TOKENS
+            + output_tokens * PRICE_PER_MILLION_OUTPUT_TOKENS) / 1_000_000
+
+
+class UsageTracker:
+    """Ghi nhận token của mỗi lần gọi model và kiểm tra ngân sách"""
+
+    def __init__(self, db_manager=None, daily_budget=DAILY_TOKEN_BUDGET,
+                 student_daily_budget=STUDENT_DAILY_TOKEN_BUDGET):
+        self.db_manager = db_manager or DatabaseManager()
+        self.daily_budget = daily_budget
+        self.student_daily_budget = student_daily_budget
+
+    def check_budget(self, student_name=None):
+        """Trả về lý do nếu đã vượt ngân sách, None nếu còn được gọi model"""
+        if self.daily_budget and self.db_manager.get_tokens_used() >= self.daily_budget:
+            return f"Đã dùng hết ngân sách {self.daily_budget} token của hôm nay"
+
+        if self.student_daily_budget and student_name:
+            used = self.db_manager.get_tokens_used(student_name=student_name)
+            if used >= self.student_daily_budget:
+                return f"Sinh viên {student_name} đã dùng hết {self.student_daily_budget} token của hôm nay"
+
+        return None
+
+    def record(self, operation, prompt_tokens, output_tokens, latency_ms, cache_status,
+               student_name=None, target_position=None, model_name=MODEL_NAME):
+        """Lưu một lần gọi (hoặc một lần trả kết quả thay thế) vào bảng model_usage"""
+        self.db_manager.record_model_usage({
+            'student_name': student_name,
+            'target_position': target_position,
+            'operation': operation,
+            'model_name': model_name,
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'latency_ms': latency_ms,
+            'cache_status': cache_status
+        })
+
+    def estimate_batch(self, requests, courses_data=None):
+        """
+        Dự đoán token và chi phí của một lô yêu cầu tạo lộ trình trước khi chạy
+
+        Args:
+            requests (list): Danh sách dict tham số của generate_learning_path
+            courses_data (list): Danh sách môn học dùng chung cho cả lô
+
+        Returns:
+            dict: Tổng token prompt/output dự kiến, chi phí và ngân sách còn lại
+        """
+        from gemini_client import GeminiClient
+
+        # Chế độ tách rời gọi model một lần cho mỗi phần, mỗi phần có prompt và ngân sách output riêng
+        if DECOMPOSED_GENERATION:
+            build_prompts = GeminiClient._build_section_prompts
+            output_limits = SECTION_MAX_OUTPUT_TOKENS
+        else:
+            def build_prompts(*args):
+                return {'learning_path': GeminiClient._build_learning_path_prompt(*args)}
+            output_limits = {'learning_path': MAX_OUTPUT_TOKENS}
+
+        output_per_request = 0
+        for operation, limit in output_limits.items():
+            average_output = self.db_manager.get_average_output_tokens(operation)
+            output_per_request += int(average_output) if average_output else limit
+
+        prompt_tokens = 0
+        for request in requests:
+            prompts = build_prompts(
+                request.get('target_position'),
+                request.get('student_gpa'),
+                request.get('preferences'),
+                request.get('strengths'),
+                request.get('weaknesses'),
+                courses_data
+            )
+            prompt_tokens += sum(estimate_tokens(prompt) for prompt in prompts.values())
+
+        output_tokens = output_per_request * len(requests)
+        total_tokens = prompt_tokens + output_tokens
+        remaining = None
+        if self.daily_budget:
+            remaining = max(0, self.daily_budget - self.db_manager.get_tokens_used())
+
+        return {
+            'requests': len(requests),
+            'prompt_tokens': prompt_tokens,
+            'output_tokens': output_tokens,
+            'total_tokens': total_tokens,
+            'estimated_cost_usd': round(estimate_cost(prompt_tokens, output_tokens), 4),
+            'remaining_daily_budget': remaining,
+            'exceeds_daily_budget': remaining is not None and total_tokens > remaining
+        }
+
+
+def _read_rows(file_path, delimiter=','):
+    """Đọc file CSV/TSV thành danh sách dict"""
+    with open(file_path, encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f, delimiter=delimiter))
+
+
+def main():
+    """Hàm main"""
+    from tabulate import tabulate
+
+    parser = argparse.ArgumentParser(description="Thống kê token và ước lượng chi phí gọi model")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report = subparsers.add_parser('report', help="Tổng hợp token đã dùng")
+    report.add_argument('--by', choices=['day', 'student', 'position'], default='day')
+    report.add_argument('--since', help="Từ ngày (YYYY-MM-DD)")
+
+    estimate = subparsers.add_parser('estimate', help="Ước lượng chi phí tạo lộ trình cho cả danh sách sinh viên")
+    estimate.add_argument('--positions', help="Các vị trí, phân tách bằng dấu phẩy (mặc định tất cả)")
+
+    args = parser.parse_args()
+    tracker = UsageTracker()
+
+    if args.command == 'report':
+        rows = tracker.db_manager.get_usage_summary(args.by, args.since)
+        if rows:
+            print(tabulate(rows, headers='keys'))
+        else:
+            print("📊 Chưa có dữ liệu sử dụng")
+        return
+
+    positions = args.positions.split(',') if args.positions else [
+        row['Tên vi trí'] for row in _read_rows(VI_TRI_FILE)
+    ]
+    courses = [{'name': row['Tên môn học'], 'credits': row['Số tín chỉ']} for row in _read_rows(MON_HOC_FILE)]
+    students = [row for row in _read_rows(GPA_FILE, delimiter='\t') if row['TBCHT H4']]
+
+    requests = [
+        {'target_position': position, 'student_gpa': float(student['TBCHT H4'])}
+        for position in positions
+        for student in students
+    ]
+    result = tracker.estimate_batch(requests, courses)
+    print(tabulate(result.items(), headers=['Chỉ số', 'Giá trị']))
+    if result['exceeds_daily_budget']:
+        print("⚠️ Lô yêu cầu này vượt ngân sách token còn lại của hôm nay")
+
+
+if __name__ == "__main__":
+    main()